@@ -3,11 +3,13 @@
 # ============================================
 import streamlit as st
 import pandas as pd
-import io
+import hashlib
 from datetime import date
-from thefuzz import fuzz
-from leitor_extrato_santander import ler_extrato_santander_xlsx
+from conciliador import conciliar_multi_nivel
+from leitores_extrato import ler_extratos
 from leitor_baixas import processar_baixas
+from exportacao import arquivo_resultado, baixas_para_exportar, excel_bytes
+from desempenho import tabela_desempenho
 
 
 # ============================================
@@ -23,182 +25,92 @@ def format_currency_br(v):
         return str(v)
 
 
-def format_date_excel(df, cols):
-    """Formata colunas de datas no padrão dd/mm/yyyy apenas para exportação."""
-    df = df.copy()
-    for c in cols:
-        if c in df.columns:
-            df[c] = pd.to_datetime(df[c], errors="coerce").dt.strftime("%d/%m/%Y")
-    return df
-
-
 # ============================================
-# Conciliação em 3 níveis
+# Cache entre reruns
 # ============================================
-def conciliar_multi_nivel(
-    df_extrato: pd.DataFrame,
-    df_baixas: pd.DataFrame,
-    tolerancia_dias: int = 3,
-    limite_similaridade: int = 85
-) -> pd.DataFrame:
+# Cada interação reexecuta o script inteiro; as etapas pesadas ficam em cache
+# pelo hash do conteúdo dos arquivos (e pelos parâmetros da conciliação).
+# Argumentos com "_" na frente não entram na chave do st.cache_data.
+_MAX_ENTRADAS_CACHE = 8
+
+
+def hash_conteudo(*arquivos) -> str:
+    """SHA-256 do conteúdo de um ou mais uploads."""
+    h = hashlib.sha256()
+    for arquivo in arquivos:
+        h.update(hashlib.sha256(arquivo.getvalue()).digest())
+    return h.hexdigest()
+
+
+# As funções em cache devolvem também as medições de desempenho da execução
+# que gerou o resultado (painel "Desempenho").
+@st.cache_data(max_entries=_MAX_ENTRADAS_CACHE, show_spinner="Lendo extratos...")
+def carregar_extrato(chave: str, _arquivos) -> tuple:
+    # Banco e formato de cada arquivo detectados pelo conteúdo
+    medicoes = []
+    return ler_extratos(_arquivos, medicoes=medicoes), medicoes
+
+
+@st.cache_data(max_entries=_MAX_ENTRADAS_CACHE, show_spinner="Lendo baixas...")
+def carregar_baixas(chave: str, _arquivo) -> tuple:
+    medicoes = []
+    return processar_baixas(_arquivo, medicoes=medicoes), medicoes
+
+
+@st.cache_data(max_entries=_MAX_ENTRADAS_CACHE, show_spinner="Conciliando...")
+def conciliar_em_cache(
+    chave_ext: str,
+    chave_bx: str,
+    modo: str,
+    agrupar: bool,
+    tolerancia_valor: float,
+    tolerancia_valor_pct: float,
+    nivel_nome: bool,
+    _df_extrato,
+    _df_baixas,
+) -> tuple:
+    """(resultado, ganho do modo ótimo sobre o guloso em pares conciliados ou None, medições)."""
+    medicoes = []
+    df_result = conciliar_multi_nivel(
+        _df_extrato, _df_baixas, modo=modo, agrupar=agrupar,
+        tolerancia_valor=tolerancia_valor, tolerancia_valor_pct=tolerancia_valor_pct, nivel_nome=nivel_nome,
+        medicoes=medicoes,
+    )
+    medicoes = [{**m, "Etapa": f"Conciliação: {m['Etapa']}"} for m in medicoes]
+    if modo != "otimo":
+        return df_result, None, medicoes
+    df_guloso, _, _ = conciliar_em_cache(
+        chave_ext, chave_bx, "guloso", agrupar, tolerancia_valor, tolerancia_valor_pct, nivel_nome,
+        _df_extrato, _df_baixas,
+    )
+    ganho = int(
+        (df_result["Status"] == "✅ Conciliado").sum()
+        - (df_guloso["Status"] == "✅ Conciliado").sum()
+    )
+    return df_result, ganho, medicoes
+
+
+# Os arquivos só são gerados quando o download é pedido (data= recebe uma
+# função); o cache evita gerar o mesmo arquivo duas vezes.
+@st.cache_data(max_entries=_MAX_ENTRADAS_CACHE, show_spinner=False)
+def excel_extrato(chave: str, _df_extrato) -> bytes:
+    return excel_bytes({"Extrato": _df_extrato})
+
+
+@st.cache_data(max_entries=_MAX_ENTRADAS_CACHE, show_spinner=False)
+def excel_baixas(chave: str, _df_baixas) -> bytes:
+    return excel_bytes({"Baixas": baixas_para_exportar(_df_baixas)})
+
+
+@st.cache_data(max_entries=_MAX_ENTRADAS_CACHE, show_spinner=False)
+def exportar_resultado(chave: tuple, formato: str, _res, _df_extrato, _df_baixas) -> tuple:
     """
-    Nível 1: Valor idêntico (um-para-um)
-    Nível 2: Valor idêntico + Data próxima (≤ tolerancia_dias)
-    Nível 3: Valor idêntico + similaridade de nomes (≥ limite_similaridade)
+    (arquivo, medições da exportação) no formato pedido; chave = (hash
+    extrato, hash baixas, parâmetros da conciliação).
     """
-    # Cópias de trabalho
-    ext = df_extrato.copy()
-    bx = df_baixas.copy()
-
-    # Checagem de IDs (devem existir pois são criados no app antes)
-    if "Id Extrato" not in ext.columns:
-        ext.insert(0, "Id Extrato", range(1, len(ext) + 1))
-    if "Id Baixa" not in bx.columns:
-        bx.insert(0, "Id Baixa", range(1, len(bx) + 1))
-
-    # Apenas saídas no extrato (valores negativos)
-    ext = ext[ext["Valor"] < 0].copy()
-    ext["Valor_Abs"] = ext["Valor"].abs()
-    bx["Valor_Abs"] = bx["Valor Total"].abs()
-
-    # Datas
-    ext["Data"] = pd.to_datetime(ext["Data"], errors="coerce")
-    if "Data" in bx.columns:
-        bx["Data"] = pd.to_datetime(bx["Data"], errors="coerce")
-    bx["Data Baixa"] = pd.to_datetime(bx["Data Baixa"], errors="coerce")
-
-    # Flags de conciliação
-    ext["_conc"] = False
-    bx["_conc"] = False
-
-    matches = []  # (i_ext, i_bx, nivel, detalhe)
-
-    # ---------- Nível 1: valor idêntico (1-para-1) ----------
-    for val in ext["Valor_Abs"].dropna().unique():
-        ext_cand = ext[(ext["Valor_Abs"] == val) & (~ext["_conc"])]
-        bx_cand = bx[(bx["Valor_Abs"] == val) & (~bx["_conc"])]
-        if len(ext_cand) == 1 and len(bx_cand) == 1:
-            i_e, i_b = ext_cand.index[0], bx_cand.index[0]
-            ext.at[i_e, "_conc"] = True
-            bx.at[i_b, "_conc"] = True
-            matches.append((i_e, i_b, "Nível 1 (Valor)", "Valor idêntico"))
-
-    # ---------- Nível 2: valor + data próxima ----------
-    for i_e, row_e in ext[~ext["_conc"]].iterrows():
-        candidatos = bx[(bx["Valor_Abs"] == row_e["Valor_Abs"]) & (~bx["_conc"])]
-        if candidatos.empty:
-            continue
-        melhor, melhor_delta = None, None
-        for i_b, row_b in candidatos.iterrows():
-            de, db = row_e["Data"], row_b["Data Baixa"]
-            if pd.isna(de) or pd.isna(db):
-                continue
-            delta = abs((de - db).days)
-            if delta <= tolerancia_dias and (melhor is None or delta < melhor_delta):
-                melhor, melhor_delta = i_b, delta
-        if melhor is not None:
-            ext.at[i_e, "_conc"] = True
-            bx.at[melhor, "_conc"] = True
-            matches.append((i_e, melhor, "Nível 2 (Valor+Data)", f"Δ {melhor_delta} dia(s)"))
-
-    # ---------- Nível 3: valor + similaridade de nomes ----------
-    for i_e, row_e in ext[~ext["_conc"]].iterrows():
-        candidatos = bx[(bx["Valor_Abs"] == row_e["Valor_Abs"]) & (~bx["_conc"])]
-        if candidatos.empty:
-            continue
-        nome_e = str(row_e.get("Responsável", "") or "")
-        melhor, melhor_score = None, -1
-        for i_b, row_b in candidatos.iterrows():
-            nome_b = str(row_b.get("Responsável", "") or "")
-            score = fuzz.token_sort_ratio(nome_e, nome_b)
-            if score > melhor_score:
-                melhor, melhor_score = i_b, score
-        if melhor is not None and melhor_score >= limite_similaridade:
-            ext.at[i_e, "_conc"] = True
-            bx.at[melhor, "_conc"] = True
-            matches.append((i_e, melhor, "Nível 3 (Valor+Nome)", f"similaridade {melhor_score}%"))
-
-    # ---------- Montagem do resultado ----------
-    linhas = []
-
-    # Conciliados
-    for i_e, i_b, nivel, detalhe in matches:
-        linhas.append({
-            "Id Extrato": ext.at[i_e, "Id Extrato"],
-            "Id Baixa": bx.at[i_b, "Id Baixa"],
-
-            "Data Extrato": ext.at[i_e, "Data"],
-            "Doc Extrato": ext.at[i_e, "Documento"] if "Documento" in ext.columns else None,
-            "Responsável Extrato": ext.at[i_e, "Responsável"] if "Responsável" in ext.columns else None,
-            "Valor Extrato": ext.at[i_e, "Valor"],
-
-            "Data Lançamento": bx.at[i_b, "Data"] if "Data" in bx.columns else None,
-            "Data Baixa": bx.at[i_b, "Data Baixa"],
-            "Doc Baixa": bx.at[i_b, "Documento"] if "Documento" in bx.columns else None,
-            "Responsável Baixa": bx.at[i_b, "Responsável"] if "Responsável" in bx.columns else None,
-            "Valor Baixa": bx.at[i_b, "Valor Total"],
-
-            "Status": "✅ Conciliado",
-            "Nível Conciliação": nivel,
-            "Detalhe": detalhe
-        })
-
-    # Só no Extrato
-    for i_e, row_e in ext[~ext["_conc"]].iterrows():
-        linhas.append({
-            "Id Extrato": row_e["Id Extrato"],
-            "Id Baixa": None,
-
-            "Data Extrato": row_e["Data"],
-            "Doc Extrato": row_e["Documento"] if "Documento" in ext.columns else None,
-            "Responsável Extrato": row_e["Responsável"] if "Responsável" in ext.columns else None,
-            "Valor Extrato": row_e["Valor"],
-
-            "Data Lançamento": None,
-            "Data Baixa": None,
-            "Doc Baixa": None,
-            "Responsável Baixa": None,
-            "Valor Baixa": None,
-
-            "Status": "❌ Só no Extrato",
-            "Nível Conciliação": None,
-            "Detalhe": None
-        })
-
-    # Só nas Baixas
-    for i_b, row_b in bx[~bx["_conc"]].iterrows():
-        linhas.append({
-            "Id Extrato": None,
-            "Id Baixa": row_b["Id Baixa"],
-
-            "Data Extrato": None,
-            "Doc Extrato": None,
-            "Responsável Extrato": None,
-            "Valor Extrato": None,
-
-            "Data Lançamento": row_b["Data"] if "Data" in bx.columns else None,
-            "Data Baixa": row_b["Data Baixa"],
-            "Doc Baixa": row_b["Documento"] if "Documento" in bx.columns else None,
-            "Responsável Baixa": row_b["Responsável"] if "Responsável" in bx.columns else None,
-            "Valor Baixa": row_b["Valor Total"],
-
-            "Status": "⚠️ Só nas Baixas",
-            "Nível Conciliação": None,
-            "Detalhe": None
-        })
-
-    res = pd.DataFrame(linhas)
-
-    # ID Conciliado sequencial
-    res.insert(0, "Id Conciliado", range(1, len(res) + 1))
-
-    # Ordenação amigável (conciliados primeiro)
-    ord_map = {"✅ Conciliado": 0, "❌ Só no Extrato": 1, "⚠️ Só nas Baixas": 2}
-    res["_o"] = res["Status"].map(ord_map).fillna(9)
-    res = res.sort_values(["_o", "Data Extrato", "Data Baixa"], ascending=[True, True, True], na_position="last")
-    res = res.drop(columns=["_o"])
-
-    return res
+    medicoes = []
+    dados = arquivo_resultado(formato, _res, _df_extrato, _df_baixas, medicoes=medicoes)
+    return dados, medicoes
 
 
 # ============================================
@@ -206,27 +118,33 @@ def conciliar_multi_nivel(
 # ============================================
 st.set_page_config(page_title="Conciliação Bancária", layout="wide")
 st.title("🔎 Conciliação Bancária")
-st.markdown("Conciliação em **3 níveis**: Valor → Valor + Data (±3 dias) → Valor + Similaridade de Nomes.")
+st.markdown(
+    "Conciliação em níveis: **1** Valor → **2** Valor + Data (±3 dias) → **3** Valor + Similaridade de Nomes "
+    "→ **3B** Nome primeiro (opcional) → **4** Somas de várias linhas (opcional). "
+    "No modo **ótimo**, os Níveis 2 e 3 são resolvidos juntos, como uma atribuição de custo mínimo. "
+    "O Nível 0 (apelidos aprendidos) roda na conciliação em lote (conciliar_lote.py --apelidos)."
+)
 
 
 # Upload
 col1, col2 = st.columns(2)
 with col1:
-    extrato_file = st.file_uploader("📂 Upload do Extrato Santander (.xlsx)", type=["xlsx"])
+    extrato_files = st.file_uploader(
+        "📂 Upload dos Extratos (.xlsx, .xls ou .csv; um ou mais, de qualquer banco suportado)",
+        type=["xlsx", "xls", "csv"],
+        accept_multiple_files=True,
+    )
 with col2:
     baixas_file = st.file_uploader("📂 Upload da Relação de Baixas (.csv)", type=["csv"])
 
 
 # Processamento
-if extrato_file and baixas_file:
-    df_extrato = ler_extrato_santander_xlsx(extrato_file)
-    df_baixas = processar_baixas(baixas_file)
-
-    # IDs nas abas limpas (ficam no arquivo exportado)
-    if "Id Extrato" not in df_extrato.columns:
-        df_extrato.insert(0, "Id Extrato", range(1, len(df_extrato) + 1))
-    if "Id Baixa" not in df_baixas.columns:
-        df_baixas.insert(0, "Id Baixa", range(1, len(df_baixas) + 1))
+if extrato_files and baixas_file:
+    # Os leitores já trazem Ids pelo conteúdo da linha (ficam no arquivo exportado)
+    chave_ext = hash_conteudo(*extrato_files)
+    chave_bx = hash_conteudo(baixas_file)
+    df_extrato, medicoes_ext = carregar_extrato(chave_ext, extrato_files)
+    df_baixas, medicoes_bx = carregar_baixas(chave_bx, baixas_file)
 
     # Métricas
     df_extrato_saidas = df_extrato[df_extrato["Valor"] < 0].copy()
@@ -246,29 +164,56 @@ if extrato_file and baixas_file:
     st.subheader("💾 Exportar Arquivos Limpos")
     col_exp1, col_exp2 = st.columns(2)
     with col_exp1:
-        buf_ext = io.BytesIO()
-        with pd.ExcelWriter(buf_ext, engine="openpyxl") as wr:
-            ext_export = format_date_excel(df_extrato, ["Data"])
-            ext_export.to_excel(wr, index=False, sheet_name="Extrato")
-        buf_ext.seek(0)
-        st.download_button("📥 Baixar Extrato Limpo", buf_ext.getvalue(), file_name="extrato_limpo.xlsx")
+        st.download_button(
+            "📥 Baixar Extrato Limpo",
+            lambda: excel_extrato(chave_ext, df_extrato),
+            file_name="extrato_limpo.xlsx",
+            on_click="ignore",
+        )
 
     with col_exp2:
-        buf_bx = io.BytesIO()
-        with pd.ExcelWriter(buf_bx, engine="openpyxl") as wr:
-            bx_export = df_baixas.copy()
-            if "Valor_Abs" in bx_export.columns:
-                bx_export = bx_export.drop(columns=["Valor_Abs"])
-            bx_export = format_date_excel(bx_export, ["Data", "Data Baixa"])
-            bx_export.to_excel(wr, index=False, sheet_name="Baixas")
-        buf_bx.seek(0)
-        st.download_button("📥 Baixar Baixas Limpas", buf_bx.getvalue(), file_name="baixas_limpas.xlsx")
+        st.download_button(
+            "📥 Baixar Baixas Limpas",
+            lambda: excel_baixas(chave_bx, df_baixas),
+            file_name="baixas_limpas.xlsx",
+            on_click="ignore",
+        )
 
     # Conciliação
     st.divider()
+    modo = st.radio(
+        "Modo de pareamento",
+        ["guloso", "otimo"],
+        format_func=lambda m: "Guloso (ordem do extrato)" if m == "guloso" else "Ótimo (atribuição de custo mínimo)",
+        horizontal=True,
+    )
+    agrupar = st.checkbox(
+        "Nível 4: conciliar somas (várias baixas em um débito ou um pagamento dividido)",
+        value=False,
+    )
+    t1, t2 = st.columns(2)
+    with t1:
+        tolerancia_valor = st.number_input(
+            "Tolerância de valor (R$)", min_value=0.0, value=0.0, step=0.01, format="%.2f",
+            help="Níveis 2 e 3 aceitam baixas com valor diferente até este limite (tarifas, centavos).",
+        )
+    with t2:
+        tolerancia_valor_pct = st.number_input(
+            "Tolerância de valor (%)", min_value=0.0, max_value=100.0, value=0.0, step=0.1, format="%.1f",
+            help="Percentual do valor do lançamento; vale a maior das duas tolerâncias.",
+        )
+    nivel_nome = st.checkbox(
+        "Nível 3B: conciliar pelo nome (nomes normalizados, valor dentro da tolerância e data próxima)",
+        value=False,
+    )
+    parametros = (modo, agrupar, tolerancia_valor, tolerancia_valor_pct, nivel_nome)
     if st.button("🔄 Processar Conciliação", type="primary", use_container_width=True):
-        df_result = conciliar_multi_nivel(df_extrato, df_baixas)
+        df_result, ganho, medicoes_conc = conciliar_em_cache(chave_ext, chave_bx, *parametros, df_extrato, df_baixas)
         st.session_state["resultado_conciliacao"] = df_result
+        st.session_state["ganho_otimo"] = ganho
+        st.session_state["medicoes_conciliacao"] = medicoes_conc
+        st.session_state["chave_conciliacao"] = (chave_ext, chave_bx, *parametros)
+        st.session_state["medicoes_exportacao"] = {}  # formato -> medições, deste resultado
 
     # Resultado (sem exibir a tabela, só métricas + download)
     if "resultado_conciliacao" in st.session_state:
@@ -279,44 +224,44 @@ if extrato_file and baixas_file:
         so_ext = (res["Status"] == "❌ Só no Extrato").sum()
         so_bx = (res["Status"] == "⚠️ Só nas Baixas").sum()
         c1, c2, c3 = st.columns(3)
-        with c1: st.metric("✅ Conciliados", conc)
+        ganho = st.session_state.get("ganho_otimo")
+        with c1: st.metric("✅ Conciliados", conc, delta=f"{ganho:+d} vs. guloso" if ganho is not None else None)
         with c2: st.metric("❌ Só no Extrato", so_ext)
         with c3: st.metric("⚠️ Só nas Baixas", so_bx)
 
-        # Exportar Excel completo (3 abas)
+        # Exportar resultado: Excel completo (3 abas) ou, para resultados grandes, CSV/Parquet
         st.divider()
-        buf_res = io.BytesIO()
-        with pd.ExcelWriter(buf_res, engine="openpyxl") as wr:
-            # Conciliado com datas formatadas
-            res_export = format_date_excel(res, ["Data Extrato", "Data Lançamento", "Data Baixa"])
-            # Ordenação/colunas do conciliado (garante presença/ordem)
-            cols_conc = [
-                "Id Conciliado",
-                "Status", "Nível Conciliação", "Detalhe",
-                "Id Extrato", "Data Extrato", "Doc Extrato", "Responsável Extrato", "Valor Extrato",
-                "Id Baixa", "Data Lançamento", "Data Baixa", "Doc Baixa", "Responsável Baixa", "Valor Baixa",
-            ]
-            for c in cols_conc:
-                if c not in res_export.columns:
-                    res_export[c] = None
-            res_export = res_export[cols_conc]
-            res_export.to_excel(wr, index=False, sheet_name="Conciliado")
-
-            # Abas limpas
-            ext_export = format_date_excel(df_extrato, ["Data"])
-            ext_export.to_excel(wr, index=False, sheet_name="Extrato")
-
-            bx_export = df_baixas.copy()
-            if "Valor_Abs" in bx_export.columns:
-                bx_export = bx_export.drop(columns=["Valor_Abs"])
-            bx_export = format_date_excel(bx_export, ["Data", "Data Baixa"])
-            bx_export.to_excel(wr, index=False, sheet_name="Baixas")
-
-        buf_res.seek(0)
+        formato = st.radio(
+            "Formato do arquivo",
+            ["xlsx", "csv", "parquet"],
+            format_func={"xlsx": "Excel (3 abas)", "csv": "CSV (só conciliado)", "parquet": "Parquet (só conciliado)"}.get,
+            horizontal=True,
+        )
+        chave_conc = st.session_state["chave_conciliacao"]
+        medicoes_exp = st.session_state.setdefault("medicoes_exportacao", {})
+
+        def baixar_resultado():
+            # Roda fora do rerun do script: as medições vão para o dict desta sessão
+            dados, medicoes_exp[formato] = exportar_resultado(chave_conc, formato, res, df_extrato, df_baixas)
+            return dados
+
         st.download_button(
-            "📥 Download Excel Completo",
-            buf_res.getvalue(),
-            file_name=f"conciliacao_completa_{date.today().strftime('%Y-%m-%d')}.xlsx",
+            "📥 Download Conciliação",
+            baixar_resultado,
+            file_name=f"conciliacao_completa_{date.today().strftime('%Y-%m-%d')}.{formato}",
+            on_click="ignore",
+        )
+
+    # Desempenho: onde foi o tempo (leitura, cada nível, exportação)
+    with st.expander("⏱️ Desempenho"):
+        medicoes = medicoes_ext + medicoes_bx + st.session_state.get("medicoes_conciliacao", [])
+        medicoes_exp = st.session_state.get("medicoes_exportacao", {})
+        for formato_exp in ("xlsx", "csv", "parquet"):
+            medicoes += medicoes_exp.get(formato_exp, [])
+        st.dataframe(tabela_desempenho(medicoes), hide_index=True)
+        st.caption(
+            "Etapas que vieram do cache mostram os números da execução que gerou o resultado. "
+            "A exportação aparece depois do primeiro download."
         )
 else:
     st.info("👆 Faça o upload dos dois arquivos para começar a análise.")
@@ -0,0 +1,229 @@
+# ============================================
+# Base colunar (Parquet) de extratos e baixas já limpos
+# ============================================
+# Layout em disco (partições no estilo Hive):
+#   <raiz>/extratos/conta=<Conta>/mes=<AAAA-MM>/parte-0.parquet
+#   <raiz>/baixas/loja=<Centro de Resultados>/mes=<AAAA-MM>/parte-0.parquet
+#
+# Gravar é incremental: um arquivo novo substitui, na mesma conta/loja, só as
+# linhas do período que ele cobre, e só as partições tocadas são reescritas.
+# Carregar um período filtra as partições de mês e empurra o filtro de data
+# para o leitor Parquet, sem abrir o resto da base.
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+from leitor_baixas import COLUNAS_BAIXAS, COLUNAS_CATEGORIA_BAIXAS, ID_BAIXA, schema_baixas
+from leitor_extrato_santander import COLUNAS_CATEGORIA_EXTRATO, COLUNAS_EXTRATO, ID_EXTRATO, schema_extrato
+
+RAIZ_PADRAO = Path("bancos_limpos") / "base"
+_SEM_DATA = "sem-data"
+
+# tipo -> (subdiretório, coluna da partição de conta/loja, nome da partição, coluna de data)
+_TABELAS = {
+    "extratos": ("extratos", "Conta", "conta", "Data"),
+    "baixas": ("baixas", "Centro de Resultados", "loja", "Data Baixa"),
+}
+
+
+def _pa():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError as exc:  # pragma: no cover - depende do ambiente
+        raise ImportError("a base Parquet requer o pacote 'pyarrow'") from exc
+    return pa, ds
+
+
+def _schema(tipo: str):
+    # Ids dos leitores vão junto; partições gravadas sem eles leem como nulos
+    pa, _ = _pa()
+    schema = schema_extrato() if tipo == "extratos" else schema_baixas()
+    return schema.insert(0, pa.field(_colunas(tipo)[0], pa.string()))
+
+
+def _colunas(tipo: str) -> list:
+    return [ID_EXTRATO, *COLUNAS_EXTRATO] if tipo == "extratos" else [ID_BAIXA, *COLUNAS_BAIXAS]
+
+
+def _schema_particoes(tipo: str):
+    pa, _ = _pa()
+    return pa.schema([(_TABELAS[tipo][2], pa.string()), ("mes", pa.string())])
+
+
+def _particionamento(tipo: str):
+    _, ds = _pa()
+    return ds.partitioning(_schema_particoes(tipo), flavor="hive")
+
+
+def _meses(datas: pd.Series) -> pd.Series:
+    return datas.dt.strftime("%Y-%m").fillna(_SEM_DATA)
+
+
+def _dataset(raiz: Path, tipo: str):
+    pa, ds = _pa()
+    pasta = Path(raiz) / _TABELAS[tipo][0]
+    if not pasta.exists():
+        return None
+    schema = pa.unify_schemas([_schema(tipo), _schema_particoes(tipo)])
+    return ds.dataset(pasta, format="parquet", schema=schema, partitioning=_particionamento(tipo))
+
+
+def _gravar(df: pd.DataFrame, raiz, tipo: str) -> int:
+    pa, ds = _pa()
+    pasta, col_chave, nome_chave, col_data = _TABELAS[tipo]
+    pasta = Path(raiz) / pasta
+    schema = _schema(tipo)
+    existente = _dataset(raiz, tipo)
+
+    col_id = _colunas(tipo)[0]
+    df = df.reindex(columns=_colunas(tipo))
+    chaves = df[col_chave].astype(object).where(df[col_chave].notna(), None)
+    meses = _meses(df[col_data])
+
+    particoes = []
+    for chave, grupo in df.groupby(chaves, sort=False, dropna=False):
+        chave = None if pd.isna(chave) else str(chave)
+        datas = grupo[col_data].dropna()
+        # Meses que o arquivo novo cobre nesta conta/loja (mesmo os sem linhas)
+        cobertos = set(meses[grupo.index])
+        if len(datas):
+            cobertos |= {str(p) for p in pd.period_range(datas.min(), datas.max(), freq="M")}
+
+        for mes in sorted(cobertos):
+            novo = grupo[meses[grupo.index] == mes]
+            antigo = pd.DataFrame(columns=novo.columns)
+            if existente is not None:
+                filtro = (ds.field("mes") == mes) & (
+                    ds.field(nome_chave).is_null() if chave is None else ds.field(nome_chave) == chave
+                )
+                antigo = existente.to_table(filter=filtro, columns=list(novo.columns)).to_pandas()
+                if len(datas) and mes != _SEM_DATA:
+                    # Linhas do período coberto são substituídas pelas do arquivo novo
+                    antigo = antigo[~antigo[col_data].between(datas.min(), datas.max())]
+                # Linhas com Id já gravado também (as sem data só saem por aqui)
+                antigo = antigo[~antigo[col_id].isin(novo[col_id].dropna())]
+
+            particao = pd.concat([antigo, novo], ignore_index=True) if len(antigo) else novo
+            if particao.empty:
+                shutil.rmtree(_caminho_particao(pasta, nome_chave, chave, mes), ignore_errors=True)
+                continue
+            tabela = pa.Table.from_pandas(particao, schema=schema, preserve_index=False)
+            particoes.append(tabela.append_column(nome_chave, pa.array([chave] * len(tabela), pa.string()))
+                                   .append_column("mes", pa.array([mes] * len(tabela), pa.string())))
+
+    if particoes:
+        ds.write_dataset(
+            pa.concat_tables(particoes),
+            pasta,
+            format="parquet",
+            partitioning=_particionamento(tipo),
+            basename_template="parte-{i}.parquet",
+            existing_data_behavior="delete_matching",
+        )
+    return len(df)
+
+
+def _caminho_particao(pasta: Path, nome_chave: str, chave, mes: str) -> Path:
+    from urllib.parse import quote
+
+    valor = "__HIVE_DEFAULT_PARTITION__" if chave is None else quote(chave, safe="")
+    return pasta / f"{nome_chave}={valor}" / f"mes={mes}"
+
+
+def gravar_extrato(df_extrato: pd.DataFrame, raiz=RAIZ_PADRAO) -> int:
+    """Acrescenta um extrato (saída de ler_extrato) à base. Retorna as linhas gravadas."""
+    return _gravar(df_extrato, raiz, "extratos")
+
+
+def gravar_baixas(df_baixas: pd.DataFrame, raiz=RAIZ_PADRAO) -> int:
+    """Acrescenta uma relação de baixas (saída de processar_baixas) à base. Retorna as linhas gravadas."""
+    return _gravar(df_baixas, raiz, "baixas")
+
+
+def _carregar(raiz, tipo: str, inicio, fim, chaves) -> pd.DataFrame:
+    _, ds = _pa()
+    _, _, nome_chave, col_data = _TABELAS[tipo]
+    dataset = _dataset(raiz, tipo)
+    if dataset is None:
+        return pd.DataFrame(columns=_colunas(tipo))
+
+    filtro = None
+
+    def e(cond):
+        return cond if filtro is None else filtro & cond
+
+    # Filtros em "mes" descartam diretórios inteiros; os de data vão para o
+    # leitor Parquet (estatísticas de cada row group)
+    if inicio is not None:
+        inicio = pd.Timestamp(inicio)
+        filtro = e((ds.field("mes") >= inicio.strftime("%Y-%m")) & (ds.field(col_data) >= inicio))
+    if fim is not None:
+        fim = pd.Timestamp(fim)
+        filtro = e((ds.field("mes") <= fim.strftime("%Y-%m")) & (ds.field(col_data) <= fim))
+    if chaves is not None:
+        filtro = e(ds.field(nome_chave).isin([str(c) for c in chaves]))
+
+    tabela = dataset.to_table(columns=_colunas(tipo), filter=filtro)
+    # Mesmas categorias dos leitores (no disco ficam como texto)
+    categorias = COLUNAS_CATEGORIA_EXTRATO if tipo == "extratos" else COLUNAS_CATEGORIA_BAIXAS
+    df = tabela.to_pandas().astype({c: "category" for c in categorias})
+    return df.sort_values(col_data, kind="stable", ignore_index=True)
+
+
+def carregar_extratos(raiz=RAIZ_PADRAO, inicio=None, fim=None, contas=None) -> pd.DataFrame:
+    """Extratos com Data em [inicio, fim] (limites opcionais), das contas dadas (ou todas)."""
+    return _carregar(raiz, "extratos", inicio, fim, contas)
+
+
+def carregar_baixas(raiz=RAIZ_PADRAO, inicio=None, fim=None, lojas=None) -> pd.DataFrame:
+    """Baixas com Data Baixa em [inicio, fim] (limites opcionais), das lojas dadas (ou todas)."""
+    return _carregar(raiz, "baixas", inicio, fim, lojas)
+
+
+def conciliar_periodo(inicio, fim, raiz=RAIZ_PADRAO, contas=None, lojas=None, **parametros) -> pd.DataFrame:
+    """
+    Concilia o período [inicio, fim] direto da base: extratos do período e
+    baixas do período ± tolerancia_dias. `parametros` vão para conciliar_multi_nivel.
+    """
+    from conciliador import conciliar_multi_nivel
+
+    folga = pd.Timedelta(days=parametros.get("tolerancia_dias", 3))
+    df_extrato = carregar_extratos(raiz, inicio, fim, contas)
+    df_baixas = carregar_baixas(raiz, pd.Timestamp(inicio) - folga, pd.Timestamp(fim) + folga, lojas)
+    return conciliar_multi_nivel(df_extrato, df_baixas, **parametros)
+
+
+# ---------- Pares já conciliados (conciliação incremental) ----------
+def ler_pares(raiz=RAIZ_PADRAO) -> pd.DataFrame:
+    """Pares conciliados em execuções anteriores (vazio se ainda não há nenhum)."""
+    from conciliador import COLUNAS_PARES
+
+    caminho = Path(raiz) / "pares.parquet"
+    if not caminho.exists():
+        return pd.DataFrame(columns=COLUNAS_PARES)
+    return pd.read_parquet(caminho)
+
+
+def gravar_pares(pares: pd.DataFrame, raiz=RAIZ_PADRAO) -> None:
+    _pa()
+    Path(raiz).mkdir(parents=True, exist_ok=True)
+    pares.to_parquet(Path(raiz) / "pares.parquet", index=False)
+
+
+# ---------- Apelidos aprendidos (Nível 0) ----------
+def ler_apelidos(raiz=RAIZ_PADRAO) -> pd.DataFrame:
+    """Tabela de apelidos (nomes.COLUNAS_APELIDOS); vazia se ainda não há nenhuma."""
+    from nomes import tabela_apelidos_vazia
+
+    caminho = Path(raiz) / "apelidos.parquet"
+    if not caminho.exists():
+        return tabela_apelidos_vazia()
+    return pd.read_parquet(caminho)
+
+
+def gravar_apelidos(apelidos: pd.DataFrame, raiz=RAIZ_PADRAO) -> None:
+    _pa()
+    Path(raiz).mkdir(parents=True, exist_ok=True)
+    apelidos.to_parquet(Path(raiz) / "apelidos.parquet", index=False)
@@ -0,0 +1,405 @@
+# ============================================
+# Benchmarks
+# ============================================
+# Uso:
+#   python benchmark.py                # extratos .xlsx do repositório
+#   python benchmark.py arquivo.xlsx   # arquivos específicos
+#   python benchmark.py --estruturacao 500000   # histórico/fluxo em extrato sintético
+#   python benchmark.py --suite 1000 10000 100000 --saida resultados.json
+#       leitura, níveis da conciliação e exportação em dados sintéticos
+#   python benchmark.py --memoria 10000 100000
+#       memória dos DataFrames lidos, com e sem as colunas categóricas
+import argparse
+import glob
+import json
+import platform
+import re
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from conciliador import conciliar_multi_nivel
+from desempenho import medir, tabela_desempenho
+from exportacao import arquivo_resultado
+from leitor_baixas import processar_baixas
+from leitor_extrato_santander import (
+    _classificar_fluxo,
+    _estruturar_extrato,
+    _separar_tipo_responsavel,
+    backends_disponiveis,
+    ler_extrato_santander_xlsx,
+)
+
+
+def _cronometrar(func, repeticoes: int) -> float:
+    """Menor tempo (s) entre `repeticoes` execuções de func()."""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        func()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def comparar_backends_xlsx(arquivos, repeticoes: int = 5) -> pd.DataFrame:
+    """Tempo de ler_extrato_santander_xlsx em cada backend instalado, por arquivo."""
+    linhas = []
+    for arquivo in arquivos:
+        for backend in backends_disponiveis():
+            n = len(ler_extrato_santander_xlsx(arquivo, backend=backend))
+            tempo = _cronometrar(lambda: ler_extrato_santander_xlsx(arquivo, backend=backend), repeticoes)
+            linhas.append({"Arquivo": arquivo, "Backend": backend, "Linhas": n, "Tempo (ms)": tempo * 1000})
+
+    res = pd.DataFrame(linhas)
+    if not res.empty:
+        base = res[res["Backend"] == "openpyxl"].set_index("Arquivo")["Tempo (ms)"]
+        res["Ganho vs openpyxl"] = base.reindex(res["Arquivo"]).to_numpy() / res["Tempo (ms)"]
+    return res
+
+
+def extrato_sintetico(n_linhas: int, seed: int = 0) -> pd.DataFrame:
+    """Grade de células no layout do extrato Santander, com n_linhas lançamentos."""
+    rng = np.random.default_rng(seed)
+    tipos = np.array(["PIX RECEBIDO", "PIX ENVIADO", "TED RECEBIDA", "PAGAMENTO BOLETO", "TARIFA"])
+    nomes = np.array(["JOAO DA SILVA", "POSTO CENTRAL LTDA", "MARIA SOUZA ME", "AUTO PECAS EIRELI"])
+    historico = pd.Series(tipos[rng.integers(0, len(tipos), n_linhas)])
+    com_nome = rng.random(n_linhas) < 0.8
+    historico[com_nome] = historico[com_nome] + "   " + nomes[rng.integers(0, len(nomes), com_nome.sum())]
+
+    datas = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n_linhas), unit="D")
+    corpo = pd.DataFrame({
+        0: datas.strftime("%d/%m/%Y"),
+        1: None,
+        2: historico,
+        3: rng.integers(0, 10**6, n_linhas).astype(str),
+        4: np.round(rng.normal(0, 500, n_linhas), 2),
+    })
+    cabecalho = pd.DataFrame([
+        ["Agência", "4591", "Conta", "130106767", None],
+        [None] * 5,
+        ["Data", None, "Histórico", "Documento", "Valor"],
+    ])
+    return pd.concat([cabecalho, corpo], ignore_index=True)
+
+
+def _split_tipo_responsavel(historico):
+    """
+    Divisão linha a linha do histórico em (Tipo Movimento, Responsável), como
+    o leitor fazia antes de _separar_tipo_responsavel: a linha de base do .apply
+    em comparar_estruturacao.
+    """
+    if not isinstance(historico, str):
+        return historico, None
+    h = historico.strip()
+    if "  " in h:
+        partes = re.split(r"\s{2,}", h, maxsplit=1)
+        tipo = partes[0].strip()
+        resp = partes[1].strip() if len(partes) > 1 else None
+        return tipo, resp
+    return h, None
+
+
+def comparar_estruturacao(n_linhas: int = 500_000, repeticoes: int = 3) -> pd.DataFrame:
+    """Divisão do histórico e classificação do fluxo: .apply por linha vs vetorizado."""
+    raw = extrato_sintetico(n_linhas)
+    historico = raw.iloc[3:, 2]
+    valor = pd.to_numeric(raw.iloc[3:, 4])
+
+    def por_linha():
+        tipo_resp = historico.apply(_split_tipo_responsavel)
+        tipo_resp.apply(lambda x: x[0])
+        tipo_resp.apply(lambda x: x[1])
+        valor.apply(lambda v: None if pd.isna(v) else "Entrada" if v > 0 else "Saída" if v < 0 else "Neutro")
+
+    def vetorizado():
+        _separar_tipo_responsavel(historico)
+        _classificar_fluxo(valor)
+
+    tempos = {
+        "Histórico + fluxo (.apply)": _cronometrar(por_linha, repeticoes),
+        "Histórico + fluxo (vetorizado)": _cronometrar(vetorizado, repeticoes),
+        "_estruturar_extrato completo": _cronometrar(lambda: _estruturar_extrato(raw), repeticoes),
+    }
+    return pd.DataFrame({
+        "Etapa": list(tempos),
+        "Linhas": n_linhas,
+        "Tempo (ms)": [t * 1000 for t in tempos.values()],
+    })
+
+
+# ============================================
+# Dados sintéticos (extrato Santander .xlsx + baixas Posto Delta .csv)
+# ============================================
+_PRENOMES = np.array([
+    "JOAO", "MARIA", "JOSE", "ANA", "CARLOS", "PAULO", "FRANCISCA", "ANTONIO",
+    "LUCAS", "JULIANA", "RAFAEL", "FERNANDA", "MARCOS", "PATRICIA", "PEDRO", "ALINE",
+])
+_SOBRENOMES = np.array([
+    "SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "RODRIGUES", "FERREIRA", "ALVES", "PEREIRA",
+    "LIMA", "GOMES", "COSTA", "RIBEIRO", "MARTINS", "CARVALHO", "ALMEIDA", "BARBOSA",
+])
+_SUFIXOS = np.array(["", "", " LTDA", " ME", " EIRELI", " COMERCIO LTDA", " SERVICOS"])
+_LANCAMENTOS = np.array(["DESPESAS A PAGAR", "CONTAS A PAGAR"])
+_CONTAS = np.array(["ENERGIA ELETRICA", "MATERIAL ESCRITORIO", "SERVICO DETERCEIROS", "CONTA INTERNET"])
+_CENTROS = np.array(["1201 - POSTO CENTRO", "1203 - POSTO TMCB", "1204 - POSTO ALG"])
+_TOLERANCIA_SINTETICA = 3
+
+
+def _nomes(rng, n: int) -> pd.Series:
+    return pd.Series(
+        _PRENOMES[rng.integers(0, len(_PRENOMES), n)].astype(object) + " "
+        + _SOBRENOMES[rng.integers(0, len(_SOBRENOMES), n)] + " "
+        + _SOBRENOMES[rng.integers(0, len(_SOBRENOMES), n)]
+        + _SUFIXOS[rng.integers(0, len(_SUFIXOS), n)]
+    )
+
+
+def _com_ruido(rng, nomes: pd.Series, ruido: float) -> pd.Series:
+    """Ruído típico do Posto Delta numa fração `ruido` dos nomes: palavras coladas, corte no fim, ordem trocada."""
+    nomes = nomes.copy()
+    tipo = np.where(rng.random(len(nomes)) < ruido, rng.integers(1, 4, len(nomes)), 0)
+    colar, cortar, trocar = (tipo == 1), (tipo == 2), (tipo == 3)
+    nomes[colar] = nomes[colar].str.replace(" ", "", n=1, regex=False)
+    nomes[cortar] = nomes[cortar].str[:-4]
+    partes = nomes[trocar].str.split(" ", n=1, expand=True)
+    if len(partes):
+        nomes[trocar] = partes[1].fillna("") + " " + partes[0]
+    return nomes
+
+
+def dados_sinteticos(
+    n_linhas: int, colisao: float = 0.1, ruido: float = 0.2, pareadas: float = 0.8, seed: int = 0
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (extrato, baixas) com n_linhas cada, no formato de saída dos leitores.
+
+    Uma fração `pareadas` das baixas corresponde a saídas do extrato (mesmo
+    valor, Data Baixa a até 3 dias, nome com ruído); as demais são avulsas.
+    colisao: fração dos valores sorteada de um conjunto pequeno de valores
+    redondos, o que cria blocos de mesmo valor para os Níveis 2 e 3.
+    ruido: fração dos nomes das baixas com ruído (ver _com_ruido).
+    """
+    rng = np.random.default_rng(seed)
+    valores = np.round(rng.uniform(10, 20_000, n_linhas), 2)
+    colide = rng.random(n_linhas) < colisao
+    valores[colide] = rng.choice(np.arange(50, 5_001, 50, dtype=float), colide.sum())
+    datas = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n_linhas), unit="D")
+    nomes = _nomes(rng, n_linhas)
+
+    # Extrato: 90% saídas (negativas); o Santander corta o nome em 25 caracteres
+    saida = rng.random(n_linhas) < 0.9
+    extrato = pd.DataFrame({
+        "Data": datas,
+        "Tipo Movimento": np.where(saida, "PIX ENVIADO", "PIX RECEBIDO"),
+        "Responsável": nomes.str[:25],
+        "Documento": pd.Series(rng.integers(0, 10**6, n_linhas)).astype(str).str.zfill(6),
+        "Valor": np.where(saida, -valores, valores),
+    })
+
+    # Baixas: as pareadas copiam saídas do extrato, as avulsas são novas
+    pos_saidas = np.flatnonzero(saida)
+    n_pareadas = min(int(n_linhas * pareadas), len(pos_saidas))
+    origem = rng.permutation(pos_saidas)[:n_pareadas]
+    n_avulsas = n_linhas - n_pareadas
+    valor_bx = np.concatenate([valores[origem], np.round(rng.uniform(10, 20_000, n_avulsas), 2)])
+    data_bx = np.concatenate([
+        (datas[origem] - pd.to_timedelta(rng.integers(-1, _TOLERANCIA_SINTETICA, n_pareadas), unit="D")).to_numpy(),
+        (pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n_avulsas), unit="D")).to_numpy(),
+    ])
+    nome_bx = pd.concat([nomes.iloc[origem], _nomes(rng, n_avulsas)], ignore_index=True)
+    codigo = pd.Series(rng.integers(100, 99_999, n_linhas)).astype(str)
+    baixas = pd.DataFrame({
+        "Centro de Resultados": _CENTROS[rng.integers(0, len(_CENTROS), n_linhas)],
+        "Data": pd.to_datetime(data_bx) - pd.to_timedelta(rng.integers(0, 30, n_linhas), unit="D"),
+        "Lancamento": _LANCAMENTOS[rng.integers(0, len(_LANCAMENTOS), n_linhas)],
+        "Conta": _CONTAS[rng.integers(0, len(_CONTAS), n_linhas)],
+        "Responsável": codigo + "-" + _com_ruido(rng, nome_bx, ruido),
+        "Documento": pd.Series(rng.integers(0, 10**6, n_linhas)).astype(str),
+        "Valor Total": valor_bx,
+        "Data Baixa": pd.to_datetime(data_bx),
+        "Lancamento Baixa": "BAIXA DE CONTAS APAGAR",
+    }).iloc[rng.permutation(n_linhas)].reset_index(drop=True)
+    return extrato, baixas
+
+
+def _moeda_br(valores) -> list:
+    return [f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".") for v in valores]
+
+
+def escrever_extrato_xlsx(extrato: pd.DataFrame, caminho) -> None:
+    """Extrato no layout do .xlsx exportado pelo Santander (agência/conta, cabeçalho, SALDO ANTERIOR)."""
+    import xlsxwriter
+
+    historico = extrato["Tipo Movimento"].str.ljust(35) + extrato["Responsável"].fillna("")
+    linhas = zip(
+        extrato["Data"].dt.strftime("%d/%m/%Y"), historico, extrato["Documento"], extrato["Valor"]
+    )
+    wb = xlsxwriter.Workbook(str(caminho), {"constant_memory": True})
+    ws = wb.add_worksheet()
+    ws.write_row(0, 0, ["AGENCIA", 4591, "CONTA", 130106767])
+    ws.write_row(2, 0, ["Data", None, "Histórico", "Documento", "Valor (R$)", "Saldo (R$)"])
+    ws.write_row(3, 0, [extrato["Data"].min().strftime("%d/%m/%Y"), None, "SALDO ANTERIOR", None, None, 0])
+    for r, (data, hist, doc, valor) in enumerate(linhas, start=4):
+        ws.write_row(r, 0, [data, None, hist, doc, valor])
+    wb.close()
+
+
+def escrever_baixas_csv(baixas: pd.DataFrame, caminho) -> None:
+    """Baixas no layout do CSV do Sistema Posto Delta (latin1, ';', blocos por Centro de Resultados)."""
+    baixas = baixas.sort_values(["Centro de Resultados", "Data"], kind="stable")
+    registros = (
+        baixas["Data"].dt.strftime("%d/%m/%Y") + ";" + baixas["Lancamento"] + ";" + baixas["Conta"] + ";"
+        + baixas["Responsável"] + ";;;" + baixas["Documento"] + ";"
+        + pd.Series(_moeda_br(baixas["Valor Total"]), index=baixas.index) + ";;"
+        + baixas["Data Baixa"].dt.strftime("%d/%m/%Y") + ";;;;" + baixas["Lancamento Baixa"] + ";"
+    )
+    partes = [
+        "MATRIZ REDE POWERLINE;;;;Loja:;;1200;;01/01/2026 00:00:00", "",
+        "Relação de baixas;;;;;;;;;;;;;;", "Período de 01/01/2025 até 31/12/2025;;;;;;;;;;;;;;", "",
+        "Data;Lançamento;Conta;Responsável;;;Documento;Valor Total;Data Baixa;;;;;Lançamento Baixa;", "",
+    ]
+    for centro, bloco in registros.groupby(baixas["Centro de Resultados"], sort=False):
+        partes += [centro + ";;;;;;;;;;;;;;", "", *bloco, ""]
+    partes += ["Total;;;;" + _moeda_br([baixas["Valor Total"].sum()])[0] + ";", "",
+               "Sistema Posto Delta - Relação de baixas;;;;;Página 1 de 1;"]
+    Path(caminho).write_text("\n".join(partes) + "\n", encoding="latin1")
+
+
+# ============================================
+# Suíte: leitura, níveis da conciliação e exportação
+# ============================================
+def _memoria_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 2**20
+
+
+def _medir_suite(extrato_xlsx, baixas_csv, medicoes: list) -> None:
+    with medir(medicoes, "Leitura extrato (xlsx)") as etapa:
+        df_extrato = ler_extrato_santander_xlsx(extrato_xlsx)
+        etapa["Linhas saída"] = len(df_extrato)
+    etapa["Memória frame (MB)"] = _memoria_mb(df_extrato)
+    with medir(medicoes, "Leitura baixas (csv)") as etapa:
+        df_baixas = processar_baixas(baixas_csv)
+        etapa["Linhas saída"] = len(df_baixas)
+    etapa["Memória frame (MB)"] = _memoria_mb(df_baixas)
+    conciliacao = []
+    with medir(medicoes, "Conciliação (total)"):
+        res = conciliar_multi_nivel(df_extrato, df_baixas, tolerancia_dias=_TOLERANCIA_SINTETICA, medicoes=conciliacao)
+    medicoes.extend({**m, "Etapa": f"Conciliação: {m['Etapa']}"} for m in conciliacao)
+    arquivo_resultado("xlsx", res, df_extrato, df_baixas, medicoes=medicoes)
+    for status, n in res["Status"].value_counts().items():
+        medicoes.append({"Etapa": f"Resultado: {status}", "Linhas saída": int(n)})
+
+
+def rodar_suite(
+    tamanhos, colisao: float = 0.1, ruido: float = 0.2, seed: int = 0, memoria: bool = True, pasta=None
+) -> pd.DataFrame:
+    """
+    Para cada tamanho: gera os arquivos sintéticos, mede tempo de cada etapa e,
+    com memoria=True, o pico de memória (numa segunda passada com tracemalloc,
+    para não distorcer os tempos). Uma linha por (tamanho, etapa).
+    """
+    linhas = []
+    with tempfile.TemporaryDirectory() as temporaria:
+        pasta = Path(pasta or temporaria)
+        for n in tamanhos:
+            extrato, baixas = dados_sinteticos(n, colisao, ruido, seed=seed)
+            extrato_xlsx, baixas_csv = pasta / f"extrato_{n}.xlsx", pasta / f"baixas_{n}.csv"
+            escrever_extrato_xlsx(extrato, extrato_xlsx)
+            escrever_baixas_csv(baixas, baixas_csv)
+
+            medicoes = []
+            _medir_suite(extrato_xlsx, baixas_csv, medicoes)
+            if memoria:
+                picos = []
+                tracemalloc.start()
+                try:
+                    _medir_suite(extrato_xlsx, baixas_csv, picos)
+                finally:
+                    tracemalloc.stop()
+                for m, p in zip(medicoes, picos):
+                    if "Pico memória (MB)" in p:
+                        m["Pico memória (MB)"] = p["Pico memória (MB)"]
+            linhas.append(tabela_desempenho(medicoes))
+            linhas[-1].insert(0, "Tamanho", n)
+    return pd.concat(linhas, ignore_index=True)
+
+
+def comparar_memoria(tamanhos, colisao: float = 0.1, ruido: float = 0.2, seed: int = 0, pasta=None) -> pd.DataFrame:
+    """
+    Memória (deep) dos DataFrames lidos dos arquivos sintéticos, como os
+    leitores devolvem (colunas categóricas) e com essas colunas como texto.
+    """
+    linhas = []
+    with tempfile.TemporaryDirectory() as temporaria:
+        pasta = Path(pasta or temporaria)
+        for n in tamanhos:
+            extrato, baixas = dados_sinteticos(n, colisao, ruido, seed=seed)
+            extrato_xlsx, baixas_csv = pasta / f"extrato_{n}.xlsx", pasta / f"baixas_{n}.csv"
+            escrever_extrato_xlsx(extrato, extrato_xlsx)
+            escrever_baixas_csv(baixas, baixas_csv)
+            for nome, df in (("Extrato", ler_extrato_santander_xlsx(extrato_xlsx)),
+                             ("Baixas", processar_baixas(baixas_csv))):
+                categorias = [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)]
+                compacto = _memoria_mb(df)
+                texto = _memoria_mb(df.astype({c: "str" for c in categorias}))
+                linhas.append({
+                    "Tamanho": n, "Frame": nome, "Linhas": len(df),
+                    "Texto (MB)": texto, "Categorias (MB)": compacto, "Redução (%)": 100 * (1 - compacto / texto),
+                })
+    return pd.DataFrame(linhas)
+
+
+def resultados_json(res: pd.DataFrame, parametros: dict) -> str:
+    """Resultados da suíte com o ambiente e os parâmetros, para acompanhar regressões entre versões."""
+    return json.dumps({
+        "data": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plataforma": platform.platform(),
+        "parametros": parametros,
+        "resultados": json.loads(res.to_json(orient="records")),
+    }, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks dos leitores, da conciliação e da exportação.")
+    parser.add_argument("arquivos", nargs="*", help="extratos .xlsx (padrão: os do repositório)")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--estruturacao", type=int, metavar="N",
+                        help="mede a estruturação num extrato sintético de N linhas")
+    parser.add_argument("--suite", type=int, nargs="+", metavar="N",
+                        help="suíte completa em dados sintéticos de N linhas (ex.: 1000 10000 100000 1000000)")
+    parser.add_argument("--memoria", type=int, nargs="+", metavar="N",
+                        help="memória dos DataFrames lidos de dados sintéticos de N linhas, com e sem categorias")
+    parser.add_argument("--colisao", type=float, default=0.1, help="fração de valores repetidos (suíte)")
+    parser.add_argument("--ruido", type=float, default=0.2, help="fração de nomes com ruído nas baixas (suíte)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sem-memoria", action="store_true", help="não mede o pico de memória (suíte)")
+    parser.add_argument("--saida", help="grava os resultados da suíte em JSON neste arquivo")
+    args = parser.parse_args()
+
+    if args.memoria:
+        print(comparar_memoria(args.memoria, args.colisao, args.ruido, args.seed).round(2).to_string(index=False))
+        raise SystemExit
+
+    if args.suite:
+        res = rodar_suite(args.suite, args.colisao, args.ruido, args.seed, memoria=not args.sem_memoria)
+        with pd.option_context("display.width", 200, "display.max_rows", None):
+            print(res.round(3).to_string(index=False))
+        if args.saida:
+            parametros = {"tamanhos": args.suite, "colisao": args.colisao, "ruido": args.ruido, "seed": args.seed}
+            Path(args.saida).write_text(resultados_json(res, parametros), encoding="utf-8")
+        raise SystemExit
+
+    if args.estruturacao:
+        print(comparar_estruturacao(args.estruturacao, args.repeticoes).round(2).to_string(index=False))
+        raise SystemExit
+
+    arquivos = args.arquivos or sorted(glob.glob("**/*Santander*.xlsx", recursive=True))
+    with pd.option_context("display.width", 200, "display.max_colwidth", 60):
+        print(comparar_backends_xlsx(arquivos, args.repeticoes).round(2).to_string(index=False))
@@ -0,0 +1,1136 @@
+# ============================================
+# Motor de conciliação (sem dependência do Streamlit)
+# ============================================
+# Usado pelo app (app.py) e pela conciliação em lote (conciliar_lote.py).
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+from scipy.optimize import linear_sum_assignment
+from thefuzz import utils as fuzz_utils
+
+from desempenho import medir
+from nomes import buscar_nome, indice_nomes
+
+
+# ============================================
+# Motores de conciliação
+# ============================================
+_DIA_NS = 86_400_000_000_000
+
+
+def _datas_ns(serie: pd.Series) -> np.ndarray:
+    """Converte uma série de datas em inteiros (ns); NaT vira o mínimo de int64."""
+    return serie.to_numpy(dtype="datetime64[ns]").view("int64")
+
+
+def _somar(contadores, **valores) -> None:
+    """Acumula contadores de desempenho (desempenho.medir) quando há onde guardar."""
+    if contadores is not None:
+        for nome, valor in valores.items():
+            contadores[nome] = contadores.get(nome, 0) + valor
+
+
+def _casar_valor_data(ext: pd.DataFrame, bx: pd.DataFrame, tolerancia_dias: int, contadores: dict = None) -> list:
+    """
+    Nível 2 por janelas ordenadas: agrupa pelo valor em centavos (_cent),
+    ordena as baixas de cada grupo por Data Baixa e, para cada saída do
+    extrato (na ordem original), busca por bisseção a janela de
+    ±tolerancia_dias e pega a baixa livre de menor Δ (empate: a que vem
+    primeiro nas baixas).
+
+    Retorna [(i_ext, i_bx, delta_dias)] na ordem em que o laço linha a linha
+    produziria os pares. Em `contadores`, soma os candidatos examinados (baixas
+    dentro das janelas).
+    """
+    ext_livre = ext[~ext["_conc"] & ext["Data"].notna() & (ext["_cent"] >= 0)]
+    bx_livre = bx[~bx["_conc"] & bx["Data Baixa"].notna() & (bx["_cent"] >= 0)]
+    if ext_livre.empty or bx_livre.empty:
+        return []
+
+    grupos_e = ext_livre.groupby("_cent", sort=False).indices
+    grupos_b = bx_livre.groupby("_cent", sort=False).indices
+    datas_e = _datas_ns(ext_livre["Data"])
+    datas_b = _datas_ns(bx_livre["Data Baixa"])
+
+    # Δ em dias segue (de - db).days (arredonda para baixo), então a janela
+    # bruta é (de - (tol+1) dias, de + tol dias]; o filtro exato vem depois.
+    antes = (tolerancia_dias + 1) * _DIA_NS
+    depois = tolerancia_dias * _DIA_NS
+
+    pares = []  # (posição no extrato, posição nas baixas, delta)
+    candidatos = 0
+    for val, pos_e in grupos_e.items():
+        pos_b = grupos_b.get(val)
+        if pos_b is None:
+            continue
+        ordem = np.argsort(datas_b[pos_b], kind="stable")
+        pos_b = pos_b[ordem]
+        db = datas_b[pos_b]
+        usado = np.zeros(len(pos_b), dtype=bool)
+
+        for p_e in pos_e:
+            de = datas_e[p_e]
+            lo = np.searchsorted(db, de - antes, side="left")
+            hi = np.searchsorted(db, de + depois, side="right")
+            if lo >= hi:
+                continue
+            candidatos += hi - lo
+            delta = np.abs((de - db[lo:hi]) // _DIA_NS)
+            livre = np.flatnonzero(~usado[lo:hi] & (delta <= tolerancia_dias))
+            if livre.size == 0:
+                continue
+            d_min = delta[livre].min()
+            livre = livre[delta[livre] == d_min]
+            k = lo + livre[np.argmin(pos_b[lo + livre])]
+            usado[k] = True
+            pares.append((p_e, pos_b[k], int(d_min)))
+
+    _somar(contadores, Candidatos=int(candidatos))
+    pares.sort(key=lambda par: par[0])
+    return [
+        (ext_livre.index[p_e], bx_livre.index[p_b], delta)
+        for p_e, p_b, delta in pares
+    ]
+
+
+def _nomes_normalizados(df: pd.DataFrame) -> list:
+    """Responsável como texto, já processado como no fuzz.token_sort_ratio."""
+    if "Responsável" not in df.columns:
+        return [""] * len(df)
+    vistos = {}
+    saida = []
+    for nome in df["Responsável"].tolist():
+        nome = str(nome or "")
+        if nome not in vistos:
+            vistos[nome] = fuzz_utils.full_process(nome, force_ascii=True)
+        saida.append(vistos[nome])
+    return saida
+
+
+def _similaridades(cod_e: np.ndarray, cod_b: np.ndarray, nomes: np.ndarray, contadores: dict = None) -> np.ndarray:
+    """
+    Matriz de token_sort_ratio (inteiros 0-100) entre os códigos de nome
+    distintos cod_e × cod_b, calculada de uma vez com rapidfuzz.process.cdist.
+    Quem chama expande a matriz para as linhas do bloco com os inversos de
+    np.unique.
+    """
+    bruto = rf_process.cdist(
+        nomes[cod_e], nomes[cod_b], scorer=rf_fuzz.token_sort_ratio, processor=None, dtype=np.float64,
+    )
+    _somar(contadores, **{"Comparações fuzzy": len(cod_e) * len(cod_b)})
+    return np.rint(bruto).astype(np.int64)
+
+
+def _casar_valor_nome(ext: pd.DataFrame, bx: pd.DataFrame, limite_similaridade: int, contadores: dict = None) -> list:
+    """
+    Nível 3 em lote: normaliza cada Responsável distinto uma única vez e
+    pontua cada bloco de mesmo valor em centavos como uma matriz. Para cada saída do
+    extrato (na ordem original) fica a baixa livre de maior score (empate: a
+    primeira nas baixas), desde que score ≥ limite_similaridade.
+
+    Retorna [(i_ext, i_bx, score)] na ordem em que o laço linha a linha
+    produziria os pares. Em `contadores`, soma os candidatos (pares extrato ×
+    baixa nos blocos) e as comparações fuzzy calculadas.
+    """
+    ext_livre = ext[~ext["_conc"] & (ext["_cent"] >= 0)]
+    bx_livre = bx[~bx["_conc"] & (bx["_cent"] >= 0)]
+    if ext_livre.empty or bx_livre.empty:
+        return []
+
+    grupos_e = ext_livre.groupby("_cent", sort=False).indices
+    grupos_b = bx_livre.groupby("_cent", sort=False).indices
+
+    codigos, nomes = pd.factorize(
+        pd.Series(_nomes_normalizados(ext_livre) + _nomes_normalizados(bx_livre), dtype=object)
+    )
+    nomes = np.asarray(nomes, dtype=object)
+    cod_e, cod_b = codigos[:len(ext_livre)], codigos[len(ext_livre):]
+
+    pares = []  # (posição no extrato, posição nas baixas, score)
+    for val, pos_e in grupos_e.items():
+        pos_b = grupos_b.get(val)
+        if pos_b is None:
+            continue
+        _somar(contadores, Candidatos=len(pos_e) * len(pos_b))
+        ue, inv_e = np.unique(cod_e[pos_e], return_inverse=True)
+        ub, inv_b = np.unique(cod_b[pos_b], return_inverse=True)
+        matriz = _similaridades(ue, ub, nomes, contadores)
+        livre = np.ones(len(pos_b), dtype=bool)
+
+        for p_e, linha_nome in zip(pos_e, inv_e):
+            scores = np.where(livre, matriz[linha_nome, inv_b], -1)
+            k = int(np.argmax(scores))
+            if scores[k] >= limite_similaridade and livre[k]:
+                livre[k] = False
+                pares.append((p_e, pos_b[k], int(scores[k])))
+            if not livre.any():
+                break
+
+    pares.sort(key=lambda par: par[0])
+    return [
+        (ext_livre.index[p_e], bx_livre.index[p_b], score)
+        for p_e, p_b, score in pares
+    ]
+
+
+def _casar_otimo(
+    ext: pd.DataFrame,
+    bx: pd.DataFrame,
+    tolerancia_dias: int,
+    limite_similaridade: int,
+    contadores: dict = None,
+) -> list:
+    """
+    Versão ótima dos Níveis 2 e 3, resolvidos juntos: cada bloco de valores
+    (ver _blocos_valor; sem tolerância de valor, um bloco por valor) vira um
+    único problema de atribuição bipartida de custo mínimo (algoritmo
+    húngaro). Um par é viável pela data (as duas datas existem e Δ ≤
+    tolerancia_dias, Nível 2) ou pelo nome (score ≥ limite_similaridade,
+    Nível 3).
+
+    Custo: pares viáveis pela data vêm antes dos só pelo nome. Entre os pela
+    data, menor Δ, desempatado pela distância de nomes (100 - score); entre
+    os só pelo nome, menor distância de nomes, desempatada pelo Δ.
+
+    Com tolerância de valor, o par também precisa ter diferença de valor
+    ≤ _tol da saída do extrato, e essa diferença vem antes do custo acima.
+
+    Pares inviáveis recebem uma penalidade maior que qualquer atribuição
+    viável, então o solver primeiro maximiza o número de pares e só depois
+    minimiza o custo. Retorna [(i_ext, i_bx, delta, score, diferença em
+    centavos, viável pela data)] na ordem do extrato.
+    """
+    ext_livre = ext[~ext["_conc"] & (ext["_cent"] >= 0)]
+    bx_livre = bx[~bx["_conc"] & (bx["_cent"] >= 0)]
+    if ext_livre.empty or bx_livre.empty:
+        return []
+
+    cent_e = ext_livre["_cent"].to_numpy()
+    cent_b = bx_livre["_cent"].to_numpy()
+    tol_e = ext_livre["_tol"].to_numpy()
+    bloco_e, bloco_b = _blocos_valor(cent_e, tol_e, cent_b)
+    grupos_e = pd.Series(bloco_e).groupby(bloco_e, sort=False).indices
+    grupos_b = pd.Series(bloco_b).groupby(bloco_b, sort=False).indices
+    datas_e = _datas_ns(ext_livre["Data"])
+    datas_b = _datas_ns(bx_livre["Data Baixa"])
+    nat = np.iinfo(np.int64).min
+
+    codigos, nomes = pd.factorize(
+        pd.Series(_nomes_normalizados(ext_livre) + _nomes_normalizados(bx_livre), dtype=object)
+    )
+    nomes = np.asarray(nomes, dtype=object)
+    cod_e, cod_b = codigos[:len(ext_livre)], codigos[len(ext_livre):]
+
+    sem_data = tolerancia_dias + 1  # Δ usado quando falta alguma data
+    so_nome = sem_data * 101  # acima de qualquer custo de par viável pela data
+    teto_custo = so_nome + 100 * (sem_data + 1) + sem_data  # acima de qualquer custo sem diferença de valor
+    janela = tolerancia_dias * _DIA_NS
+    pares = []
+    for val, pos_e in grupos_e.items():
+        pos_b = grupos_b.get(val)
+        if pos_b is None:
+            continue
+        _somar(contadores, Candidatos=len(pos_e) * len(pos_b))
+
+        # Poda antes das matrizes densas: só ficam linhas/colunas com algum
+        # parceiro na faixa de valor e, nela, na janela de datas ou com nome
+        # acima do limite (um superconjunto das que têm par viável)
+        ue, inv_e = np.unique(cod_e[pos_e], return_inverse=True)
+        ub, inv_b = np.unique(cod_b[pos_b], return_inverse=True)
+        score_u = _similaridades(ue, ub, nomes, contadores)
+        nome_e = (score_u >= limite_similaridade).any(axis=1)[inv_e]
+        nome_b = (score_u >= limite_similaridade).any(axis=0)[inv_b]
+        data_e = _tem_vizinho(datas_e[pos_e], datas_b[pos_b], janela, janela, nat)
+        data_b = _tem_vizinho(datas_b[pos_b], datas_e[pos_e], janela, janela, nat)
+        ve, vb = cent_e[pos_e], cent_b[pos_b]
+        if ve.min() != ve.max() or vb.min() != vb.max():
+            tol_max = tol_e[pos_e].max()
+            valor_e = _tem_vizinho(ve, vb, tol_e[pos_e], tol_e[pos_e])
+            valor_b = _tem_vizinho(vb, ve, tol_max, tol_max)
+        else:
+            valor_e, valor_b = True, True
+        linhas = np.flatnonzero(valor_e & (data_e | nome_e))
+        colunas = np.flatnonzero(valor_b & (data_b | nome_b))
+        if linhas.size == 0 or colunas.size == 0:
+            continue
+        pos_e, pos_b = pos_e[linhas], pos_b[colunas]
+        inv_e, inv_b = inv_e[linhas], inv_b[colunas]
+
+        de = datas_e[pos_e][:, None]
+        db = datas_b[pos_b][None, :]
+        tem_data = (de != nat) & (db != nat)
+        delta = np.abs((np.where(tem_data, de, 0) - np.where(tem_data, db, 0)) // _DIA_NS)
+        delta = np.where(tem_data, delta, sem_data)
+        score = score_u[inv_e][:, inv_b]
+
+        por_data = tem_data & (delta <= tolerancia_dias)
+        viavel = por_data | (score >= limite_similaridade)
+        custo = np.where(
+            por_data,
+            delta * 101 + (100 - score),
+            so_nome + (100 - score) * (sem_data + 1) + np.minimum(delta, sem_data),
+        )
+
+        dif = np.abs(cent_e[pos_e][:, None] - cent_b[pos_b][None, :])
+        if dif.any():
+            viavel &= dif <= tol_e[pos_e][:, None]
+            custo = dif * (teto_custo + 1) + custo
+
+        # Só entram no solver linhas/colunas com ao menos um par viável
+        linhas = np.flatnonzero(viavel.any(axis=1))
+        colunas = np.flatnonzero(viavel.any(axis=0))
+        if linhas.size == 0:
+            continue
+        sub_viavel = viavel[np.ix_(linhas, colunas)]
+        sub_custo = custo[np.ix_(linhas, colunas)]
+        penalidade = int(sub_custo[sub_viavel].max()) * min(sub_custo.shape) + 1
+        sub_custo = np.where(sub_viavel, sub_custo, penalidade)
+
+        r, c = linear_sum_assignment(sub_custo)
+        ok = sub_viavel[r, c]
+        for i, j in zip(linhas[r[ok]], colunas[c[ok]]):
+            pares.append((
+                pos_e[i], pos_b[j], int(delta[i, j]), int(score[i, j]), int(dif[i, j]), bool(por_data[i, j])
+            ))
+
+    pares.sort(key=lambda par: par[0])
+    return [
+        (ext_livre.index[p_e], bx_livre.index[p_b], d, sc, dv, data_ok)
+        for p_e, p_b, d, sc, dv, data_ok in pares
+    ]
+
+
+def _tem_vizinho(
+    x: np.ndarray, y: np.ndarray, antes, depois, ausente: int = None
+) -> np.ndarray:
+    """
+    Para cada x[i], se algum y cai em [x[i] - antes, x[i] + depois] (antes e
+    depois escalares ou por linha). Valores iguais a `ausente` nunca têm
+    vizinho.
+    """
+    y = np.sort(y if ausente is None else y[y != ausente])
+    lo = np.searchsorted(y, x - antes, side="left")
+    hi = np.searchsorted(y, x + depois, side="right")
+    tem = hi > lo
+    return tem if ausente is None else tem & (x != ausente)
+
+
+def _blocos_valor(cent_e: np.ndarray, tol_e: np.ndarray, cent_b: np.ndarray) -> tuple:
+    """
+    Separa as linhas em blocos independentes de valor: as faixas
+    [_cent - _tol, _cent + _tol] das saídas do extrato que se sobrepõem viram
+    um bloco só, e cada baixa cai no bloco cuja faixa contém o seu valor.
+    Nenhum par viável atravessa blocos. Sem tolerância, cada valor distinto
+    do extrato é um bloco.
+
+    Retorna (bloco de cada saída, bloco de cada baixa ou -1 se fora de todos).
+    """
+    inicio, fim = cent_e - tol_e, cent_e + tol_e
+    ordem = np.lexsort((fim, inicio))
+    inicio, fim = inicio[ordem], fim[ordem]
+    fim_acumulado = np.maximum.accumulate(fim)
+    novo = np.concatenate([[True], inicio[1:] > fim_acumulado[:-1]])
+    bloco_e = np.empty(len(cent_e), dtype=np.int64)
+    bloco_e[ordem] = np.cumsum(novo) - 1
+
+    comeco = np.flatnonzero(novo)
+    inicio_bloco = inicio[comeco]
+    fim_bloco = fim_acumulado[np.append(comeco[1:], len(fim)) - 1]
+    k = np.searchsorted(inicio_bloco, cent_b, side="right") - 1
+    dentro = (k >= 0) & (cent_b <= fim_bloco[np.maximum(k, 0)])
+    return bloco_e, np.where(dentro, k, -1)
+
+
+def _casar_aproximado(
+    ext: pd.DataFrame,
+    bx: pd.DataFrame,
+    criterio: str,
+    tolerancia_dias: int,
+    limite_similaridade: int,
+    contadores: dict = None,
+) -> list:
+    """
+    Níveis 2 e 3 com tolerância de valor no modo guloso, rodados depois da
+    passada de valor exato. As baixas livres ficam em um índice ordenado por
+    (valor em centavos, Data Baixa); para cada saída do extrato com _tol > 0
+    (na ordem), a faixa [_cent - _tol, _cent + _tol] sai por bisseção nos
+    valores distintos e, com criterio="data", fica só a janela de
+    ±tolerancia_dias (também por bisseção quando a faixa tem um valor só).
+    Fica a baixa viável de menor diferença de valor (empates: menor Δ de dias
+    ou maior score, depois a primeira nas baixas).
+
+    Retorna [(i_ext, i_bx, delta ou score, diferença em centavos)] na ordem do
+    extrato. Em `contadores`, soma os candidatos examinados.
+    """
+    exige_data = criterio == "data"
+    ext_livre = ext[~ext["_conc"] & (ext["_cent"] >= 0) & (ext["_tol"] > 0)]
+    bx_livre = bx[~bx["_conc"] & (bx["_cent"] >= 0)]
+    if exige_data:
+        ext_livre = ext_livre[ext_livre["Data"].notna()]
+        bx_livre = bx_livre[bx_livre["Data Baixa"].notna()]
+    if ext_livre.empty or bx_livre.empty:
+        return []
+
+    # Índice ordenado das baixas: posições por (valor, data), com o início e o
+    # fim de cada valor distinto
+    cent_b = bx_livre["_cent"].to_numpy()
+    datas_b = _datas_ns(bx_livre["Data Baixa"])
+    ordem = np.lexsort((datas_b, cent_b))
+    cent_b, datas_b = cent_b[ordem], datas_b[ordem]
+    valores, inicios = np.unique(cent_b, return_index=True)
+    fins = np.append(inicios[1:], len(cent_b))
+    usado = np.zeros(len(cent_b), dtype=bool)
+
+    cent_e = ext_livre["_cent"].to_numpy()
+    tol_e = ext_livre["_tol"].to_numpy()
+    datas_e = _datas_ns(ext_livre["Data"])
+    if not exige_data:
+        codigos, nomes = pd.factorize(
+            pd.Series(_nomes_normalizados(ext_livre) + _nomes_normalizados(bx_livre), dtype=object)
+        )
+        nomes = np.asarray(nomes, dtype=object)
+        cod_e, cod_b = codigos[:len(ext_livre)], codigos[len(ext_livre):][ordem]
+    antes = (tolerancia_dias + 1) * _DIA_NS
+    depois = tolerancia_dias * _DIA_NS
+
+    pares = []
+    candidatos = 0
+    for p_e in range(len(ext_livre)):
+        v_lo = np.searchsorted(valores, cent_e[p_e] - tol_e[p_e], side="left")
+        v_hi = np.searchsorted(valores, cent_e[p_e] + tol_e[p_e], side="right")
+        if v_lo >= v_hi:
+            continue
+        cand = np.arange(inicios[v_lo], fins[v_hi - 1])
+        if exige_data:
+            de = datas_e[p_e]
+            if v_hi - v_lo == 1:
+                # Um valor só: a janela de datas também sai por bisseção
+                cand = cand[np.searchsorted(datas_b[cand], de - antes, side="left"):
+                            np.searchsorted(datas_b[cand], de + depois, side="right")]
+            else:
+                cand = cand[(datas_b[cand] > de - antes) & (datas_b[cand] <= de + depois)]
+        candidatos += cand.size
+        cand = cand[~usado[cand]]
+        if cand.size == 0:
+            continue
+
+        dif = np.abs(cent_b[cand] - cent_e[p_e])
+        if exige_data:
+            medida = np.abs((de - datas_b[cand]) // _DIA_NS)
+            viavel = medida <= tolerancia_dias
+            chave = medida
+        else:
+            ub, inv_b = np.unique(cod_b[cand], return_inverse=True)
+            medida = _similaridades(cod_e[p_e:p_e + 1], ub, nomes, contadores)[0, inv_b]
+            viavel = medida >= limite_similaridade
+            chave = -medida
+        if not viavel.any():
+            continue
+        cand, dif, medida, chave = cand[viavel], dif[viavel], medida[viavel], chave[viavel]
+        k = np.lexsort((ordem[cand], chave, dif))[0]
+        usado[cand[k]] = True
+        pares.append((p_e, ordem[cand[k]], int(medida[k]), int(dif[k])))
+
+    _somar(contadores, Candidatos=int(candidatos))
+    return [
+        (ext_livre.index[p_e], bx_livre.index[p_b], medida, dv)
+        for p_e, p_b, medida, dv in pares
+    ]
+
+
+def _parear_por_nome(
+    ext_livre: pd.DataFrame,
+    bx_livre: pd.DataFrame,
+    codigos_e: np.ndarray,
+    candidatas,
+    tolerancia_dias: int,
+    contadores: dict = None,
+) -> list:
+    """
+    Laço comum dos níveis guiados pelo nome (0 e 3B). `candidatas(código)`
+    devolve, para o código do nome de uma saída do extrato, (posições das
+    baixas, scores) e é chamada uma vez por nome. Para cada saída (na ordem),
+    entre as candidatas livres com valor a até _tol e data a até
+    ±tolerancia_dias (quando as duas datas existem), fica a de menor diferença
+    de valor (empates: maior score, menor Δ de dias, primeira nas baixas).
+
+    Retorna [(i_ext, i_bx, score, diferença em centavos, Δ dias)] na ordem do
+    extrato. Em `contadores`, soma os candidatos examinados.
+    """
+    cent_e, tol_e = ext_livre["_cent"].to_numpy(), ext_livre["_tol"].to_numpy()
+    cent_b = bx_livre["_cent"].to_numpy()
+    datas_e = _datas_ns(ext_livre["Data"])
+    datas_b = _datas_ns(bx_livre["Data Baixa"])
+    nat = np.iinfo(np.int64).min
+    usado = np.zeros(len(bx_livre), dtype=bool)
+
+    buscas = {}  # código do nome no extrato -> (posições das baixas, scores)
+    pares = []
+    candidatos = 0
+    for p_e, codigo in enumerate(codigos_e):
+        if codigo not in buscas:
+            buscas[codigo] = candidatas(codigo)
+        cand, score = buscas[codigo]
+        candidatos += cand.size
+        if cand.size == 0:
+            continue
+
+        dif = np.abs(cent_b[cand] - cent_e[p_e])
+        de, db = datas_e[p_e], datas_b[cand]
+        tem_data = (de != nat) & (db != nat)
+        delta = np.where(tem_data, np.abs((de - np.where(tem_data, db, de)) // _DIA_NS), 0)
+        viavel = ~usado[cand] & (dif <= tol_e[p_e]) & (delta <= tolerancia_dias)
+        if not viavel.any():
+            continue
+        c, d, sc, dl = cand[viavel], dif[viavel], score[viavel], delta[viavel]
+        k = np.lexsort((c, dl, -sc, d))[0]
+        usado[c[k]] = True
+        pares.append((p_e, c[k], int(sc[k]), int(d[k]), int(dl[k])))
+
+    _somar(contadores, Candidatos=int(candidatos))
+    return [
+        (ext_livre.index[p_e], bx_livre.index[p_b], score, dv, delta)
+        for p_e, p_b, score, dv, delta in pares
+    ]
+
+
+def _livres_com_nome(ext: pd.DataFrame, bx: pd.DataFrame) -> tuple:
+    """Linhas livres (com valor) dos dois lados e os índices de nomes (nomes.indice_nomes) de cada lado."""
+    ext_livre = ext[~ext["_conc"] & (ext["_cent"] >= 0)]
+    bx_livre = bx[~bx["_conc"] & (bx["_cent"] >= 0)]
+    if ext_livre.empty or bx_livre.empty or "Responsável" not in bx_livre.columns:
+        return None
+    return (
+        ext_livre,
+        bx_livre,
+        indice_nomes(ext_livre.reindex(columns=["Responsável"])["Responsável"].tolist()),
+        indice_nomes(bx_livre["Responsável"].tolist()),
+    )
+
+
+def _casar_por_nome(
+    ext: pd.DataFrame, bx: pd.DataFrame, tolerancia_dias: int, limite_similaridade: int, contadores: dict = None
+) -> list:
+    """
+    Nível 3B, nome primeiro: indexa os Responsáveis das baixas livres
+    (nomes.indice_nomes) e, para cada nome distinto do extrato, busca pelas
+    chaves de bloqueio os nomes com score ≥ limite_similaridade (formas
+    normalizadas, sem LTDA/ME/EIRELI...). O par sai de _parear_por_nome.
+
+    Retorna [(i_ext, i_bx, score, diferença em centavos, Δ dias)] na ordem do
+    extrato. Em `contadores`, soma os candidatos e as comparações fuzzy.
+    """
+    livres = _livres_com_nome(ext, bx)
+    if livres is None:
+        return []
+    ext_livre, bx_livre, nomes_e, nomes_b = livres
+    linhas_por_nome = pd.Series(np.arange(len(bx_livre))).groupby(nomes_b["codigos"]).indices
+
+    def candidatas(codigo):
+        parecidos, scores, pontuados = buscar_nome(nomes_b, nomes_e["formas"][codigo], limite_similaridade)
+        _somar(contadores, **{"Comparações fuzzy": pontuados})
+        linhas = [linhas_por_nome[c] for c in parecidos]
+        return (
+            np.concatenate(linhas) if linhas else np.array([], dtype=np.int64),
+            np.repeat(scores, [len(l) for l in linhas]),
+        )
+
+    return _parear_por_nome(ext_livre, bx_livre, nomes_e["codigos"], candidatas, tolerancia_dias, contadores)
+
+
+def _casar_apelidos(ext: pd.DataFrame, bx: pd.DataFrame, apelidos: dict, tolerancia_dias: int, contadores: dict = None) -> list:
+    """
+    Nível 0: o nome normalizado de cada saída do extrato é procurado em
+    `apelidos` (nome no extrato -> nome nas baixas, ver
+    nomes.dicionario_apelidos), sem nenhuma comparação fuzzy; as candidatas
+    são as baixas livres com o nome apontado. O par sai de _parear_por_nome.
+
+    Retorna [(i_ext, i_bx, score, diferença em centavos, Δ dias)] na ordem do extrato.
+    """
+    livres = _livres_com_nome(ext, bx)
+    if livres is None:
+        return []
+    ext_livre, bx_livre, nomes_e, nomes_b = livres
+    linhas_por_nome = pd.Series(np.arange(len(bx_livre))).groupby(nomes_b["codigos"]).indices
+    codigo_b = {forma: codigo for codigo, forma in enumerate(nomes_b["formas"])}
+    vazio = np.array([], dtype=np.int64)
+
+    def candidatas(codigo):
+        alvo = codigo_b.get(apelidos.get(nomes_e["formas"][codigo]))
+        if alvo is None:
+            return vazio, vazio
+        linhas = linhas_por_nome[alvo]
+        return linhas, np.full(len(linhas), 100)
+
+    return _parear_por_nome(ext_livre, bx_livre, nomes_e["codigos"], candidatas, tolerancia_dias, contadores)
+
+
+# ============================================
+# Execução em blocos de valor (serial, threads ou processos)
+# ============================================
+EXECUTORES = ("serial", "threads", "processos")
+_COLUNAS_BLOCO = ["Data", "Data Baixa", "Responsável", "_cent", "_tol", "_conc"]
+
+
+def _lotes_balanceados(custos: dict, n_lotes: int) -> list:
+    """
+    Distribui os blocos ({bloco: custo}) em até n_lotes lotes de custo
+    parecido: do bloco mais caro ao mais barato, cada um vai para o lote mais
+    leve até ali.
+    """
+    lotes = [[] for _ in range(n_lotes)]
+    carga = [0] * n_lotes
+    for bloco, custo in sorted(custos.items(), key=lambda item: -item[1]):
+        i = carga.index(min(carga))
+        lotes[i].append(bloco)
+        carga[i] += custo
+    return [lote for lote in lotes if lote]
+
+
+def _rodar_lote(funcao, ext: pd.DataFrame, bx: pd.DataFrame, argumentos: tuple) -> tuple:
+    contadores = {}
+    return funcao(ext, bx, *argumentos, contadores), contadores
+
+
+def _em_blocos(funcao, ext: pd.DataFrame, bx: pd.DataFrame, argumentos: tuple, executor: str, trabalhadores, contadores):
+    """
+    Roda `funcao(ext, bx, *argumentos, contadores)` (um dos motores dos Níveis
+    2 e 3) separando as linhas livres nos blocos de valor de _blocos_valor, que
+    não têm pares viáveis entre si. Os blocos são empacotados em lotes de
+    custo parecido (linhas do extrato × baixas), um por trabalhador, e os
+    pares dos lotes voltam na ordem do extrato: o resultado é o mesmo do modo
+    serial.
+    """
+    if executor == "serial":
+        return funcao(ext, bx, *argumentos, contadores)
+    ext_livre = ext.loc[~ext["_conc"] & (ext["_cent"] >= 0), ext.columns.intersection(_COLUNAS_BLOCO)]
+    bx_livre = bx.loc[~bx["_conc"] & (bx["_cent"] >= 0), bx.columns.intersection(_COLUNAS_BLOCO)]
+    if ext_livre.empty or bx_livre.empty:
+        return []
+
+    bloco_e, bloco_b = _blocos_valor(
+        ext_livre["_cent"].to_numpy(), ext_livre["_tol"].to_numpy(), bx_livre["_cent"].to_numpy()
+    )
+    n_blocos = int(bloco_e.max()) + 1
+    custo = np.bincount(bloco_e, minlength=n_blocos) * np.bincount(bloco_b[bloco_b >= 0], minlength=n_blocos)
+    custos = {int(b): int(custo[b]) for b in np.flatnonzero(custo)}
+    lotes = _lotes_balanceados(custos, trabalhadores or os.cpu_count() or 1)
+    if not lotes:
+        return []
+
+    Pool = ThreadPoolExecutor if executor == "threads" else ProcessPoolExecutor
+    with Pool(max_workers=len(lotes)) as pool:
+        tarefas = [
+            pool.submit(
+                _rodar_lote, funcao,
+                ext_livre[np.isin(bloco_e, lote)], bx_livre[np.isin(bloco_b, lote)], argumentos,
+            )
+            for lote in lotes
+        ]
+        resultados = [t.result() for t in tarefas]
+
+    pares = []
+    for pares_lote, contadores_lote in resultados:
+        pares += pares_lote
+        _somar(contadores, **contadores_lote)
+    posicao = ext.index.get_indexer([par[0] for par in pares])
+    return [pares[i] for i in np.argsort(posicao, kind="stable")]
+
+
+_SEM_VALOR = -1  # _cent das linhas sem valor
+
+
+def _centavos(serie: pd.Series) -> np.ndarray:
+    """Valores em reais -> módulo em centavos inteiros (int64); sem valor vira _SEM_VALOR."""
+    valores = np.abs(serie.to_numpy(dtype=np.float64, na_value=np.nan))
+    return np.where(np.isnan(valores), _SEM_VALOR, np.rint(valores * 100)).astype(np.int64)
+
+
+def _tolerancia_centavos(cent: np.ndarray, tolerancia_valor: float, tolerancia_valor_pct: float) -> np.ndarray:
+    """Tolerância de valor de cada linha, em centavos: a maior entre a absoluta (R$) e a percentual."""
+    percentual = np.floor(cent * (tolerancia_valor_pct / 100) + 1e-9).astype(np.int64)
+    return np.maximum(int(round(tolerancia_valor * 100)), percentual)
+
+
+def _diferenca(centavos: int) -> str:
+    """Sufixo do Detalhe para pares com tolerância de valor (vazio se o valor é idêntico)."""
+    return f", Δ valor R$ {centavos / 100:.2f}".replace(".", ",") if centavos else ""
+
+
+def _subconjunto_soma(valores: list, alvo: int, max_itens: int, prazo: float):
+    """
+    Busca em profundidade, com poda e memória de estados que já falharam, um
+    subconjunto de `valores` (centavos, ordem decrescente) com até `max_itens`
+    itens que some exatamente `alvo`.
+
+    Retorna a lista de posições escolhidas, ou None se não houver solução
+    ou se o `prazo` (time.perf_counter) estourar.
+    """
+    n = len(valores)
+    sufixo = [0] * (n + 1)
+    for i in range(n - 1, -1, -1):
+        sufixo[i] = sufixo[i + 1] + valores[i]
+
+    falhas = set()
+    escolha = []
+
+    def busca(inicio, resto, vagas):
+        if resto == 0:
+            return True
+        if vagas == 0 or sufixo[inicio] < resto or (inicio, resto, vagas) in falhas:
+            return False
+        if time.perf_counter() > prazo:
+            return False
+        for j in range(inicio, n):
+            v = valores[j]
+            if v * vagas < resto:
+                break  # ordem decrescente: daqui em diante nada alcança o resto
+            if v > resto or (j > inicio and v == valores[j - 1]):
+                continue
+            escolha.append(j)
+            if busca(j + 1, resto - v, vagas - 1):
+                return True
+            escolha.pop()
+        falhas.add((inicio, resto, vagas))
+        return False
+
+    return list(escolha) if busca(0, alvo, max_itens) else None
+
+
+def _casar_agrupado(
+    alvos: pd.DataFrame,
+    col_data_alvo: str,
+    partes: pd.DataFrame,
+    col_data_partes: str,
+    chave_partes: np.ndarray,
+    tolerancia_dias: int,
+    max_itens: int,
+    prazo: float,
+    contadores: dict = None,
+) -> list:
+    """
+    Para cada alvo (na ordem), procura entre as `partes` livres com mesma
+    chave e data dentro de ±tolerancia_dias um grupo de 2 a `max_itens`
+    linhas cuja soma de valores (_cent) seja exatamente o valor do alvo.
+
+    Retorna [(i_alvo, [i_partes...])].
+    """
+    alvos = alvos[alvos[col_data_alvo].notna()]
+    ok_partes = partes[col_data_partes].notna().to_numpy() & (partes["_cent"] > 0).to_numpy()
+    partes, chave_partes = partes[ok_partes], chave_partes[ok_partes]
+    if alvos.empty or len(partes) < 2:
+        return []
+
+    ordem = np.argsort(_datas_ns(partes[col_data_partes]), kind="stable")
+    datas_p = _datas_ns(partes[col_data_partes])[ordem]
+    valores_p = partes["_cent"].to_numpy()[ordem]
+    chave_p = chave_partes[ordem]
+    indice_p = partes.index.to_numpy()[ordem]
+    usado = np.zeros(len(partes), dtype=bool)
+
+    datas_a = _datas_ns(alvos[col_data_alvo])
+    valores_a = alvos["_cent"].to_numpy()
+    janela = tolerancia_dias * _DIA_NS
+
+    grupos = []
+    for i_a, de, alvo in zip(alvos.index, datas_a, valores_a):
+        if time.perf_counter() > prazo:
+            break
+        lo = np.searchsorted(datas_p, de - janela - _DIA_NS + 1, side="left")
+        hi = np.searchsorted(datas_p, de + janela, side="right")
+        cand = lo + np.flatnonzero(~usado[lo:hi] & (valores_p[lo:hi] < alvo))
+        _somar(contadores, Candidatos=int(cand.size))
+        if cand.size < 2:
+            continue
+        for chave in pd.unique(chave_p[cand]):
+            bloco = cand[chave_p[cand] == chave]
+            if bloco.size < 2 or valores_p[bloco].sum() < alvo:
+                continue
+            bloco = bloco[np.argsort(-valores_p[bloco], kind="stable")]
+            escolha = _subconjunto_soma(valores_p[bloco].tolist(), int(alvo), max_itens, prazo)
+            if escolha:
+                usado[bloco[escolha]] = True
+                grupos.append((i_a, indice_p[bloco[escolha]].tolist()))
+                break
+    return grupos
+
+
+# ============================================
+# Conciliação em 3 níveis
+# ============================================
+COLUNAS_RESULTADO = [
+    "Id Extrato", "Id Baixa",
+    "Data Extrato", "Doc Extrato", "Responsável Extrato", "Valor Extrato",
+    "Data Lançamento", "Data Baixa", "Doc Baixa", "Responsável Baixa", "Valor Baixa",
+    "Status", "Nível Conciliação", "Detalhe",
+]
+
+
+def _colunas(df: pd.DataFrame, indices, origem: dict) -> pd.DataFrame:
+    """Colunas do resultado (nome -> coluna de origem) para as linhas `indices` de df."""
+    pos = df.index.get_indexer(indices)
+    return pd.DataFrame({
+        nome: df[col].take(pos).to_numpy() if col in df.columns else [None] * len(pos)
+        for nome, col in origem.items()
+    })
+
+
+def _colunas_extrato(ext: pd.DataFrame, indices) -> pd.DataFrame:
+    return _colunas(ext, indices, {
+        "Id Extrato": "Id Extrato",
+        "Data Extrato": "Data",
+        "Doc Extrato": "Documento",
+        "Responsável Extrato": "Responsável",
+        "Valor Extrato": "Valor",
+    })
+
+
+def _colunas_baixas(bx: pd.DataFrame, indices) -> pd.DataFrame:
+    return _colunas(bx, indices, {
+        "Id Baixa": "Id Baixa",
+        "Data Lançamento": "Data",
+        "Data Baixa": "Data Baixa",
+        "Doc Baixa": "Documento",
+        "Responsável Baixa": "Responsável",
+        "Valor Baixa": "Valor Total",
+    })
+
+
+# Colunas dos frames de entrada que a conciliação usa
+_COLUNAS_TRABALHO_EXTRATO = ["Id Extrato", "Data", "Documento", "Responsável", "Valor"]
+_COLUNAS_TRABALHO_BAIXAS = [
+    "Id Baixa", "Centro de Resultados", "Data", "Data Baixa", "Documento", "Responsável", "Valor Total",
+]
+
+
+def _livres(ext: pd.DataFrame, bx: pd.DataFrame) -> int:
+    """Linhas ainda não conciliadas nos dois lados."""
+    return int((~ext["_conc"]).sum() + (~bx["_conc"]).sum())
+
+
+def _finalizar_resultado(blocos: list) -> pd.DataFrame:
+    """Concatena blocos no esquema COLUNAS_RESULTADO, numera e ordena (conciliados primeiro)."""
+    blocos_cheios = [b for b in blocos if len(b)]
+    res = pd.concat(blocos_cheios, ignore_index=True) if blocos_cheios else blocos[0]
+    res = res.reindex(columns=COLUNAS_RESULTADO)
+    for col in res.columns[res.isna().all().to_numpy()]:
+        res[col] = None  # coluna sem nenhum valor: None (object), não NaN
+
+    # ID Conciliado sequencial
+    res.insert(0, "Id Conciliado", range(1, len(res) + 1))
+
+    # Ordenação amigável (conciliados primeiro)
+    ord_map = {"✅ Conciliado": 0, "❌ Só no Extrato": 1, "⚠️ Só nas Baixas": 2}
+    res["_o"] = res["Status"].map(ord_map).fillna(9)
+    res = res.sort_values(["_o", "Data Extrato", "Data Baixa"], ascending=[True, True, True], na_position="last")
+    res = res.drop(columns=["_o"])
+
+    return res
+
+
+def conciliar_multi_nivel(
+    df_extrato: pd.DataFrame,
+    df_baixas: pd.DataFrame,
+    tolerancia_dias: int = 3,
+    limite_similaridade: int = 85,
+    modo: str = "guloso",
+    agrupar: bool = False,
+    max_itens_grupo: int = 4,
+    tempo_max_grupo: float = 10.0,
+    tolerancia_valor: float = 0.0,
+    tolerancia_valor_pct: float = 0.0,
+    nivel_nome: bool = False,
+    apelidos: dict = None,
+    executor: str = "serial",
+    trabalhadores: int = None,
+    medicoes: list = None,
+) -> pd.DataFrame:
+    """
+    Nível 0 (com `apelidos`): nome do extrato com apelido aprendido
+    (nomes.dicionario_apelidos) + valor dentro da tolerância + data próxima
+    Nível 1: Valor idêntico (um-para-um)
+    Nível 2: Valor idêntico + Data próxima (≤ tolerancia_dias)
+    Nível 3: Valor idêntico + similaridade de nomes (≥ limite_similaridade)
+    Nível 3B (nivel_nome=True): nome primeiro, pelo índice de nomes
+    normalizados (nomes.py), com valor dentro da tolerância de valor e data
+    dentro de ±tolerancia_dias
+    Nível 4 (agrupar=True): soma de 2 a max_itens_grupo baixas do mesmo Centro
+    de Resultados/Responsável igual a uma saída do extrato, ou soma de saídas
+    do mesmo Responsável igual a uma baixa, dentro de ±tolerancia_dias. A busca
+    inteira do nível é limitada a tempo_max_grupo segundos.
+
+    modo="guloso": cada saída do extrato, na ordem, fica com a melhor baixa livre.
+    modo="otimo": os Níveis 2 e 3 são resolvidos juntos, cada bloco de mesmo
+    valor como uma única atribuição de custo mínimo em que o par vale pela
+    data ou pelo nome (maximiza o número de pares conciliados nos dois níveis;
+    entre atribuições do mesmo tamanho, prefere os pares pela data).
+
+    tolerancia_valor (R$) / tolerancia_valor_pct (% do valor do extrato): nos
+    Níveis 2 e 3, aceita baixas cujo valor difere do lançamento até a maior
+    das duas tolerâncias (tarifas, arredondamento de centavos). Os valores são
+    comparados em centavos inteiros. No modo guloso, os pares de valor exato
+    são formados antes; no ótimo, a diferença de valor é o primeiro critério de
+    custo. O Detalhe informa a diferença ("Δ valor R$ 0,02"). No modo ótimo,
+    faixas largas sobre valores próximos juntam muitos valores em um bloco só
+    (e uma matriz de atribuição maior).
+
+    executor: "serial", "threads" ou "processos". Fora do serial, os Níveis 2
+    e 3 rodam em lotes de blocos de valor independentes, em até
+    `trabalhadores` threads/processos (padrão: núcleos da máquina); o
+    resultado é idêntico ao serial.
+
+    medicoes: lista que recebe, por etapa, tempo, linhas livres que entram e
+    saem, candidatos examinados e comparações fuzzy (ver desempenho.medir).
+    """
+    if modo not in ("guloso", "otimo"):
+        raise ValueError(f"modo inválido: {modo!r} (use 'guloso' ou 'otimo')")
+    if executor not in EXECUTORES:
+        raise ValueError(f"executor inválido: {executor!r} (use um de {EXECUTORES})")
+    if tolerancia_valor < 0 or tolerancia_valor_pct < 0:
+        raise ValueError("as tolerâncias de valor não podem ser negativas")
+
+    with medir(medicoes, "Preparação") as etapa:
+        etapa["Linhas entrada"] = len(df_extrato) + len(df_baixas)
+        # Frames de trabalho só com as colunas que os níveis e o resultado usam
+        # (sem copiar agência, conta, tipos de lançamento...)
+        ext = df_extrato[df_extrato.columns.intersection(_COLUNAS_TRABALHO_EXTRATO, sort=False)]
+        bx = df_baixas[df_baixas.columns.intersection(_COLUNAS_TRABALHO_BAIXAS, sort=False)]
+
+        # Checagem de IDs (os leitores já criam; posicionais para DataFrames montados à mão)
+        if "Id Extrato" not in ext.columns:
+            ext.insert(0, "Id Extrato", range(1, len(ext) + 1))
+        if "Id Baixa" not in bx.columns:
+            bx.insert(0, "Id Baixa", range(1, len(bx) + 1))
+
+        # Apenas saídas no extrato (valores negativos)
+        ext = ext[ext["Valor"] < 0].copy()
+
+        # Módulo dos valores em centavos inteiros (sem ruído de float na
+        # igualdade) e a tolerância de valor de cada saída do extrato
+        ext["_cent"] = _centavos(ext["Valor"])
+        bx["_cent"] = _centavos(bx["Valor Total"])
+        ext["_tol"] = _tolerancia_centavos(ext["_cent"].to_numpy(), tolerancia_valor, tolerancia_valor_pct)
+        aproximar = bool(ext["_tol"].any())
+
+        # Datas
+        ext["Data"] = pd.to_datetime(ext["Data"], errors="coerce")
+        if "Data" in bx.columns:
+            bx["Data"] = pd.to_datetime(bx["Data"], errors="coerce")
+        bx["Data Baixa"] = pd.to_datetime(bx["Data Baixa"], errors="coerce")
+
+        # Flags de conciliação
+        ext["_conc"] = False
+        bx["_conc"] = False
+
+        matches = []  # (i_ext, i_bx, nivel, detalhe)
+        etapa["Linhas saída"] = len(ext) + len(bx)
+
+    # ---------- Nível 0: apelidos aprendidos (consulta direta, sem fuzzy) ----------
+    if apelidos:
+        with medir(medicoes, "Nível 0") as etapa:
+            etapa["Linhas entrada"] = _livres(ext, bx)
+            for i_e, i_b, _, dif, delta in _casar_apelidos(ext, bx, apelidos, tolerancia_dias, etapa):
+                ext.at[i_e, "_conc"] = True
+                bx.at[i_b, "_conc"] = True
+                matches.append((i_e, i_b, "Nível 0 (Apelido)", f"apelido aprendido, Δ {delta} dia(s){_diferenca(dif)}"))
+            etapa["Linhas saída"] = _livres(ext, bx)
+
+    # ---------- Nível 1: valor idêntico (1-para-1) ----------
+    with medir(medicoes, "Nível 1") as etapa:
+        etapa["Linhas entrada"] = _livres(ext, bx)
+        # Agrupa os dois lados livres por valor uma única vez e fica só com os
+        # valores que aparecem exatamente uma vez em cada lado (hash-join).
+        ext_livre = ext[~ext["_conc"]]
+        bx_livre = bx[~bx["_conc"] & (bx["_cent"] >= 0)]
+        cont_e = ext_livre["_cent"].value_counts()
+        cont_b = bx_livre["_cent"].value_counts()
+        unicos = cont_e.index[cont_e == 1].intersection(cont_b.index[cont_b == 1])
+        etapa["Candidatos"] = len(unicos)
+        if len(unicos):
+            e1 = ext_livre[ext_livre["_cent"].isin(unicos)]  # mantém a ordem do extrato
+            b1 = bx_livre[bx_livre["_cent"].isin(unicos)]
+            idx_bx_por_valor = pd.Series(b1.index, index=b1["_cent"])
+            i_bx = e1["_cent"].map(idx_bx_por_valor)
+            ext.loc[e1.index, "_conc"] = True
+            bx.loc[i_bx.values, "_conc"] = True
+            matches.extend(
+                (i_e, i_b, "Nível 1 (Valor)", "Valor idêntico")
+                for i_e, i_b in zip(e1.index, i_bx.values)
+            )
+        etapa["Linhas saída"] = _livres(ext, bx)
+
+    def em_blocos(funcao, *argumentos, etapa):
+        return _em_blocos(funcao, ext, bx, argumentos, executor, trabalhadores, etapa)
+
+    # ---------- Níveis 2 e 3 no modo ótimo: uma atribuição só por bloco ----------
+    if modo == "otimo":
+        with medir(medicoes, "Níveis 2 e 3") as etapa:
+            etapa["Linhas entrada"] = _livres(ext, bx)
+            for i_e, i_b, delta, score, dif, por_data in em_blocos(
+                _casar_otimo, tolerancia_dias, limite_similaridade, etapa=etapa
+            ):
+                ext.at[i_e, "_conc"] = True
+                bx.at[i_b, "_conc"] = True
+                if por_data:
+                    matches.append((i_e, i_b, "Nível 2 (Valor+Data)", f"Δ {delta} dia(s){_diferenca(dif)}"))
+                else:
+                    matches.append((i_e, i_b, "Nível 3 (Valor+Nome)", f"similaridade {score}%{_diferenca(dif)}"))
+            etapa["Linhas saída"] = _livres(ext, bx)
+    else:
+        # ---------- Nível 2: valor + data próxima ----------
+        with medir(medicoes, "Nível 2") as etapa:
+            etapa["Linhas entrada"] = _livres(ext, bx)
+            for i_e, i_b, delta in em_blocos(_casar_valor_data, tolerancia_dias, etapa=etapa):
+                ext.at[i_e, "_conc"] = True
+                bx.at[i_b, "_conc"] = True
+                matches.append((i_e, i_b, "Nível 2 (Valor+Data)", f"Δ {delta} dia(s)"))
+            if aproximar:
+                for i_e, i_b, delta, dif in em_blocos(
+                    _casar_aproximado, "data", tolerancia_dias, limite_similaridade, etapa=etapa
+                ):
+                    ext.at[i_e, "_conc"] = True
+                    bx.at[i_b, "_conc"] = True
+                    matches.append((i_e, i_b, "Nível 2 (Valor+Data)", f"Δ {delta} dia(s){_diferenca(dif)}"))
+            etapa["Linhas saída"] = _livres(ext, bx)
+
+        # ---------- Nível 3: valor + similaridade de nomes ----------
+        with medir(medicoes, "Nível 3") as etapa:
+            etapa["Linhas entrada"] = _livres(ext, bx)
+            for i_e, i_b, score in em_blocos(_casar_valor_nome, limite_similaridade, etapa=etapa):
+                ext.at[i_e, "_conc"] = True
+                bx.at[i_b, "_conc"] = True
+                matches.append((i_e, i_b, "Nível 3 (Valor+Nome)", f"similaridade {score}%"))
+            if aproximar:
+                for i_e, i_b, score, dif in em_blocos(
+                    _casar_aproximado, "nome", tolerancia_dias, limite_similaridade, etapa=etapa
+                ):
+                    ext.at[i_e, "_conc"] = True
+                    bx.at[i_b, "_conc"] = True
+                    matches.append((i_e, i_b, "Nível 3 (Valor+Nome)", f"similaridade {score}%{_diferenca(dif)}"))
+            etapa["Linhas saída"] = _livres(ext, bx)
+
+    # ---------- Nível 3B: nome primeiro (índice de nomes) ----------
+    if nivel_nome:
+        with medir(medicoes, "Nível 3B") as etapa:
+            etapa["Linhas entrada"] = _livres(ext, bx)
+            for i_e, i_b, score, dif, _ in _casar_por_nome(ext, bx, tolerancia_dias, limite_similaridade, etapa):
+                ext.at[i_e, "_conc"] = True
+                bx.at[i_b, "_conc"] = True
+                matches.append((i_e, i_b, "Nível 3B (Nome)", f"similaridade {score}%{_diferenca(dif)}"))
+            etapa["Linhas saída"] = _livres(ext, bx)
+
+    # ---------- Nível 4: soma de várias linhas (muitos-para-um) ----------
+    if agrupar:
+        with medir(medicoes, "Nível 4") as etapa:
+            etapa["Linhas entrada"] = _livres(ext, bx)
+            prazo = time.perf_counter() + tempo_max_grupo
+            n_grupo = 0
+
+            bx_livre = bx[~bx["_conc"]]
+            chave_bx = bx_livre.reindex(columns=["Centro de Resultados", "Responsável"]).astype(object).fillna("")
+            chave_bx = chave_bx.groupby(list(chave_bx.columns), sort=False).ngroup().to_numpy()
+            for i_e, lista_bx in _casar_agrupado(
+                ext[~ext["_conc"]], "Data", bx_livre, "Data Baixa", chave_bx,
+                tolerancia_dias, max_itens_grupo, prazo, etapa,
+            ):
+                n_grupo += 1
+                ext.at[i_e, "_conc"] = True
+                bx.loc[lista_bx, "_conc"] = True
+                detalhe = f"grupo {n_grupo}: {len(lista_bx)} baixas = 1 lançamento"
+                matches.extend((i_e, i_b, "Nível 4 (Agrupado)", detalhe) for i_b in lista_bx)
+
+            ext_livre = ext[~ext["_conc"]]
+            chave_ext = ext_livre.reindex(columns=["Responsável"]).astype(object).fillna("")
+            chave_ext = chave_ext.groupby("Responsável", sort=False).ngroup().to_numpy()
+            for i_b, lista_ext in _casar_agrupado(
+                bx[~bx["_conc"]], "Data Baixa", ext_livre, "Data", chave_ext,
+                tolerancia_dias, max_itens_grupo, prazo, etapa,
+            ):
+                n_grupo += 1
+                bx.at[i_b, "_conc"] = True
+                ext.loc[lista_ext, "_conc"] = True
+                detalhe = f"grupo {n_grupo}: {len(lista_ext)} lançamentos = 1 baixa"
+                matches.extend((i_e, i_b, "Nível 4 (Agrupado)", detalhe) for i_e in lista_ext)
+            etapa["Linhas saída"] = _livres(ext, bx)
+
+    # ---------- Montagem do resultado ----------
+    with medir(medicoes, "Montagem") as etapa:
+        etapa["Linhas entrada"] = len(ext) + len(bx)
+        # Três blocos colunares (pares conciliados, só extrato, só baixas) no
+        # mesmo esquema, concatenados de uma vez.
+        i_ext = [m[0] for m in matches]
+        i_bx = [m[1] for m in matches]
+        conciliados = pd.concat(
+            [_colunas_extrato(ext, i_ext), _colunas_baixas(bx, i_bx)], axis=1
+        ).assign(**{
+            "Status": "✅ Conciliado",
+            "Nível Conciliação": [m[2] for m in matches],
+            "Detalhe": [m[3] for m in matches],
+        })
+        so_extrato = _colunas_extrato(ext, ext.index[~ext["_conc"]]).assign(Status="❌ Só no Extrato")
+        so_baixas = _colunas_baixas(bx, bx.index[~bx["_conc"]]).assign(Status="⚠️ Só nas Baixas")
+
+        res = _finalizar_resultado([conciliados, so_extrato, so_baixas])
+        etapa["Linhas saída"] = len(res)
+    return res
+
+
+# ============================================
+# Conciliação incremental
+# ============================================
+COLUNAS_PARES = ["Id Extrato", "Id Baixa", "Nível Conciliação", "Detalhe"]
+
+
+def pares_conciliados(res: pd.DataFrame) -> pd.DataFrame:
+    """Pares (Id Extrato, Id Baixa, nível, detalhe) de um resultado de conciliar_multi_nivel."""
+    return res.loc[res["Status"] == "✅ Conciliado", COLUNAS_PARES].reset_index(drop=True)
+
+
+def conciliar_incremental(
+    df_extrato: pd.DataFrame,
+    df_baixas: pd.DataFrame,
+    pares_anteriores: pd.DataFrame | None = None,
+    **parametros,
+) -> tuple:
+    """
+    Concilia só o que ainda está em aberto: linhas cujo Id já aparece em
+    pares_anteriores ficam de fora dos níveis, e o resultado traz esses pares
+    de volta como conciliados (com o nível e o detalhe da época).
+
+    Os Ids precisam ser estáveis entre execuções (os que os leitores geram),
+    não posicionais. `parametros` vão para conciliar_multi_nivel.
+
+    Retorna (resultado no formato de conciliar_multi_nivel, pares acumulados
+    para a próxima execução).
+    """
+    for df, col in ((df_extrato, "Id Extrato"), (df_baixas, "Id Baixa")):
+        if col not in df.columns:
+            raise ValueError(f"conciliação incremental requer a coluna {col!r} com Ids estáveis")
+    if pares_anteriores is None:
+        pares_anteriores = pd.DataFrame(columns=COLUNAS_PARES)
+
+    fechado_ext = df_extrato["Id Extrato"].isin(pares_anteriores["Id Extrato"])
+    fechado_bx = df_baixas["Id Baixa"].isin(pares_anteriores["Id Baixa"])
+    novo = conciliar_multi_nivel(df_extrato[~fechado_ext], df_baixas[~fechado_bx], **parametros)
+
+    # Pares antigos que envolvem alguma linha desta execução
+    antigos = pares_anteriores[
+        pares_anteriores["Id Extrato"].isin(df_extrato["Id Extrato"])
+        | pares_anteriores["Id Baixa"].isin(df_baixas["Id Baixa"])
+    ]
+    ext = df_extrato[fechado_ext]
+    bx = df_baixas[fechado_bx]
+    bloco_antigo = (
+        antigos[COLUNAS_PARES]
+        .merge(_colunas_extrato(ext, ext.index).drop_duplicates("Id Extrato"), on="Id Extrato", how="left")
+        .merge(_colunas_baixas(bx, bx.index).drop_duplicates("Id Baixa"), on="Id Baixa", how="left")
+        .assign(Status="✅ Conciliado")
+    )
+
+    res = _finalizar_resultado([bloco_antigo, novo.drop(columns=["Id Conciliado"])])
+    pares = pd.concat([pares_anteriores[COLUNAS_PARES], pares_conciliados(novo)], ignore_index=True)
+    return res, pares.drop_duplicates(["Id Extrato", "Id Baixa"], ignore_index=True)
@@ -0,0 +1,343 @@
+# ============================================
+# Conciliação em lote (linha de comando)
+# ============================================
+# Uso:
+#   python conciliar_lote.py --extratos extratos/ --baixas baixas/ --saida resultados/
+#   python conciliar_lote.py --extratos "extratos/**/*.xlsx" --baixas "baixas/*.csv" --parear conta
+#
+# Cada extrato é pareado com um arquivo de baixas e os pares são conciliados em
+# paralelo (um processo por par). A saída tem um arquivo por par e o resumo.csv.
+#
+# Desempenho: saida/desempenho.jsonl recebe uma linha JSON por etapa (leitura
+# de cada arquivo, níveis da conciliação e exportação de cada par); com
+# --log-json as mesmas linhas também vão para o stderr.
+#
+# Apelidos: com --base e --apelidos, os pares de nomes conciliados por
+# similaridade de nomes (Níveis 3 e 3B) ficam em <base>/apelidos.parquet e,
+# nas execuções seguintes, o Nível 0 concilia por esses apelidos antes de
+# qualquer comparação fuzzy. Cada par de Ids confirma um apelido uma vez só.
+#
+# Pareamento:
+#   data  -> o arquivo de baixas com mais Data Baixa dentro do período do
+#            extrato (± tolerância)
+#   conta -> só arquivos de baixas cujo caminho (nome ou pasta) contém o
+#            número da conta do extrato; entre eles, o de melhor data
+import argparse
+import glob
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from conciliador import EXECUTORES, conciliar_incremental, conciliar_multi_nivel
+from desempenho import linhas_json
+from exportacao import FORMATOS_RESULTADO, arquivo_resultado, csv_bytes
+from leitor_baixas import processar_baixas
+from leitores_extrato import ler_extrato
+from nomes import atualizar_apelidos, dicionario_apelidos, nomes_conciliados
+
+EXTENSOES_EXTRATO = (".xlsx", ".xls", ".csv")
+EXTENSOES_BAIXAS = (".csv",)
+
+
+def listar_arquivos(padroes, extensoes) -> list:
+    """Expande diretórios (arquivos com as extensões dadas) e globs em caminhos, sem repetição."""
+    arquivos = set()
+    for padrao in padroes:
+        if os.path.isdir(padrao):
+            candidatos = [p for p in Path(padrao).iterdir() if p.is_file()]
+        else:
+            candidatos = [Path(p) for p in glob.glob(padrao, recursive=True)]
+        arquivos.update(p for p in candidatos if p.suffix.lower() in extensoes)
+    return sorted(arquivos)
+
+
+def _ler(tipo: str, caminho: Path):
+    """(caminho, DataFrame, erro, medições) — roda num processo do pool."""
+    medicoes = []
+    try:
+        if tipo == "extrato":
+            df = ler_extrato(str(caminho), medicoes=medicoes)
+        else:
+            df = processar_baixas(str(caminho), medicoes=medicoes)
+        return caminho, df, None, medicoes
+    except Exception as e:
+        return caminho, None, f"{type(e).__name__}: {e}", medicoes
+
+
+def _conta(df_extrato: pd.DataFrame):
+    if "Conta" not in df_extrato.columns or df_extrato.empty:
+        return None
+    digitos = re.sub(r"\D", "", str(df_extrato["Conta"].iloc[0]))
+    return digitos or None
+
+
+def parear(extratos: dict, baixas: dict, criterio: str = "data", tolerancia_dias: int = 3) -> list:
+    """
+    [(caminho do extrato, caminho das baixas ou None)] na ordem dos extratos.
+
+    Um mesmo arquivo de baixas pode servir a vários extratos (contas diferentes
+    no mesmo dia). Empates ficam com o primeiro arquivo em ordem alfabética.
+    """
+    if criterio not in ("data", "conta"):
+        raise ValueError(f"critério de pareamento inválido: {criterio!r} (use 'data' ou 'conta')")
+
+    datas_baixa = {c: df["Data Baixa"].dropna() for c, df in baixas.items() if "Data Baixa" in df.columns}
+    tolerancia = pd.Timedelta(days=tolerancia_dias)
+
+    pares = []
+    for caminho, df_ext in extratos.items():
+        candidatos = list(baixas)
+        if criterio == "conta":
+            conta = _conta(df_ext)
+            candidatos = [c for c in candidatos if conta and conta in re.findall(r"\d+", str(c))]
+
+        datas = df_ext["Data"].dropna()
+        melhor, melhor_n = None, 0
+        if len(datas):
+            inicio, fim = datas.min() - tolerancia, datas.max() + tolerancia
+            for c in candidatos:
+                d = datas_baixa.get(c, pd.Series(dtype="datetime64[ns]"))
+                n = int(d.between(inicio, fim).sum())
+                if n > melhor_n:
+                    melhor, melhor_n = c, n
+        if melhor is None and criterio == "conta" and candidatos:
+            melhor = candidatos[0]
+        pares.append((caminho, melhor))
+    return pares
+
+
+def _conciliar_par(
+    caminho_ext,
+    df_ext,
+    caminho_bx,
+    df_bx,
+    parametros: dict,
+    saida: Path,
+    formato: str,
+    pares_anteriores=None,
+    aprender: bool = False,
+) -> tuple:
+    """
+    Concilia um par e grava o resultado; devolve (linha do resumo, pares
+    conciliados ou None, medições, pares de nomes conciliados ou None). Com
+    pares_anteriores, a conciliação é incremental; com aprender=True, os pares
+    de nomes conciliados nesta execução (nomes.nomes_conciliados) voltam para
+    a tabela de apelidos. Roda num processo do pool.
+    """
+    inicio = time.perf_counter()
+    datas = df_ext["Data"].dropna()
+    linha = {
+        "Extrato": str(caminho_ext),
+        "Baixas": str(caminho_bx),
+        "Conta": _conta(df_ext),
+        "Data Inicial": datas.min() if len(datas) else None,
+        "Data Final": datas.max() if len(datas) else None,
+        "Saídas Extrato": int((df_ext["Valor"] < 0).sum()),
+        "Registros Baixas": len(df_bx),
+    }
+    pares = nomes = None
+    medicoes = []
+    try:
+        if pares_anteriores is None:
+            res = conciliar_multi_nivel(df_ext, df_bx, medicoes=medicoes, **parametros)
+        else:
+            res, pares = conciliar_incremental(df_ext, df_bx, pares_anteriores, medicoes=medicoes, **parametros)
+        destino = saida / f"{Path(caminho_ext).stem}__{Path(caminho_bx).stem}.{formato}"
+        destino.write_bytes(arquivo_resultado(formato, res, df_ext, df_bx, medicoes=medicoes))
+        if aprender:
+            nomes = nomes_conciliados(res)
+            if pares_anteriores is not None:
+                # Pares de execuções anteriores já foram aprendidos quando conciliados
+                nomes = nomes[~nomes["Id Extrato"].isin(pares_anteriores["Id Extrato"])]
+        linha.update({
+            "Conciliados": int((res["Status"] == "✅ Conciliado").sum()),
+            "Só no Extrato": int((res["Status"] == "❌ Só no Extrato").sum()),
+            "Só nas Baixas": int((res["Status"] == "⚠️ Só nas Baixas").sum()),
+            "Arquivo": str(destino),
+        })
+    except Exception as e:
+        linha["Erro"] = f"{type(e).__name__}: {e}"
+    linha["Tempo (s)"] = round(time.perf_counter() - inicio, 3)
+    return linha, pares, medicoes, nomes
+
+
+COLUNAS_RESUMO = [
+    "Extrato", "Baixas", "Conta", "Data Inicial", "Data Final",
+    "Saídas Extrato", "Registros Baixas", "Conciliados", "Só no Extrato", "Só nas Baixas",
+    "Arquivo", "Tempo (s)", "Erro",
+]
+
+
+def conciliar_lote(
+    extratos,
+    baixas,
+    saida,
+    parear_por: str = "data",
+    formato: str = "xlsx",
+    processos: int | None = None,
+    base=None,
+    incremental: bool = False,
+    apelidos: bool = False,
+    log_json: bool = False,
+    **parametros,
+) -> pd.DataFrame:
+    """
+    Lê, pareia e concilia todos os arquivos; grava um resultado por par e
+    saida/resumo.csv. `extratos` e `baixas` são listas de diretórios ou globs;
+    `parametros` vão para conciliar_multi_nivel. Com `base` (diretório), os
+    arquivos lidos também são acrescentados à base Parquet (armazenamento.py).
+    incremental=True (requer `base`) usa os pares já conciliados guardados na
+    base: só as linhas em aberto passam pelos níveis. apelidos=True (requer
+    `base`) liga o Nível 0 com a tabela de apelidos da base e, no fim,
+    acrescenta a ela os pares de nomes conciliados (ver
+    nomes.nomes_conciliados). As medições de cada etapa
+    vão para saida/desempenho.jsonl (e para o stderr com log_json=True).
+    Retorna o resumo.
+    """
+    if incremental and base is None:
+        raise ValueError("a conciliação incremental requer uma base (base=...)")
+    if apelidos and base is None:
+        raise ValueError("os apelidos aprendidos requerem uma base (base=...)")
+    if formato not in FORMATOS_RESULTADO:
+        raise ValueError(f"formato inválido: {formato!r} (use um de {FORMATOS_RESULTADO})")
+    saida = Path(saida)
+    saida.mkdir(parents=True, exist_ok=True)
+
+    arquivos_ext = listar_arquivos(extratos, EXTENSOES_EXTRATO)
+    arquivos_bx = listar_arquivos(baixas, EXTENSOES_BAIXAS)
+
+    resumo = []
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        lidos = list(pool.map(
+            _ler,
+            ["extrato"] * len(arquivos_ext) + ["baixas"] * len(arquivos_bx),
+            arquivos_ext + arquivos_bx,
+        ))
+        dfs_ext, dfs_bx = {}, {}
+        desempenho = []
+        for i, (caminho, df, erro, medicoes) in enumerate(lidos):
+            desempenho += linhas_json(medicoes, Arquivo=str(caminho))
+            if erro:
+                resumo.append({("Extrato" if i < len(arquivos_ext) else "Baixas"): str(caminho), "Erro": erro})
+            else:
+                (dfs_ext if i < len(arquivos_ext) else dfs_bx)[caminho] = df
+
+        pares_anteriores = None
+        if base is not None:
+            from armazenamento import gravar_baixas, gravar_extrato, gravar_pares, ler_pares
+
+            for df in dfs_ext.values():
+                gravar_extrato(df, base)
+            for df in dfs_bx.values():
+                gravar_baixas(df, base)
+            if incremental:
+                pares_anteriores = ler_pares(base)
+            if apelidos:
+                from armazenamento import gravar_apelidos, ler_apelidos
+
+                tabela_apelidos = ler_apelidos(base)
+                parametros["apelidos"] = dicionario_apelidos(tabela_apelidos)
+
+        tarefas = []
+        for caminho_ext, caminho_bx in parear(
+            dfs_ext, dfs_bx, parear_por, parametros.get("tolerancia_dias", 3)
+        ):
+            if caminho_bx is None:
+                resumo.append({"Extrato": str(caminho_ext), "Erro": "sem arquivo de baixas correspondente"})
+                continue
+            df_ext, df_bx = dfs_ext[caminho_ext], dfs_bx[caminho_bx]
+            pares_do_par = None
+            if pares_anteriores is not None:
+                pares_do_par = pares_anteriores[
+                    pares_anteriores["Id Extrato"].isin(df_ext["Id Extrato"])
+                    | pares_anteriores["Id Baixa"].isin(df_bx["Id Baixa"])
+                ]
+            tarefas.append(pool.submit(
+                _conciliar_par, caminho_ext, df_ext, caminho_bx, df_bx,
+                parametros, saida, formato, pares_do_par, apelidos,
+            ))
+        concluidas = [t.result() for t in tarefas]
+        resumo = [linha for linha, _, _, _ in concluidas] + resumo
+        for linha, _, medicoes, _ in concluidas:
+            desempenho += linhas_json(medicoes, Extrato=linha["Extrato"], Baixas=linha["Baixas"])
+
+    (saida / "desempenho.jsonl").write_text("".join(f"{d}\n" for d in desempenho), encoding="utf-8")
+    if log_json:
+        for d in desempenho:
+            print(d, file=sys.stderr)
+
+    if pares_anteriores is not None:
+        novos = [p for _, p, _, _ in concluidas if p is not None]
+        todos = pd.concat([pares_anteriores, *novos], ignore_index=True)
+        gravar_pares(todos.drop_duplicates(["Id Extrato", "Id Baixa"], ignore_index=True), base)
+    if apelidos:
+        observados = [n for _, _, _, n in concluidas if n is not None]
+        if observados:
+            tabela_apelidos = atualizar_apelidos(tabela_apelidos, pd.concat(observados, ignore_index=True))
+        gravar_apelidos(tabela_apelidos, base)
+
+    df_resumo = pd.DataFrame(resumo).reindex(columns=COLUNAS_RESUMO).astype({
+        c: "Int64" for c in ["Saídas Extrato", "Registros Baixas", "Conciliados", "Só no Extrato", "Só nas Baixas"]
+    })
+    (saida / "resumo.csv").write_bytes(csv_bytes(df_resumo))
+    return df_resumo
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concilia em lote extratos Santander com relações de baixas.")
+    parser.add_argument("--extratos", nargs="+", required=True, help="diretórios ou globs de extratos (.xlsx/.xls/.csv)")
+    parser.add_argument("--baixas", nargs="+", required=True, help="diretórios ou globs de relações de baixas (.csv)")
+    parser.add_argument("--saida", default="resultados", help="diretório dos resultados (padrão: resultados)")
+    parser.add_argument("--parear", choices=["data", "conta"], default="data")
+    parser.add_argument("--formato", choices=FORMATOS_RESULTADO, default="xlsx")
+    parser.add_argument("--processos", type=int, default=None, help="processos em paralelo (padrão: núcleos da máquina)")
+    parser.add_argument("--tolerancia-dias", type=int, default=3)
+    parser.add_argument("--limite-similaridade", type=int, default=85)
+    parser.add_argument("--modo", choices=["guloso", "otimo"], default="guloso")
+    parser.add_argument("--agrupar", action="store_true", help="habilita o Nível 4 (somas)")
+    parser.add_argument("--executor", choices=EXECUTORES, default="serial",
+                        help="execução dos Níveis 2 e 3 em blocos de valor (padrão: serial)")
+    parser.add_argument("--trabalhadores", type=int, default=None,
+                        help="threads/processos por conciliação com --executor (padrão: núcleos da máquina)")
+    parser.add_argument("--nivel-nome", action="store_true",
+                        help="habilita o Nível 3B (nome primeiro, pelo índice de nomes normalizados)")
+    parser.add_argument("--tolerancia-valor", type=float, default=0.0,
+                        help="diferença de valor aceita nos Níveis 2 e 3, em R$ (padrão: 0)")
+    parser.add_argument("--tolerancia-valor-pct", type=float, default=0.0,
+                        help="diferença de valor aceita nos Níveis 2 e 3, em %% do valor do extrato (padrão: 0)")
+    parser.add_argument("--base", default=None, help="acrescenta os arquivos lidos à base Parquet neste diretório")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reaproveita os pares já conciliados guardados na base (requer --base)")
+    parser.add_argument("--apelidos", action="store_true",
+                        help="usa e atualiza os apelidos de nomes aprendidos na base, Nível 0 (requer --base)")
+    parser.add_argument("--log-json", action="store_true",
+                        help="escreve no stderr uma linha JSON por etapa (tempo, linhas, candidatos, comparações)")
+    args = parser.parse_args()
+
+    resumo = conciliar_lote(
+        args.extratos, args.baixas, args.saida,
+        parear_por=args.parear,
+        formato=args.formato,
+        processos=args.processos,
+        base=args.base,
+        incremental=args.incremental,
+        apelidos=args.apelidos,
+        log_json=args.log_json,
+        tolerancia_dias=args.tolerancia_dias,
+        limite_similaridade=args.limite_similaridade,
+        modo=args.modo,
+        agrupar=args.agrupar,
+        executor=args.executor,
+        trabalhadores=args.trabalhadores,
+        tolerancia_valor=args.tolerancia_valor,
+        tolerancia_valor_pct=args.tolerancia_valor_pct,
+        nivel_nome=args.nivel_nome,
+    )
+    with pd.option_context("display.width", 200, "display.max_colwidth", 50):
+        print(resumo.drop(columns=["Arquivo"]).to_string(index=False))
+    sys.exit(1 if resumo["Erro"].notna().any() else 0)
@@ -0,0 +1,72 @@
+# ============================================
+# Medição de desempenho por etapa
+# ============================================
+# As funções medidas recebem `medicoes` (uma lista, ou None para não medir) e
+# envolvem cada etapa em `with medir(medicoes, "Nome"):`. Cada etapa vira um
+# dict na lista, com o tempo de parede, os contadores que a etapa preencher
+# (linhas que entram e saem, candidatos examinados, comparações fuzzy) e, se o
+# tracemalloc estiver ligado, o pico de memória alocada durante a etapa.
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Picos das etapas abertas, de fora para dentro: uma etapa interna zera o pico
+# do tracemalloc, então antes disso o pico atual é repassado às de fora
+_picos_abertos = []
+
+
+@contextmanager
+def medir(medicoes, etapa: str, **info):
+    """
+    Mede o bloco como a etapa `etapa` e acrescenta o registro a `medicoes`
+    (nada é medido se medicoes for None). Devolve o dict do registro, para o
+    bloco acrescentar contadores.
+    """
+    registro = {"Etapa": etapa, **info}
+    if medicoes is None:
+        yield registro
+        return
+
+    memoria = tracemalloc.is_tracing()
+    if memoria:
+        inicial, pico = tracemalloc.get_traced_memory()
+        for aberto in _picos_abertos:
+            aberto[0] = max(aberto[0], pico)
+        tracemalloc.reset_peak()
+        _picos_abertos.append([inicial])
+    inicio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro["Tempo (s)"] = time.perf_counter() - inicio
+        if memoria:
+            _, pico = tracemalloc.get_traced_memory()
+            pico = max(_picos_abertos.pop()[0], pico)
+            for aberto in _picos_abertos:
+                aberto[0] = max(aberto[0], pico)
+            registro["Pico memória (MB)"] = (pico - inicial) / 2**20
+        medicoes.append(registro)
+
+
+# Colunas da tabela de desempenho, na ordem em que aparecem (app e CLI)
+COLUNAS_DESEMPENHO = [
+    "Etapa", "Linhas entrada", "Linhas saída", "Candidatos", "Comparações fuzzy",
+    "Tempo (s)", "Pico memória (MB)",
+]
+_CONTADORES = ["Linhas entrada", "Linhas saída", "Candidatos", "Comparações fuzzy"]
+
+
+def tabela_desempenho(medicoes: list) -> pd.DataFrame:
+    """Medições -> DataFrame em COLUNAS_DESEMPENHO (contadores inteiros; sem colunas vazias extras)."""
+    df = pd.DataFrame(medicoes)
+    extras = [c for c in df.columns if c not in COLUNAS_DESEMPENHO]
+    df = df.reindex(columns=COLUNAS_DESEMPENHO + extras).astype({c: "Int64" for c in _CONTADORES})
+    return df.drop(columns=[c for c in ("Pico memória (MB)", *extras) if df[c].isna().all()])
+
+
+def linhas_json(medicoes: list, **contexto) -> list:
+    """Uma linha JSON por etapa (log estruturado), com os campos de `contexto` em todas."""
+    return [json.dumps({**m, **contexto}, ensure_ascii=False, default=str) for m in medicoes]
@@ -0,0 +1,172 @@
+# ============================================
+# Exportação (Excel / CSV / Parquet)
+# ============================================
+# Datas e valores vão para a planilha como tipos nativos (data e número com
+# formato de moeda), sem converter colunas para texto antes de escrever.
+import importlib.util
+import io
+
+import pandas as pd
+
+from desempenho import medir
+
+FORMATO_DATA = "dd/mm/yyyy"
+FORMATO_MOEDA = '"R$" #,##0.00;-"R$" #,##0.00'
+COLUNAS_MOEDA = {"Valor", "Valor Total", "Valor Extrato", "Valor Baixa"}
+
+ENGINES_EXCEL = ("xlsxwriter", "openpyxl")
+_LINHAS_POR_BLOCO = 10_000
+
+
+# Ordem das colunas do conciliado no arquivo exportado
+COLUNAS_EXPORTACAO = [
+    "Id Conciliado",
+    "Status", "Nível Conciliação", "Detalhe",
+    "Id Extrato", "Data Extrato", "Doc Extrato", "Responsável Extrato", "Valor Extrato",
+    "Id Baixa", "Data Lançamento", "Data Baixa", "Doc Baixa", "Responsável Baixa", "Valor Baixa",
+]
+
+
+def baixas_para_exportar(df_baixas: pd.DataFrame) -> pd.DataFrame:
+    return df_baixas.drop(columns=["Valor_Abs"], errors="ignore")
+
+
+def resultado_para_exportar(res: pd.DataFrame) -> pd.DataFrame:
+    res = res.reindex(columns=COLUNAS_EXPORTACAO)
+    # Ids numéricos com lacunas viram float no resultado; no arquivo ficam inteiros
+    ids = [c for c in ("Id Extrato", "Id Baixa") if pd.api.types.is_float_dtype(res[c])]
+    return res.astype({c: "Int64" for c in ids})
+
+
+def engines_excel_disponiveis() -> list:
+    """Engines de ENGINES_EXCEL instaladas, da mais rápida para a mais lenta."""
+    return [e for e in ENGINES_EXCEL if importlib.util.find_spec(e) is not None]
+
+
+def _colunas_data(df: pd.DataFrame) -> list:
+    return [i for i, c in enumerate(df.columns) if pd.api.types.is_datetime64_any_dtype(df[c])]
+
+
+def _colunas_moeda(df: pd.DataFrame) -> list:
+    return [i for i, c in enumerate(df.columns) if c in COLUNAS_MOEDA]
+
+
+def _serial_excel(datas: pd.Series) -> pd.Series:
+    """Datas -> dias desde 30/12/1899 (número serial do Excel); NaT vira NaN."""
+    return (datas - pd.Timestamp("1899-12-30")) / pd.Timedelta(days=1)
+
+
+def _escrever_xlsxwriter(buf, abas: dict) -> None:
+    """
+    Escrita linha a linha no modo constant_memory do xlsxwriter: cada linha vai
+    para o disco assim que é escrita, e o DataFrame é convertido para objetos
+    Python em blocos de _LINHAS_POR_BLOCO linhas.
+    """
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(buf, {
+        "constant_memory": True,
+        "default_date_format": FORMATO_DATA,
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+    })
+    negrito = wb.add_format({"bold": True})
+    fmt_data = wb.add_format({"num_format": FORMATO_DATA})
+    fmt_moeda = wb.add_format({"num_format": FORMATO_MOEDA})
+
+    for nome, df in abas.items():
+        ws = wb.add_worksheet(nome)
+        for i in _colunas_data(df):
+            ws.set_column(i, i, 12, fmt_data)
+        for i in _colunas_moeda(df):
+            ws.set_column(i, i, 14, fmt_moeda)
+
+        ws.write_row(0, 0, [str(c) for c in df.columns], negrito)
+        datas = {df.columns[i] for i in _colunas_data(df)}
+        for inicio in range(0, len(df), _LINHAS_POR_BLOCO):
+            bloco = df.iloc[inicio:inicio + _LINHAS_POR_BLOCO]
+            # Datas como número serial do Excel; o formato vem da coluna
+            bloco = bloco.assign(**{c: _serial_excel(bloco[c]) for c in datas})
+            valores = bloco.astype(object).where(bloco.notna(), None).to_numpy()
+            for r, linha in enumerate(valores, start=inicio + 1):
+                ws.write_row(r, 0, linha)
+    wb.close()
+
+
+def _escrever_openpyxl(buf, abas: dict) -> None:
+    with pd.ExcelWriter(buf, engine="openpyxl") as wr:
+        for nome, df in abas.items():
+            df.to_excel(wr, index=False, sheet_name=nome)
+            ws = wr.sheets[nome]
+            formatos = {i: FORMATO_DATA for i in _colunas_data(df)}
+            formatos.update({i: FORMATO_MOEDA for i in _colunas_moeda(df)})
+            for i, formato in formatos.items():
+                for (celula,) in ws.iter_rows(min_row=2, min_col=i + 1, max_col=i + 1):
+                    celula.number_format = formato
+
+
+def excel_bytes(abas: dict, engine: str = "auto") -> bytes:
+    """
+    Gera um .xlsx com uma aba por item de `abas` ({nome da aba: DataFrame}).
+
+    engine: "auto" (xlsxwriter se instalado, senão openpyxl) ou um nome de
+    ENGINES_EXCEL.
+    """
+    disponiveis = engines_excel_disponiveis()
+    if engine == "auto":
+        if not disponiveis:
+            raise ImportError(f"Nenhuma engine de Excel instalada (use uma de {ENGINES_EXCEL})")
+        engine = disponiveis[0]
+    elif engine not in ENGINES_EXCEL:
+        raise ValueError(f"engine inválida: {engine!r} (use 'auto' ou uma de {ENGINES_EXCEL})")
+
+    buf = io.BytesIO()
+    if engine == "xlsxwriter":
+        _escrever_xlsxwriter(buf, abas)
+    else:
+        _escrever_openpyxl(buf, abas)
+    return buf.getvalue()
+
+
+def csv_bytes(df: pd.DataFrame) -> bytes:
+    """CSV no padrão do Excel brasileiro: ';', vírgula decimal e datas dd/mm/aaaa."""
+    return df.to_csv(
+        index=False, sep=";", decimal=",", date_format="%d/%m/%Y"
+    ).encode("utf-8-sig")
+
+
+def parquet_bytes(df: pd.DataFrame) -> bytes:
+    buf = io.BytesIO()
+    df.to_parquet(buf, index=False)
+    return buf.getvalue()
+
+
+FORMATOS_RESULTADO = ("xlsx", "csv", "parquet")
+
+
+def arquivo_resultado(
+    formato: str, res: pd.DataFrame, df_extrato: pd.DataFrame, df_baixas: pd.DataFrame, medicoes: list = None
+) -> bytes:
+    """
+    Resultado da conciliação no formato pedido: "xlsx" leva 3 abas
+    (Conciliado, Extrato, Baixas); "csv" e "parquet", só o conciliado.
+    medicoes: ver desempenho.medir.
+    """
+    if formato not in FORMATOS_RESULTADO:
+        raise ValueError(f"formato inválido: {formato!r} (use um de {FORMATOS_RESULTADO})")
+    with medir(medicoes, f"Exportação ({formato})") as etapa:
+        conciliado = resultado_para_exportar(res)
+        if formato == "csv":
+            dados = csv_bytes(conciliado)
+        elif formato == "parquet":
+            dados = parquet_bytes(conciliado)
+        else:
+            abas = {
+                "Conciliado": conciliado,
+                "Extrato": df_extrato,
+                "Baixas": baixas_para_exportar(df_baixas),
+            }
+            etapa["Linhas entrada"] = sum(len(df) for df in abas.values())
+            dados = excel_bytes(abas)
+        etapa.setdefault("Linhas entrada", len(conciliado))
+    return dados
@@ -0,0 +1,45 @@
+# ============================================
+# Identificadores estáveis de linha
+# ============================================
+# O Id de uma linha sai do conteúdo dela (não da posição no arquivo), então a
+# mesma linha tem o mesmo Id quando o export é baixado de novo, com linhas a
+# mais ou em outra ordem. Linhas idênticas recebem um contador de ocorrência.
+import numpy as np
+import pandas as pd
+from pandas.util import hash_array, hash_pandas_object
+
+
+def _canonica(serie: pd.Series) -> np.ndarray:
+    """Representação da coluna que não depende do dtype com que ela foi lida."""
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie.to_numpy(dtype="datetime64[ns]").view("int64")
+    if pd.api.types.is_float_dtype(serie):
+        # Valores em centavos (evita 0.1 + 0.2 != 0.3); NaN vira um sentinela
+        centavos = np.rint(serie.to_numpy(dtype=float, na_value=np.nan) * 100)
+        return np.where(np.isnan(centavos), np.iinfo(np.int64).min, centavos).astype(np.int64)
+    texto = serie.astype(str).to_numpy(dtype=object)
+    texto[serie.isna().to_numpy()] = "\x00"
+    return texto
+
+
+def ids_estaveis(df: pd.DataFrame, colunas: list) -> pd.Series:
+    """
+    Id hexadecimal de 16 dígitos a partir de `colunas` (as ausentes contam como
+    vazias); a 2ª, 3ª... ocorrência de uma linha idêntica ganha "#2", "#3"...
+    """
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+    # Hash por coluna (arrays numpy, sem voltar para Series de texto) e depois
+    # um hash da linha de hashes
+    vazia = np.full(len(df), "\x00", dtype=object)
+    hashes = pd.DataFrame(
+        {c: hash_array(_canonica(df[c]) if c in df.columns else vazia) for c in colunas}
+    )
+    h = hash_pandas_object(hashes, index=False).to_numpy()
+    ocorrencia = pd.Series(h).groupby(h, sort=False).cumcount().to_numpy()
+
+    hexa = h.astype(">u8").tobytes().hex()
+    ids = np.array([hexa[i:i + 16] for i in range(0, len(hexa), 16)], dtype=object)
+    dup = ocorrencia > 0
+    ids[dup] = ids[dup] + "#" + (ocorrencia[dup] + 1).astype(str).astype(object)
+    return pd.Series(ids, index=df.index)
@@ -1,14 +1,53 @@
 ﻿from __future__ import annotations
 
+import csv
+import io
+import re
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
+import numpy as np
 import pandas as pd
 
+from desempenho import medir
+from identificadores import ids_estaveis
 
-def _read_file_content(file_source: Any) -> str:
+COLUNAS_BAIXAS = [
+    "Centro de Resultados",
+    "Data",
+    "Lancamento",
+    "Conta",
+    "Responsável",
+    "Documento",
+    "Valor Total",
+    "Data Baixa",
+    "Lancamento Baixa",
+]
+
+# Coluna de Id que processar_baixas põe na frente de COLUNAS_BAIXAS. Lancamento
+# e Lancamento Baixa são o tipo do lançamento (repetem em quase todas as
+# linhas), então o Id usa o registro inteiro
+ID_BAIXA = "Id Baixa"
+CAMPOS_ID_BAIXA = COLUNAS_BAIXAS
+
+# Colunas com poucos valores distintos, repetidos em quase todas as linhas:
+# ficam como category (um código inteiro por linha em vez do texto)
+COLUNAS_CATEGORIA_BAIXAS = ["Centro de Resultados", "Conta", "Lancamento", "Lancamento Baixa"]
+
+_LINHAS_CABECALHO = 5
+_PREFIXOS_IGNORADOS = ("Data", "Subtotal", "Sistema Posto Delta", "Total")
+
+# Terminadores de linha de str.splitlines e espaços de str.strip em latin1
+_FIM_DE_LINHA = re.compile(rb"\r\n|[\n\r\x0b\x0c\x1c\x1d\x1e\x85]")
+_BYTES_FIM_DE_LINHA = (10, 11, 12, 13, 28, 29, 30, 133)
+_EH_ESPACO = np.zeros(256, dtype=bool)  # espaço, tab, \x1f e \xa0
+_EH_ESPACO[[9, 31, 32, 160]] = True
+
+
+def _read_raw(file_source: Any) -> bytes | str:
     if isinstance(file_source, (str, Path)):
-        with open(file_source, "r", encoding="latin1") as handle:
+        with open(file_source, "rb") as handle:
             return handle.read()
 
     if hasattr(file_source, "getvalue"):
@@ -18,22 +57,106 @@ def _read_file_content(file_source: Any) -> str:
             file_source.seek(0)
         data = file_source.read()
 
-    if isinstance(data, bytes):
-        return data.decode("latin1")
-
-    if isinstance(data, str):
+    if isinstance(data, (bytes, str)):
         return data
 
     raise TypeError("Unsupported file_source type for processar_baixas")
 
 
-def processar_baixas(file_source) -> pd.DataFrame:
-    linhas = _read_file_content(file_source).splitlines()
+def _pular_linhas(data: bytes, n: int) -> int:
+    """Posição (em bytes) logo após as `n` primeiras linhas (como str.splitlines)."""
+    pos = 0
+    for _ in range(n):
+        fim = _FIM_DE_LINHA.search(data, pos)
+        if fim is None:
+            return len(data)
+        pos = fim.end()
+    return pos
+
+
+def _linhas_uteis(data: bytes) -> tuple[bytes, np.ndarray]:
+    """
+    Prepara os bytes para o parser C sem decodificar nada em Python:
+
+    - descarta as linhas que a leitura linha a linha ignoraria de cara:
+      primeiro campo vazio (";;;;", linhas em branco) ou começando por
+      Data/Subtotal/Total/Sistema Posto Delta;
+    - remove os espaços nas pontas de cada campo (o mesmo que str.strip);
+    - normaliza todos os terminadores de str.splitlines para "\n".
+
+    Retorna os bytes resultantes e a quantidade de campos de cada linha.
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if buf.size == 0:
+        return b"", np.zeros(0, dtype=np.int64)
+
+    fim_linha = (
+        (buf == 10) | ((buf >= 11) & (buf <= 13)) | ((buf >= 28) & (buf <= 30)) | (buf == 133)
+    )
+    pos_fim = np.flatnonzero(fim_linha)
+    inicios = np.concatenate(([0], pos_fim + 1))
+    fins = np.concatenate((pos_fim, [buf.size]))
+
+    # Primeiro caractere visível de cada linha (avança sobre os espaços do começo)
+    primeiro = inicios.copy()
+    ativo = np.flatnonzero(primeiro < fins)
+    ativo = ativo[_EH_ESPACO[buf[primeiro[ativo]]]]
+    while ativo.size:
+        primeiro[ativo] += 1
+        ativo = ativo[primeiro[ativo] < fins[ativo]]
+        ativo = ativo[_EH_ESPACO[buf[primeiro[ativo]]]]
+    manter = primeiro < fins
+    manter[manter] = buf[primeiro[manter]] != 59
+    for prefixo in _PREFIXOS_IGNORADOS:
+        prefixo = np.frombuffer(prefixo.encode("latin1"), dtype=np.uint8)
+        cabe = np.flatnonzero(manter & (primeiro + prefixo.size <= fins))
+        inicio = primeiro[cabe][:, None] + np.arange(prefixo.size)
+        manter[cabe[(buf[inicio] == prefixo).all(axis=1)]] = False
+
+    tamanhos = np.diff(np.concatenate((inicios, [buf.size])))
+    sel = np.repeat(manter, tamanhos)
+    filtrado = buf[sel]
+    fim_linha = fim_linha[sel]
+    filtrado[fim_linha] = 10
+
+    # Sequências de espaços encostadas num separador, num fim de linha ou no
+    # início/fim do arquivo estão na ponta de um campo e saem.
+    espaco = (filtrado == 32) | (filtrado == 9) | (filtrado == 31) | (filtrado == 160)
+    if espaco.any():
+        borda = np.concatenate(([True], (filtrado == 59) | fim_linha, [True]))
+        mudanca = np.diff(np.concatenate(([False], espaco, [False])).view(np.int8))
+        ini_seq = np.flatnonzero(mudanca == 1)
+        fim_seq = np.flatnonzero(mudanca == -1)
+        ponta = borda[ini_seq] | borda[fim_seq + 1]
+        ini_seq, tam_seq = ini_seq[ponta], (fim_seq - ini_seq)[ponta]
+        desloc = np.arange(tam_seq.sum()) - np.repeat(np.cumsum(tam_seq) - tam_seq, tam_seq)
+        remover = np.zeros(filtrado.size, dtype=bool)
+        remover[np.repeat(ini_seq, tam_seq) + desloc] = True
+        filtrado = filtrado[~remover]
+
+    # Campos por linha = ';' da linha + 1 (toda linha restante tem conteúdo)
+    if filtrado.size == 0:
+        return b"", np.zeros(0, dtype=np.int64)
+    limites = np.concatenate(([0], np.flatnonzero(filtrado == 10) + 1))
+    if limites[-1] != filtrado.size:
+        limites = np.append(limites, filtrado.size)
+    n_campos = np.diff(np.searchsorted(np.flatnonzero(filtrado == 59), limites)) + 1
+
+    return filtrado.tobytes(), n_campos
+
+
+def _montar_registros_python(
+    texto: str, centro_atual: str | None = None, pular: int = _LINHAS_CABECALHO
+) -> tuple[pd.DataFrame, str | None]:
+    """
+    Leitura linha a linha (referência do layout; usada com engine="python").
+    Retorna os registros e o último Centro de Resultados visto.
+    """
+    linhas = texto.splitlines()
 
     registros = []
-    centro_atual = None
 
-    for linha in linhas[5:]:
+    for linha in linhas[pular:]:
         linha = linha.strip()
         if not linha:
             continue
@@ -44,13 +167,7 @@ def processar_baixas(file_source) -> pd.DataFrame:
 
         primeira_coluna = partes[0]
 
-        if (
-            primeira_coluna == ""
-            or primeira_coluna.startswith("Data")
-            or primeira_coluna.startswith("Subtotal")
-            or primeira_coluna.startswith("Sistema Posto Delta")
-            or primeira_coluna.startswith("Total")
-        ):
+        if primeira_coluna == "" or primeira_coluna.startswith(_PREFIXOS_IGNORADOS):
             continue
 
         if primeira_coluna and all(valor == "" for valor in partes[1:]):
@@ -103,21 +220,93 @@ def processar_baixas(file_source) -> pd.DataFrame:
             }
         )
 
-    df_final = pd.DataFrame(
-        registros,
-        columns=[
-            "Centro de Resultados",
-            "Data",
-            "Lancamento",
-            "Conta",
-            "Responsável",
-            "Documento",
-            "Valor Total",
-            "Data Baixa",
-            "Lancamento Baixa",
-        ],
+    return pd.DataFrame(registros, columns=COLUNAS_BAIXAS), centro_atual
+
+
+def _montar_registros_c(
+    data: bytes, centro_atual: str | None = None
+) -> tuple[pd.DataFrame, str | None] | None:
+    """
+    Mesmo layout de _montar_registros_python, mas lendo com o parser C do
+    pandas os bytes já limpos por _linhas_uteis e resolvendo os cabeçalhos de
+    Centro de Resultados e as três variantes de colunas (partes[10]/[11]/[13])
+    com máscaras vetorizadas.
+
+    `data` já vem sem as linhas de cabeçalho. Retorna os registros e o último
+    Centro de Resultados visto, ou None se o arquivo tiver algo que o parser C
+    não reproduz fielmente (o chamador então cai na leitura linha a linha).
+    """
+    data, n_campos = _linhas_uteis(data)
+    if n_campos.size == 0:
+        return pd.DataFrame([], columns=COLUNAS_BAIXAS), centro_atual
+
+    largura = max(int(n_campos.max()), 14)
+    try:
+        campos = pd.read_csv(
+            io.BytesIO(data),
+            sep=";",
+            header=None,
+            names=range(largura),
+            dtype=object,
+            na_filter=False,
+            quoting=csv.QUOTE_NONE,
+            encoding="latin1",
+            engine="c",
+        )
+    except pd.errors.ParserError:
+        return None
+    if len(campos) != len(n_campos):
+        return None
+
+    partes = {k: campos[k].to_numpy(dtype=object) for k in campos.columns}
+    primeira = partes[0]
+
+    # Linhas de 1º campo vazio ou de Data/Subtotal/Total já saíram em
+    # _linhas_uteis. Cabeçalho de centro: todos os outros campos vazios.
+    centro = n_campos == 1
+    candidatos = np.flatnonzero(~centro)
+    for k in range(1, largura):
+        candidatos = candidatos[partes[k][candidatos] == ""]
+    centro[candidatos] = True
+    registro = ~centro
+    registro[registro] = ["/" in valor for valor in primeira[registro]]
+
+    centros = pd.Series(primeira).where(centro).ffill()
+    if centro_atual is not None:
+        centros = centros.fillna(centro_atual)
+    if centro.any() or centro_atual is not None:
+        centro_atual = centros.iat[-1]
+    centros = np.array(centros[registro], dtype=object)
+    centros[pd.isna(centros)] = None
+    p = {k: v[registro] for k, v in partes.items()}
+    n = n_campos[registro]
+
+    var_a = p[10] != ""
+    var_b = ~var_a & (p[11] != "")
+    var_c = ~var_a & ~var_b & (p[13] != "")
+    variantes = [var_a, var_b, var_c]
+
+    def escolher(a, b, c):
+        return np.select(variantes, [p[a], p[b], p[c]], default=None)
+
+    df = pd.DataFrame(
+        {
+            "Centro de Resultados": centros,
+            "Data": p[0],
+            "Lancamento": np.where(n > 1, p[1], None),
+            "Conta": np.where(n > 2, p[2], None),
+            "Responsável": escolher(3, 4, 3),
+            "Documento": escolher(5, 6, 6),
+            "Valor Total": escolher(6, 7, 7),
+            "Data Baixa": escolher(8, 9, 9),
+            "Lancamento Baixa": escolher(10, 11, 13),
+        },
+        columns=COLUNAS_BAIXAS,
     )
+    return df, centro_atual
+
 
+def _tipar(df_final: pd.DataFrame) -> pd.DataFrame:
     if df_final.empty:
         return df_final
 
@@ -133,4 +322,164 @@ def processar_baixas(file_source) -> pd.DataFrame:
     )
     df_final["Valor Total"] = pd.to_numeric(df_final["Valor Total"], errors="coerce")
 
+    return df_final.astype({c: "category" for c in COLUNAS_CATEGORIA_BAIXAS})
+
+
+def _montar_registros(
+    data: bytes | str, engine: str, centro_atual: str | None, pular: int
+) -> tuple[pd.DataFrame, str | None]:
+    resultado = None
+    if engine == "c" and isinstance(data, bytes):
+        resultado = _montar_registros_c(data[_pular_linhas(data, pular):], centro_atual)
+    if resultado is None:
+        texto = data.decode("latin1") if isinstance(data, bytes) else data
+        resultado = _montar_registros_python(texto, centro_atual, pular)
+    return resultado
+
+
+def _validar_engine(engine: str) -> None:
+    if engine not in ("c", "python"):
+        raise ValueError(f"engine inválido: {engine!r} (use 'c' ou 'python')")
+
+
+def processar_baixas(file_source, engine: str = "c", medicoes: list = None) -> pd.DataFrame:
+    """
+    Lê a relação de baixas (CSV ';' do Sistema Posto Delta).
+
+    engine="c" lê o arquivo de uma vez com o parser C do pandas;
+    engine="python" usa a leitura linha a linha original. As duas
+    produzem o mesmo DataFrame.
+
+    A primeira coluna (ID_BAIXA) é um Id pelo conteúdo da linha, que não muda
+    se a relação for exportada de novo com linhas a mais ou em outra ordem.
+    medicoes: ver desempenho.medir.
+    """
+    _validar_engine(engine)
+    with medir(medicoes, "Baixas: leitura") as etapa:
+        texto = _read_raw(file_source)
+        linhas_texto = etapa["Linhas saída"] = texto.count("\n" if isinstance(texto, str) else b"\n")
+    with medir(medicoes, "Baixas: registros") as etapa:
+        etapa["Linhas entrada"] = linhas_texto
+        df_final, _ = _montar_registros(texto, engine, None, _LINHAS_CABECALHO)
+        etapa["Linhas saída"] = len(df_final)
+    with medir(medicoes, "Baixas: tipagem e Ids") as etapa:
+        etapa["Linhas entrada"] = len(df_final)
+        df_final = _tipar(df_final)
+        df_final.insert(0, ID_BAIXA, ids_estaveis(df_final, CAMPOS_ID_BAIXA))
+        etapa["Linhas saída"] = len(df_final)
     return df_final
+
+
+@contextmanager
+def _abrir_fluxo(file_source: Any):
+    if isinstance(file_source, (str, Path)):
+        with open(file_source, "rb") as handle:
+            yield handle
+        return
+
+    if hasattr(file_source, "read"):
+        if hasattr(file_source, "seek"):
+            file_source.seek(0)
+        yield file_source
+        return
+
+    raise TypeError("Unsupported file_source type for processar_baixas_em_blocos")
+
+
+def _ultimo_fim_de_linha(pendente: bytes | str) -> int:
+    if isinstance(pendente, bytes):
+        return max(pendente.rfind(bytes([b])) for b in _BYTES_FIM_DE_LINHA)
+    return max(pendente.rfind(chr(b)) for b in _BYTES_FIM_DE_LINHA)
+
+
+def processar_baixas_em_blocos(
+    file_source, bytes_por_bloco: int = 16 * 2**20, engine: str = "c"
+) -> Iterator[pd.DataFrame]:
+    """
+    Versão em streaming de processar_baixas para exportações muito grandes.
+
+    Lê o arquivo aos poucos (`bytes_por_bloco` por vez), corta cada bloco no
+    último fim de linha e leva o Centro de Resultados corrente de um bloco
+    para o outro. Gera DataFrames já tipados; concatenados, são iguais ao
+    retorno de processar_baixas sem a coluna ID_BAIXA (o contador de linhas
+    repetidas precisa do arquivo inteiro). O pico de memória depende do tamanho do
+    bloco, não do arquivo.
+    """
+    _validar_engine(engine)
+    centro_atual = None
+    pendente = None
+    pular = _LINHAS_CABECALHO
+
+    with _abrir_fluxo(file_source) as fluxo:
+        while True:
+            pedaco = fluxo.read(bytes_por_bloco)
+            fim = not pedaco
+            pendente = pedaco if pendente is None else pendente + pedaco
+
+            if pular and not fim:
+                # Só descarta o cabeçalho quando as 5 linhas estão completas
+                # (e um "\r" final ainda pode ser metade de um "\r\n").
+                if isinstance(pendente, bytes):
+                    pos = _pular_linhas(pendente, pular)
+                else:
+                    pos = sum(len(l) for l in pendente.splitlines(keepends=True)[:pular])
+                if pos >= len(pendente):
+                    continue
+                pendente, pular = pendente[pos:], 0
+
+            if fim:
+                bloco, pendente = pendente, pendente[:0]
+            else:
+                corte = _ultimo_fim_de_linha(pendente)
+                if corte == -1:
+                    continue
+                bloco, pendente = pendente[:corte + 1], pendente[corte + 1:]
+
+            if bloco:
+                df_bloco, centro_atual = _montar_registros(bloco, engine, centro_atual, pular)
+                if not df_bloco.empty:
+                    yield _tipar(df_bloco)
+            if fim:
+                break
+
+
+def schema_baixas():
+    """Schema Arrow das colunas de COLUNAS_BAIXAS (requer pyarrow)."""
+    import pyarrow as pa
+
+    texto = pa.string()
+    return pa.schema(
+        [
+            ("Centro de Resultados", texto),
+            ("Data", pa.timestamp("us")),
+            ("Lancamento", texto),
+            ("Conta", texto),
+            ("Responsável", texto),
+            ("Documento", texto),
+            ("Valor Total", pa.float64()),
+            ("Data Baixa", pa.timestamp("us")),
+            ("Lancamento Baixa", texto),
+        ]
+    )
+
+
+def baixas_para_parquet(
+    file_source, destino, bytes_por_bloco: int = 16 * 2**20, engine: str = "c"
+) -> int:
+    """
+    Grava a relação de baixas direto em Parquet, bloco a bloco, sem montar o
+    DataFrame inteiro em memória. Retorna a quantidade de registros gravados.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:  # pragma: no cover - depende do ambiente
+        raise ImportError("baixas_para_parquet requer o pacote 'pyarrow'") from exc
+
+    schema = schema_baixas()
+    total = 0
+    with pq.ParquetWriter(destino, schema) as writer:
+        for bloco in processar_baixas_em_blocos(file_source, bytes_por_bloco, engine):
+            writer.write_table(pa.Table.from_pandas(bloco, schema=schema, preserve_index=False))
+            total += len(bloco)
+    return total
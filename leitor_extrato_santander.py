@@ -1,44 +1,363 @@
 # leitor_extrato_santander_xlsx.py
-import re
+import os
+import importlib.util
 import pandas as pd
 from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
 import io
+import numpy as np
+from desempenho import medir
+from identificadores import ids_estaveis
 
-def _split_tipo_responsavel(historico):
+# Mesmos caracteres que str.strip() / \s do módulo re tratam como espaço; os
+# métodos .str do pandas com texto em Arrow usam RE2, cujo \s é só ASCII.
+_ESPACOS = "".join(c for c in map(chr, range(0x3001)) if c.isspace())
+_SEPARADOR = f"[{_ESPACOS}]{{2,}}"
+
+
+def _dividir_no_separador(textos: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """Antes / depois da primeira sequência de 2+ espaços (todas as linhas têm uma)."""
+    if isinstance(textos.array, pd.arrays.ArrowStringArray):
+        # Texto em Arrow: split em C++ (o str.split do pandas com regex volta ao Python)
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        partes = pc.split_pattern_regex(pa.array(textos.array), _SEPARADOR, max_splits=1)
+        return (
+            pc.list_element(partes, 0).to_numpy(zero_copy_only=False),
+            pc.list_element(partes, 1).to_numpy(zero_copy_only=False),
+        )
+    partes = textos.str.split(_SEPARADOR, n=1, expand=True, regex=True)
+    return partes[0].to_numpy(dtype=object), partes[1].to_numpy(dtype=object)
+
+
+def _separar_tipo_responsavel(historico: pd.Series) -> tuple[pd.Series, pd.Series]:
     """
-    Divide histórico em (Tipo Movimento, Responsável) usando 2+ espaços como separador.
+    Divide o histórico em (Tipo Movimento, Responsável) na primeira sequência
+    de 2+ espaços, para a coluna inteira. As duas partes saem sem espaços nas
+    pontas; sem separador, o histórico inteiro é o tipo e o Responsável fica
+    None. Valores que não são texto passam como tipo, sem Responsável.
     """
-    if not isinstance(historico, str):
-        return historico, None
-    h = historico.strip()
-    if "  " in h:
-        partes = re.split(r"\s{2,}", h, maxsplit=1)
-        tipo = partes[0].strip()
-        resp = partes[1].strip() if len(partes) > 1 else None
-        return tipo, resp
-    return h, None
+    nenhum = pd.Series([None] * len(historico), index=historico.index, dtype=object)
+    try:
+        h = historico.str.strip(_ESPACOS)  # NaN para valores que não são texto
+    except AttributeError:  # coluna sem nenhum texto
+        return pd.Series(historico.tolist(), index=historico.index), nenhum
+    # Como h já está sem espaços nas pontas, "  " garante as duas partes
+    dividir = h.str.contains("  ", regex=False).fillna(False).astype(bool).to_numpy()
+
+    tipo = h.astype(object).where(h.notna(), historico.astype(object)).to_numpy(copy=True)
+    resp = nenhum.to_numpy(copy=True)
+    if dividir.any():
+        # Equivale a re.split(r"\s{2,}", h, maxsplit=1); as partes já saem sem
+        # espaços nas pontas, porque o separador absorve o trecho inteiro
+        tipo[dividir], resp[dividir] = _dividir_no_separador(h[dividir])
+
+    return (
+        pd.Series(tipo.tolist(), index=historico.index),
+        pd.Series(resp.tolist(), index=historico.index),
+    )
+
+
+def _classificar_fluxo(valor: pd.Series) -> pd.Series:
+    """Entrada / Saída / Neutro pelo sinal do valor (None quando não numérico)."""
+    v = valor.to_numpy(dtype=float, na_value=np.nan)
+    fluxo = np.select([v > 0, v < 0, v == 0], ["Entrada", "Saída", "Neutro"], default=None)
+    return pd.Series(fluxo.tolist(), index=valor.index)
+
+
+# ============================================
+# Backends de leitura da planilha
+# ============================================
+def _abrir(file):
+    """Caminho, bytes ou UploadedFile (Streamlit) -> algo que os leitores aceitam."""
+    if isinstance(file, bytes):
+        return io.BytesIO(file)
+    if not isinstance(file, (str, os.PathLike)) and hasattr(file, "seek"):
+        file.seek(0)  # garante que está no início
+    return file
+
+
+def _ler_openpyxl(file) -> pd.DataFrame:
+    """pd.read_excel com openpyxl (leitura original)."""
+    return pd.read_excel(_abrir(file), header=None, engine="openpyxl")
 
 
-def ler_extrato_santander_xlsx(file) -> pd.DataFrame:
+def _converter_celula(valor):
+    """Mesmas conversões que o pandas aplica às células do openpyxl."""
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, str) and valor in ERROR_CODES:
+        return float("nan")
+    return valor
+
+
+def _ler_openpyxl_streaming(file) -> pd.DataFrame:
+    """
+    openpyxl em modo read_only, percorrendo as linhas só com os valores
+    (sem criar objetos de célula nem passar pela camada de Excel do pandas).
+    """
+    wb = load_workbook(_abrir(file), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.active
+        ws.reset_dimensions()
+        linhas = []
+        ultima_com_dados = -1
+        for i, valores in enumerate(ws.iter_rows(values_only=True)):
+            linha = [_converter_celula(v) for v in valores]
+            while linha and linha[-1] == "":
+                linha.pop()
+            if linha:
+                ultima_com_dados = i
+            linhas.append(linha)
+    finally:
+        wb.close()
+
+    linhas = linhas[:ultima_com_dados + 1]
+    if not linhas:
+        return pd.DataFrame()
+    largura = max(len(linha) for linha in linhas)
+    linhas = [linha + [""] * (largura - len(linha)) for linha in linhas]
+    return TextParser(linhas, header=None, skip_blank_lines=False).read()
+
+
+def _ler_calamine(file) -> pd.DataFrame:
+    """pd.read_excel com o engine calamine (Rust), se python-calamine estiver instalado."""
+    return pd.read_excel(_abrir(file), header=None, engine="calamine")
+
+
+def _ler_xlrd(file) -> pd.DataFrame:
+    """pd.read_excel com xlrd (único engine do pandas para .xls além do calamine)."""
+    return pd.read_excel(_abrir(file), header=None, engine="xlrd")
+
+
+def _ler_csv(file) -> pd.DataFrame:
+    """
+    Extrato exportado em CSV (Santander: ';', latin1, valores "1.234,56"),
+    lido como a mesma grade de células da planilha, tudo como texto (os
+    valores são convertidos em normalizar_extrato).
+    """
+    separador, encoding, largura = _dialeto_csv(file)
+    return pd.read_csv(
+        _abrir(file), sep=separador, header=None, dtype=str, encoding=encoding,
+        skip_blank_lines=False, names=range(largura),
+    )
+
+
+def _ler_bytes(file, n: int = -1) -> bytes:
+    """Primeiros `n` bytes (todos, se n=-1) sem consumir o UploadedFile."""
+    dados = _abrir(file)
+    if isinstance(dados, (str, os.PathLike)):
+        with open(dados, "rb") as handle:
+            return handle.read(n)
+    conteudo = dados.read(n)
+    dados.seek(0)
+    return conteudo
+
+
+_SEPARADORES_CSV = (";", ",", "\t")
+
+
+def _dialeto_csv(file) -> tuple[str, str, int]:
+    """
+    (separador, encoding, largura) do CSV pelos bytes do arquivo: o separador
+    mais frequente na primeira linha não vazia (empate fica com ';'), utf-8
+    se o conteúdo decodifica como utf-8, senão latin1.
+    """
+    conteudo = _ler_bytes(file)
+    try:
+        conteudo.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError:
+        encoding = "latin1"
+    linhas = conteudo.splitlines() or [b""]
+    primeira = next((linha for linha in linhas if linha.strip()), b"")
+    separador = max(_SEPARADORES_CSV, key=lambda s: primeira.count(s.encode()))
+    return separador, encoding, max(linha.count(separador.encode()) for linha in linhas) + 1
+
+
+# Leitores por formato, na ordem de preferência usada em backend="auto"
+LEITORES = {
+    "xlsx": {
+        "calamine": _ler_calamine,
+        "openpyxl_streaming": _ler_openpyxl_streaming,
+        "openpyxl": _ler_openpyxl,
+    },
+    "xls": {
+        "calamine": _ler_calamine,
+        "xlrd": _ler_xlrd,
+    },
+    "csv": {
+        "pandas": _ler_csv,
+    },
+}
+LEITORES_XLSX = LEITORES["xlsx"]
+
+_DEPENDENCIAS = {"calamine": "python_calamine", "xlrd": "xlrd"}
+
+# Assinaturas (magic bytes) dos formatos binários
+_ASSINATURAS = {
+    b"PK\x03\x04": "xlsx",                       # zip (Office Open XML)
+    b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1": "xls",    # OLE2 / BIFF
+}
+
+
+def detectar_formato(file) -> str:
+    """Identifica o formato do extrato pelos primeiros bytes: xlsx, xls ou csv."""
+    inicio = _ler_bytes(file, 8)
+    for assinatura, formato in _ASSINATURAS.items():
+        if inicio.startswith(assinatura):
+            return formato
+    return "csv"
+
+
+def backends_disponiveis(formato: str = "xlsx") -> list:
+    """Backends do formato cujas dependências estão instaladas."""
+    return [
+        nome for nome in LEITORES[formato]
+        if nome not in _DEPENDENCIAS or importlib.util.find_spec(_DEPENDENCIAS[nome]) is not None
+    ]
+
+
+def _ler_planilha(file, backend: str = "auto", formato: str = "xlsx") -> pd.DataFrame:
+    leitores = LEITORES[formato]
+    if backend == "auto":
+        disponiveis = backends_disponiveis(formato)
+        if not disponiveis:
+            raise ImportError(
+                f"nenhum leitor de {formato} instalado (instale um de: "
+                f"{', '.join(_DEPENDENCIAS.get(n, n) for n in leitores)})"
+            )
+        backend = disponiveis[0]
+    elif backend not in leitores:
+        raise ValueError(f"backend inválido para {formato}: {backend!r} (opções: auto, {', '.join(leitores)})")
+    return leitores[backend](file)
+
+
+def ler_grade(file, backend: str = "auto") -> pd.DataFrame:
+    """Grade de células do extrato, com o formato (xlsx, xls, csv) detectado pelo conteúdo."""
+    return _ler_planilha(file, backend, detectar_formato(file))
+
+
+def _nome_arquivo(file):
+    """Nome do arquivo para as medições: caminho ou .name do UploadedFile."""
+    if isinstance(file, (str, os.PathLike)):
+        return os.path.basename(file)
+    return getattr(file, "name", None)
+
+
+def _ler_medindo(file, ler, estruturar, medicoes) -> pd.DataFrame:
+    """ler() -> grade -> estruturar(grade), com as duas etapas em `medicoes`."""
+    arquivo = _nome_arquivo(file)
+    with medir(medicoes, "Extrato: leitura", Arquivo=arquivo) as etapa:
+        raw = ler()
+        etapa["Linhas saída"] = len(raw)
+    with medir(medicoes, "Extrato: estruturação", Arquivo=arquivo) as etapa:
+        etapa["Linhas entrada"] = len(raw)
+        df = estruturar(raw)
+        etapa["Linhas saída"] = len(df)
+    return df
+
+
+def ler_extrato_santander(file, backend: str = "auto", medicoes: list = None) -> pd.DataFrame:
+    """
+    Lê extrato Santander em XLSX, XLS (BIFF) ou CSV, detectando o formato
+    pelo conteúdo (não pela extensão), e retorna o mesmo DataFrame
+    estruturado de ler_extrato_santander_xlsx.
+    """
+    return _ler_medindo(file, lambda: ler_grade(file, backend), _estruturar_extrato, medicoes)
+
+
+def ler_extrato_santander_xlsx(file, backend: str = "auto", medicoes: list = None) -> pd.DataFrame:
     """
     Lê extrato Santander em XLSX e retorna DataFrame estruturado.
     Aceita tanto caminho (str) quanto UploadedFile (Streamlit).
+
+    backend: "auto" (calamine se instalado, senão openpyxl em streaming),
+    ou um nome de LEITORES_XLSX. medicoes: ver desempenho.medir.
     """
-    # Se vier do Streamlit, UploadedFile tem atributo .read()
-    if not isinstance(file, (str, bytes)):
-        file.seek(0)  # garante que está no início
-        raw = pd.read_excel(file, header=None, engine="openpyxl")
+    return _ler_medindo(file, lambda: _ler_planilha(file, backend, "xlsx"), _estruturar_extrato, medicoes)
+
+
+COLUNAS_EXTRATO = ["Agência", "Conta", "Data", "Tipo Movimento", "Responsável", "Documento", "Valor", "Tipo de Fluxo"]
+
+# Coluna de Id que os leitores põem na frente de COLUNAS_EXTRATO e os campos
+# que entram nele (Tipo Movimento + Responsável são o histórico da linha)
+ID_EXTRATO = "Id Extrato"
+CAMPOS_ID_EXTRATO = ["Conta", "Data", "Documento", "Valor", "Tipo Movimento", "Responsável"]
+
+# Colunas com poucos valores distintos, repetidos em quase todas as linhas:
+# ficam como category (um código inteiro por linha em vez do texto)
+COLUNAS_CATEGORIA_EXTRATO = ["Agência", "Conta", "Tipo Movimento", "Tipo de Fluxo"]
+
+
+def schema_extrato():
+    """Schema Arrow das colunas de COLUNAS_EXTRATO (requer pyarrow)."""
+    import pyarrow as pa
+
+    texto = pa.string()
+    return pa.schema([
+        ("Agência", texto),
+        ("Conta", texto),
+        ("Data", pa.timestamp("us")),
+        ("Tipo Movimento", texto),
+        ("Responsável", texto),
+        ("Documento", texto),
+        ("Valor", pa.float64()),
+        ("Tipo de Fluxo", texto),
+    ])
+
+
+def _numero_br(valores: pd.Series) -> pd.Series:
+    """
+    Números ficam como estão; textos viram float ("-1.234,56", "R$ 10,00",
+    "15,00 D" para débito, "-66.88", "1,234.56").
+
+    O separador decimal de cada texto é o último entre "," e "." quando ele
+    tem os dois, ou a vírgula quando só tem vírgula. Textos só com pontos
+    seguem a coluna: se algum texto da coluna tem vírgula decimal (ou o texto
+    tem mais de um ponto), os pontos são de milhar ("1.234"); senão, o ponto
+    é o decimal ("1234.5").
+    """
+    if pd.api.types.is_numeric_dtype(valores):
+        return valores
+    if valores.dtype == object:
+        eh_texto = valores.map(lambda v: isinstance(v, str), na_action="ignore").fillna(False).astype(bool)
     else:
-        raw = pd.read_excel(file, header=None, engine="openpyxl")
+        eh_texto = valores.notna()
+    if not eh_texto.any():
+        return pd.to_numeric(valores, errors="coerce")
 
-    # Agência e Conta na primeira linha
-    agencia = str(raw.iat[0, 1]).strip() if raw.shape[1] > 1 else None
-    conta   = str(raw.iat[0, 3]).strip() if raw.shape[1] > 3 else None
+    texto = valores[eh_texto].astype(str).str.upper().str.replace(r"R\$|[\s\xa0]", "", regex=True)
+    debito = texto.str.endswith("D")
+    texto = texto.str.rstrip("CD")
+    virgula, ponto = texto.str.rfind(","), texto.str.rfind(".")
+    virgula_decimal = virgula > ponto
+    so_pontos = (ponto >= 0) & (virgula < 0)
+    milhar = so_pontos & (virgula_decimal.any() | (texto.str.count(r"\.") > 1))
+    brasileiro = virgula_decimal | milhar
+    texto = texto.where(
+        ~brasileiro, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    ).where(brasileiro, texto.str.replace(",", "", regex=False))
+    convertidos = pd.to_numeric(texto, errors="coerce")
+    convertidos = convertidos.mask(debito, -convertidos)
+
+    numeros = pd.to_numeric(valores.mask(eh_texto), errors="coerce").astype(float)
+    numeros[eh_texto] = convertidos
+    return numeros
 
-    # Dados a partir da linha 4 (índice 3)
-    df = raw.iloc[3:, :5].copy()
-    df.columns = ["Data", "Vazio", "Historico", "Documento", "Valor"]
 
+def normalizar_extrato(df: pd.DataFrame, agencia=None, conta=None) -> pd.DataFrame:
+    """
+    Linhas de extrato de qualquer banco (colunas Data, Historico, Documento e
+    Valor) -> DataFrame no schema comum: ID_EXTRATO + COLUNAS_EXTRATO.
+
+    Descarta linhas vazias, de saldo e sem data. Agência e Conta podem ser um
+    valor só ou uma Series alinhada a df.
+    """
     # Limpeza
     df = df.dropna(how="all")
     df = df.loc[~df["Historico"].astype(str).str.upper().str.contains("SALDO", na=False)]
@@ -49,32 +368,35 @@ def ler_extrato_santander_xlsx(file) -> pd.DataFrame:
     df["Documento"] = df["Documento"].astype(str).str.strip().replace({"nan": None, "None": None})
 
     # Tipo Movimento e Responsável
-    tipo_resp = df["Historico"].apply(_split_tipo_responsavel)
-    df["Tipo Movimento"] = tipo_resp.apply(lambda x: x[0])
-    df["Responsável"] = tipo_resp.apply(lambda x: x[1])
+    df["Tipo Movimento"], df["Responsável"] = _separar_tipo_responsavel(df["Historico"])
 
     # Garantir que Valor é numérico
-    df["Valor"] = pd.to_numeric(df["Valor"], errors="coerce")
+    df["Valor"] = _numero_br(df["Valor"])
 
     # Entrada ou Saída
-    def classificar_fluxo(v):
-        if pd.isna(v):
-            return None
-        if v > 0:
-            return "Entrada"
-        elif v < 0:
-            return "Saída"
-        return "Neutro"
-
-    df["Tipo de Fluxo"] = df["Valor"].apply(classificar_fluxo)
+    df["Tipo de Fluxo"] = _classificar_fluxo(df["Valor"])
 
     # DataFrame final
     df_final = df.assign(**{
         "Agência": agencia,
         "Conta": conta
-    })[["Agência", "Conta", "Data", "Tipo Movimento", "Responsável", "Documento", "Valor", "Tipo de Fluxo"]].reset_index(drop=True)
+    })[COLUNAS_EXTRATO].reset_index(drop=True)
+
+    # Id pelo conteúdo da linha: não muda se o extrato for baixado de novo
+    df_final.insert(0, ID_EXTRATO, ids_estaveis(df_final, CAMPOS_ID_EXTRATO))
+    return df_final.astype({c: "category" for c in COLUNAS_CATEGORIA_EXTRATO})
+
+
+def _estruturar_extrato(raw: pd.DataFrame) -> pd.DataFrame:
+    """Grade de células do extrato Santander (qualquer formato) -> DataFrame estruturado."""
+    # Agência e Conta na primeira linha
+    agencia = str(raw.iat[0, 1]).strip() if raw.shape[1] > 1 else None
+    conta   = str(raw.iat[0, 3]).strip() if raw.shape[1] > 3 else None
 
-    return df_final
+    # Dados a partir da linha 4 (índice 3); a 2ª coluna vem sempre vazia
+    df = raw.iloc[3:, [0, 2, 3, 4]].copy()
+    df.columns = ["Data", "Historico", "Documento", "Valor"]
+    return normalizar_extrato(df, agencia, conta)
 
 
 if __name__ == "__main__":
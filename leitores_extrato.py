@@ -0,0 +1,158 @@
+# ============================================
+# Leitores de extrato por banco (layouts plugáveis)
+# ============================================
+# Cada layout é um par (detectar, estruturar) registrado em LAYOUTS:
+#   detectar(cabecalho) -> bool       olha só as primeiras linhas da grade
+#   estruturar(grade) -> DataFrame    no schema comum (ID_EXTRATO + COLUNAS_EXTRATO)
+# ler_extrato lê a grade uma vez (formato pelos magic bytes, ver
+# detectar_formato), testa os layouts na ordem de LAYOUTS e estrutura com o
+# primeiro que reconhece o cabeçalho. O layout genérico "tabela" fica sempre
+# por último.
+import re
+import unicodedata
+
+import pandas as pd
+
+from identificadores import ids_estaveis
+from leitor_extrato_santander import (
+    CAMPOS_ID_EXTRATO,
+    COLUNAS_CATEGORIA_EXTRATO,
+    ID_EXTRATO,
+    _estruturar_extrato,
+    _ler_medindo,
+    ler_grade,
+    normalizar_extrato,
+)
+
+_LINHAS_CABECALHO = 15
+_GENERICO = "tabela"
+
+
+def _texto(valor) -> str:
+    """Célula -> texto maiúsculo sem acentos nem pontuação, para comparar rótulos."""
+    if pd.isna(valor):
+        return ""
+    texto = unicodedata.normalize("NFKD", str(valor))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).upper()
+    return " ".join(re.sub(r"[^A-Z0-9$]+", " ", texto).split())
+
+
+# ---------- Santander ----------
+def _eh_santander(cabecalho: pd.DataFrame) -> bool:
+    # AGENCIA <n> CONTA <n> na primeira linha e a tabela a partir da terceira
+    if cabecalho.shape[0] < 3 or cabecalho.shape[1] < 5:
+        return False
+    return _texto(cabecalho.iat[0, 0]) == "AGENCIA" and _texto(cabecalho.iat[0, 2]) == "CONTA"
+
+
+# ---------- Tabela genérica (uma linha de cabeçalho com os rótulos) ----------
+# Rótulos aceitos para cada coluna do schema comum, já passados por _texto
+_ROTULOS = {
+    "Data": {"DATA", "DATA LANCAMENTO", "DATA MOVIMENTO", "DATA MOVIMENTACAO", "DT LANCAMENTO"},
+    "Historico": {"HISTORICO", "DESCRICAO", "LANCAMENTO", "HISTORICO DESCRICAO"},
+    "Detalhe": {"DETALHES", "DETALHE", "COMPLEMENTO"},
+    "Documento": {"DOCUMENTO", "DOC", "N DOCUMENTO", "NO DOCUMENTO", "NUMERO DOCUMENTO", "NR DOCUMENTO"},
+    "Valor": {"VALOR", "VALOR R$", "VALOR $", "VALOR LANCAMENTO"},
+    "Agência": {"AGENCIA", "AG"},
+    "Conta": {"CONTA", "CONTA CORRENTE", "C C"},
+}
+_OBRIGATORIAS = ("Data", "Historico", "Valor")
+
+
+def _linha_cabecalho(cabecalho: pd.DataFrame):
+    """(índice da linha de rótulos, {posição da coluna: campo}) ou None."""
+    for i in range(len(cabecalho)):
+        colunas = {}
+        for j, valor in enumerate(cabecalho.iloc[i]):
+            rotulo = _texto(valor)
+            campo = next((c for c, rotulos in _ROTULOS.items() if rotulo in rotulos), None)
+            if campo is not None and campo not in colunas.values():
+                colunas[j] = campo
+        if all(c in colunas.values() for c in _OBRIGATORIAS):
+            return i, colunas
+    return None
+
+
+def _eh_tabela(cabecalho: pd.DataFrame) -> bool:
+    return _linha_cabecalho(cabecalho) is not None
+
+
+def _estruturar_tabela(grade: pd.DataFrame) -> pd.DataFrame:
+    """Extrato com uma linha de rótulos (Data, Histórico, Valor...) e uma linha por lançamento."""
+    i, colunas = _linha_cabecalho(grade.head(_LINHAS_CABECALHO))
+    df = grade.iloc[i + 1:, list(colunas)].set_axis(list(colunas.values()), axis=1)
+    if "Documento" not in df.columns:
+        df["Documento"] = None
+    if "Detalhe" in df.columns:
+        # Histórico em duas colunas (ex.: "Pix - Enviado" | "JOAO DA SILVA"):
+        # junta com dois espaços, o separador de Tipo Movimento e Responsável
+        detalhe = df.pop("Detalhe").astype(str).str.strip().where(lambda d: d.ne("") & d.ne("nan"))
+        df["Historico"] = df["Historico"].where(detalhe.isna(), df["Historico"].astype(str) + "  " + detalhe)
+
+    # Agência/Conta por linha, quando o extrato traz essas colunas
+    extras = {}
+    for c in ("Agência", "Conta"):
+        if c in df.columns:
+            valores = df.pop(c)
+            extras[c] = valores.astype(str).str.strip().where(valores.notna())
+    return normalizar_extrato(df, extras.get("Agência"), extras.get("Conta"))
+
+
+# ============================================
+# Registro de layouts
+# ============================================
+LAYOUTS = {
+    "santander": (_eh_santander, _estruturar_extrato),
+    _GENERICO: (_eh_tabela, _estruturar_tabela),
+}
+
+
+def registrar_layout(nome: str, detectar, estruturar) -> None:
+    """
+    Registra (ou substitui) um layout de banco. `detectar` recebe as primeiras
+    linhas da grade de células; `estruturar`, a grade inteira, e deve devolver
+    o schema comum (use normalizar_extrato). Fica antes do layout genérico.
+    """
+    LAYOUTS[nome] = (detectar, estruturar)
+    LAYOUTS[_GENERICO] = LAYOUTS.pop(_GENERICO)
+
+
+def detectar_layout(grade: pd.DataFrame) -> str:
+    """Nome do primeiro layout de LAYOUTS que reconhece o cabeçalho da grade."""
+    cabecalho = grade.head(_LINHAS_CABECALHO)
+    for nome, (detectar, _) in LAYOUTS.items():
+        if detectar(cabecalho):
+            return nome
+    raise ValueError(f"layout de extrato não reconhecido (layouts registrados: {', '.join(LAYOUTS)})")
+
+
+def ler_extrato(file, layout: str = "auto", backend: str = "auto", medicoes: list = None) -> pd.DataFrame:
+    """
+    Lê um extrato de qualquer banco registrado em LAYOUTS, no schema comum.
+    Aceita caminho, bytes ou UploadedFile (Streamlit), em xlsx, xls ou csv.
+
+    layout: "auto" (detectado pelo cabeçalho) ou um nome de LAYOUTS.
+    medicoes: ver desempenho.medir.
+    """
+    if layout != "auto" and layout not in LAYOUTS:
+        raise ValueError(f"layout inválido: {layout!r} (opções: auto, {', '.join(LAYOUTS)})")
+
+    def estruturar(grade):
+        return LAYOUTS[detectar_layout(grade) if layout == "auto" else layout][1](grade)
+
+    return _ler_medindo(file, lambda: ler_grade(file, backend), estruturar, medicoes)
+
+
+def ler_extratos(arquivos, layout: str = "auto", backend: str = "auto", medicoes: list = None) -> pd.DataFrame:
+    """
+    Vários extratos (bancos e formatos misturados) em um DataFrame só. Os Ids
+    são recalculados sobre o conjunto, para linhas iguais em arquivos
+    diferentes não repetirem Id.
+    """
+    partes = [ler_extrato(arquivo, layout, backend, medicoes) for arquivo in arquivos]
+    if not partes:
+        raise ValueError("nenhum extrato informado")
+    # Categorias diferentes entre os arquivos viram texto no concat
+    df = pd.concat(partes, ignore_index=True).astype({c: "category" for c in COLUNAS_CATEGORIA_EXTRATO})
+    df[ID_EXTRATO] = ids_estaveis(df, CAMPOS_ID_EXTRATO)
+    return df
@@ -0,0 +1,219 @@
+# ============================================
+# Normalização e índice de nomes (Responsável)
+# ============================================
+# Cada nome distinto é normalizado uma única vez (sem acentos, pontuação,
+# sufixos societários e palavras vazias, com os tokens em ordem alfabética) e
+# entra no índice por chaves de bloqueio: o prefixo de cada token. A busca de
+# um nome só pontua os nomes que dividem alguma chave com ele, em vez de
+# comparar com todos.
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+
+SUFIXOS_SOCIETARIOS = {"LTDA", "ME", "EPP", "EIRELI", "MEI", "SA", "CIA", "SS", "SLU"}
+PALAVRAS_VAZIAS = {"DE", "DA", "DO", "DAS", "DOS", "E"}
+# Restos do histórico bancário que às vezes vêm junto com o nome
+PALAVRAS_BANCARIAS = {"PIX", "ENVIADO", "RECEBIDO", "TED", "TRANSF", "TRANSFERENCIA", "PAGAMENTO", "PAGTO", "PGTO"}
+_DESCARTAR = SUFIXOS_SOCIETARIOS | PALAVRAS_VAZIAS | PALAVRAS_BANCARIAS
+TAMANHO_PREFIXO = 4
+
+
+def normalizar_nome(nome) -> str:
+    """
+    Forma canônica de um nome: maiúsculas sem acentos nem pontuação, sem
+    sufixos societários (LTDA, ME, EIRELI...), palavras vazias, restos do
+    histórico bancário (PIX, ENVIADO...) e letras soltas (o "S A" de "S/A",
+    iniciais), com os tokens em ordem alfabética.
+    """
+    if nome is None or (not isinstance(nome, str) and pd.isna(nome)):
+        return ""
+    texto = unicodedata.normalize("NFKD", str(nome))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).upper()
+    tokens = re.sub(r"[^A-Z0-9]+", " ", texto).split()
+    return " ".join(sorted(t for t in tokens if len(t) > 1 and t not in _DESCARTAR))
+
+
+def chaves_bloqueio(forma: str) -> set:
+    """Chaves de bloqueio de uma forma normalizada: o prefixo de cada token."""
+    return {t[:TAMANHO_PREFIXO] for t in forma.split()}
+
+
+def indice_nomes(nomes) -> dict:
+    """
+    Índice de uma lista de nomes:
+      "codigos": código (posição em "formas") de cada nome da lista
+      "formas":  forma normalizada de cada código (uma por forma distinta)
+      "tamanhos": comprimento de cada forma
+      "blocos":  chave de bloqueio -> códigos das formas com essa chave
+    """
+    vistos = {}
+    normalizados = []
+    for nome in nomes:
+        if nome not in vistos:
+            vistos[nome] = normalizar_nome(nome)
+        normalizados.append(vistos[nome])
+    codigos, formas = pd.factorize(pd.Series(normalizados, dtype=object))
+
+    blocos = {}
+    for codigo, forma in enumerate(formas):
+        for chave in chaves_bloqueio(forma):
+            blocos.setdefault(chave, []).append(codigo)
+    return {
+        "codigos": codigos,
+        "formas": np.asarray(formas, dtype=object),
+        "tamanhos": np.array([len(f) for f in formas], dtype=np.int64),
+        "blocos": {chave: np.array(lista, dtype=np.int64) for chave, lista in blocos.items()},
+    }
+
+
+def buscar_nome(indice: dict, forma: str, limite: int) -> tuple:
+    """
+    Formas do índice parecidas com `forma` (já normalizada): só as que dividem
+    alguma chave de bloqueio com ela e cujo comprimento ainda permite score ≥
+    limite são pontuadas (token_sort_ratio, 0-100).
+
+    Retorna (códigos com score ≥ limite, scores, quantas formas foram pontuadas).
+    """
+    vazio = np.array([], dtype=np.int64)
+    listas = [indice["blocos"][c] for c in chaves_bloqueio(forma) if c in indice["blocos"]]
+    if not forma or not listas:
+        return vazio, vazio, 0
+    marcados = np.zeros(len(indice["formas"]), dtype=bool)
+    for lista in listas:
+        marcados[lista] = True
+    candidatos = np.flatnonzero(marcados)
+    # O score é no máximo 200·min(la, lb)/(la + lb): comprimentos muito
+    # diferentes não chegam ao limite (0,5 de folga pelo arredondamento)
+    tamanhos = indice["tamanhos"][candidatos]
+    candidatos = candidatos[
+        200 * np.minimum(tamanhos, len(forma)) >= (limite - 0.5) * (tamanhos + len(forma))
+    ]
+    if candidatos.size == 0:
+        return vazio, vazio, 0
+    scores = rf_process.cdist(
+        [forma], indice["formas"][candidatos],
+        scorer=rf_fuzz.token_sort_ratio, processor=None, dtype=np.float64, score_cutoff=limite - 0.5,
+    )[0]
+    scores = np.rint(scores).astype(np.int64)
+    ok = scores >= limite
+    return candidatos[ok], scores[ok], len(candidatos)
+
+
+# ============================================
+# Apelidos aprendidos (nome no extrato -> nome nas baixas)
+# ============================================
+# Pares de nomes (formas normalizadas) já conciliados entre si em execuções
+# anteriores. A tabela fica em disco (armazenamento.ler_apelidos /
+# gravar_apelidos) e vira um dict para o Nível 0 da conciliação, que resolve
+# o nome por consulta direta, sem comparação fuzzy.
+#
+# Cada linha da tabela é uma confirmação: um par (Id Extrato, Id Baixa)
+# conciliado por similaridade de nomes (NIVEIS_APRENDIZADO). Os pares do
+# Nível 0 não contam: vieram do próprio apelido, e contá-los impediria que
+# um apelido expirasse. O mesmo par de Ids conta uma vez só, então
+# reprocessar os mesmos arquivos não soma confirmações.
+COLUNAS_APELIDOS = ["Nome Extrato", "Nome Baixa", "Id Extrato", "Id Baixa", "Confirmado em"]
+NIVEIS_APRENDIZADO = ("Nível 3",)  # Nível 3 e Nível 3B
+MIN_CONFIRMACOES = 2
+MAX_APELIDOS = 50_000
+MAX_CONFIRMACOES = 20  # linhas guardadas por apelido (as mais recentes)
+VALIDADE_DIAS = 180
+_NOMES = ["Nome Extrato", "Nome Baixa"]
+_IDS = ["Id Extrato", "Id Baixa"]
+
+
+def tabela_apelidos_vazia() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Nome Extrato": pd.Series(dtype=object),
+        "Nome Baixa": pd.Series(dtype=object),
+        "Id Extrato": pd.Series(dtype=object),
+        "Id Baixa": pd.Series(dtype=object),
+        "Confirmado em": pd.Series(dtype="datetime64[ns]"),
+    })
+
+
+def nomes_conciliados(res: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pares (Nome Extrato, Nome Baixa) normalizados, com os Ids do par, dos
+    conciliados de um resultado de conciliar_multi_nivel por similaridade de
+    nomes (NIVEIS_APRENDIZADO). Só entram pares com os dois Ids e os dois
+    nomes, e nomes diferentes.
+    """
+    conc = res[
+        (res["Status"] == "✅ Conciliado")
+        & res["Nível Conciliação"].astype(str).str.startswith(NIVEIS_APRENDIZADO)
+        & res["Id Extrato"].notna() & res["Id Baixa"].notna()
+    ]
+    nomes_e = indice_nomes(conc["Responsável Extrato"].tolist())
+    nomes_b = indice_nomes(conc["Responsável Baixa"].tolist())
+    pares = pd.DataFrame({
+        "Nome Extrato": nomes_e["formas"][nomes_e["codigos"]] if len(conc) else [],
+        "Nome Baixa": nomes_b["formas"][nomes_b["codigos"]] if len(conc) else [],
+        "Id Extrato": conc["Id Extrato"].to_numpy(dtype=object),
+        "Id Baixa": conc["Id Baixa"].to_numpy(dtype=object),
+    })
+    validos = pares["Nome Extrato"].ne("") & pares["Nome Baixa"].ne("") & pares["Nome Extrato"].ne(pares["Nome Baixa"])
+    return pares[validos].reset_index(drop=True)
+
+
+def resumo_apelidos(tabela: pd.DataFrame) -> pd.DataFrame:
+    """Uma linha por apelido (Nome Extrato, Nome Baixa), com as Confirmações e a Última confirmação."""
+    return (
+        tabela.groupby(_NOMES, sort=False)["Confirmado em"]
+        .agg(**{"Confirmações": "size", "Última confirmação": "max"})
+        .reset_index()
+    )
+
+
+def atualizar_apelidos(
+    tabela: pd.DataFrame,
+    observados: pd.DataFrame,
+    hoje=None,
+    max_apelidos: int = MAX_APELIDOS,
+    validade_dias: int = VALIDADE_DIAS,
+    max_confirmacoes: int = MAX_CONFIRMACOES,
+) -> pd.DataFrame:
+    """
+    Acrescenta à tabela as confirmações de `observados` (saída de
+    nomes_conciliados), datadas de `hoje`; um par de Ids já registrado mantém
+    a confirmação original. Confirmações com mais de validade_dias saem, e
+    cada apelido guarda só as max_confirmacoes mais recentes. Acima de
+    max_apelidos apelidos, saem os confirmados há mais tempo (e, entre eles,
+    os com menos confirmações).
+    """
+    hoje = pd.Timestamp.today().normalize() if hoje is None else pd.Timestamp(hoje)
+    novos = observados.assign(**{"Confirmado em": hoje})[COLUNAS_APELIDOS]
+    partes = [t for t in (tabela, novos) if len(t)]
+    if not partes:
+        return tabela_apelidos_vazia()
+    tabela = pd.concat(partes, ignore_index=True).drop_duplicates(_IDS)
+    tabela = tabela[tabela["Confirmado em"] >= hoje - pd.Timedelta(days=validade_dias)]
+    tabela = (
+        tabela.sort_values("Confirmado em", ascending=False, kind="stable")
+        .groupby(_NOMES, sort=False).head(max_confirmacoes)
+        .sort_index()
+    )
+
+    resumo = resumo_apelidos(tabela).sort_values(
+        ["Última confirmação", "Confirmações"], ascending=False, kind="stable"
+    )
+    if len(resumo) > max_apelidos:
+        manter = pd.MultiIndex.from_frame(resumo.head(max_apelidos)[_NOMES])
+        tabela = tabela[pd.MultiIndex.from_frame(tabela[_NOMES]).isin(manter)]
+    return tabela.reset_index(drop=True)[COLUNAS_APELIDOS]
+
+
+def dicionario_apelidos(tabela: pd.DataFrame, min_confirmacoes: int = MIN_CONFIRMACOES) -> dict:
+    """
+    Nome no extrato -> nome nas baixas, para o Nível 0. Só entram apelidos com
+    ao menos min_confirmacoes; se um nome do extrato tem vários, fica o mais
+    confirmado (empate: o confirmado mais recentemente).
+    """
+    resumo = resumo_apelidos(tabela)
+    ok = resumo[resumo["Confirmações"] >= min_confirmacoes].sort_values(
+        ["Confirmações", "Última confirmação"], ascending=False, kind="stable"
+    ).drop_duplicates("Nome Extrato")
+    return dict(zip(ok["Nome Extrato"], ok["Nome Baixa"]))
@@ -0,0 +1,126 @@
+# ============================================
+# Apelidos aprendidos: o que é aprendido, confirmações, validade e limites
+# ============================================
+import pandas as pd
+
+from nomes import (
+    atualizar_apelidos,
+    dicionario_apelidos,
+    nomes_conciliados,
+    resumo_apelidos,
+    tabela_apelidos_vazia,
+)
+
+
+def _resultado(linhas) -> pd.DataFrame:
+    """Resultado mínimo de conciliar_multi_nivel: (nível, Id extrato, Id baixa, nome extrato, nome baixa)."""
+    return pd.DataFrame(
+        [("✅ Conciliado", *linha) for linha in linhas],
+        columns=["Status", "Nível Conciliação", "Id Extrato", "Id Baixa", "Responsável Extrato", "Responsável Baixa"],
+    )
+
+
+def _observados(*pares) -> pd.DataFrame:
+    """Observações de um apelido ("JOAO" -> "JOAO SILVA") com os pares de Ids dados."""
+    return pd.DataFrame(
+        [("JOAO", "JOAO SILVA", e, b) for e, b in pares],
+        columns=["Nome Extrato", "Nome Baixa", "Id Extrato", "Id Baixa"],
+    )
+
+
+def test_aprende_so_dos_niveis_de_nome():
+    res = _resultado([
+        ("Nível 0 (Apelido)", "e0", "b0", "Ana", "Ana Lima"),
+        ("Nível 1 (Valor)", "e1", "b1", "Company Lauro", "Cinema Telecom"),
+        ("Nível 2 (Valor+Data)", "e2", "b2", "Pedro", "Posto Beta"),
+        ("Nível 3 (Valor+Nome)", "e3", "b3", "João da Silva", "JOAO SILVA COMERCIO LTDA"),
+        ("Nível 3B (Nome)", "e4", "b4", "Maria Souza ME", "MARIA SOUZA DISTRIBUIDORA"),
+        ("Nível 3 (Valor+Nome)", "e5", "b5", "Mesmo Nome", "MESMO NOME"),
+        ("Nível 3 (Valor+Nome)", None, "b6", "Sem Id", "OUTRO"),
+        ("Nível 4 (Agrupado)", "e7", "b7", "Grupo", "Outro Grupo"),
+    ])
+    observados = nomes_conciliados(res)
+    assert observados["Id Extrato"].tolist() == ["e3", "e4"]
+    assert observados[["Nome Extrato", "Nome Baixa"]].values.tolist() == [
+        ["JOAO SILVA", "COMERCIO JOAO SILVA"],
+        ["MARIA SOUZA", "DISTRIBUIDORA MARIA SOUZA"],
+    ]
+
+
+def test_mesmo_par_de_ids_confirma_uma_vez():
+    obs = _observados(("e1", "b1"))
+    tabela = atualizar_apelidos(tabela_apelidos_vazia(), obs, hoje="2026-01-01")
+    tabela = atualizar_apelidos(tabela, obs, hoje="2026-01-02")
+    assert len(tabela) == 1
+    assert tabela["Confirmado em"].iloc[0] == pd.Timestamp("2026-01-01")
+    assert dicionario_apelidos(tabela) == {}
+
+    tabela = atualizar_apelidos(tabela, _observados(("e2", "b2")), hoje="2026-01-03")
+    assert dicionario_apelidos(tabela) == {"JOAO": "JOAO SILVA"}
+
+
+def test_confirmacoes_expiram():
+    tabela = atualizar_apelidos(tabela_apelidos_vazia(), _observados(("e1", "b1"), ("e2", "b2")), hoje="2026-01-01")
+    assert dicionario_apelidos(tabela) == {"JOAO": "JOAO SILVA"}
+    vazio = _observados()
+    assert len(atualizar_apelidos(tabela, vazio, hoje="2026-06-30", validade_dias=180)) == 2
+    assert len(atualizar_apelidos(tabela, vazio, hoje="2026-07-01", validade_dias=180)) == 0
+
+
+def test_limite_de_confirmacoes_por_apelido():
+    tabela = tabela_apelidos_vazia()
+    for dia in range(1, 8):
+        tabela = atualizar_apelidos(tabela, _observados((f"e{dia}", f"b{dia}")), hoje=f"2026-01-0{dia}",
+                                    max_confirmacoes=3)
+    assert len(tabela) == 3
+    assert tabela["Id Extrato"].tolist() == ["e5", "e6", "e7"]
+    assert resumo_apelidos(tabela)["Confirmações"].tolist() == [3]
+
+
+def test_limite_de_apelidos_fica_com_os_mais_recentes():
+    obs = pd.DataFrame({
+        "Nome Extrato": ["A", "B", "C"],
+        "Nome Baixa": ["A1", "B1", "C1"],
+        "Id Extrato": ["e1", "e2", "e3"],
+        "Id Baixa": ["b1", "b2", "b3"],
+    })
+    tabela = atualizar_apelidos(tabela_apelidos_vazia(), obs.iloc[:2], hoje="2026-01-01")
+    tabela = atualizar_apelidos(tabela, obs.iloc[2:], hoje="2026-01-02", max_apelidos=2)
+    assert sorted(tabela["Nome Extrato"]) == ["A", "C"]
+
+
+def test_dicionario_fica_com_o_apelido_mais_confirmado():
+    obs = pd.DataFrame({
+        "Nome Extrato": ["JOAO"] * 5,
+        "Nome Baixa": ["JOAO SILVA", "JOAO SILVA", "JOAO SOUZA", "JOAO SOUZA", "JOAO SOUZA"],
+        "Id Extrato": [f"e{i}" for i in range(5)],
+        "Id Baixa": [f"b{i}" for i in range(5)],
+    })
+    tabela = atualizar_apelidos(tabela_apelidos_vazia(), obs, hoje="2026-01-01")
+    assert dicionario_apelidos(tabela) == {"JOAO": "JOAO SOUZA"}
+    assert dicionario_apelidos(tabela, min_confirmacoes=4) == {}
+
+
+def test_lote_incremental_aprende_e_nao_reconta(tmp_path):
+    from armazenamento import ler_apelidos
+    from benchmark import dados_sinteticos, escrever_baixas_csv, escrever_extrato_xlsx
+    from conciliar_lote import conciliar_lote
+
+    extrato, baixas = dados_sinteticos(500, colisao=0.3, ruido=0.4, seed=1)
+    (tmp_path / "e").mkdir()
+    (tmp_path / "b").mkdir()
+    escrever_extrato_xlsx(extrato, tmp_path / "e" / "extrato.xlsx")
+    escrever_baixas_csv(baixas, tmp_path / "b" / "baixas.csv")
+
+    def rodar():
+        conciliar_lote(
+            [tmp_path / "e"], [tmp_path / "b"], tmp_path / "saida", formato="csv", processos=1,
+            base=tmp_path / "base", incremental=True, apelidos=True, tolerancia_dias=0,
+        )
+        return ler_apelidos(tmp_path / "base")
+
+    primeira = rodar()
+    assert len(primeira) > 0
+    segunda = rodar()
+    assert len(segunda) == len(primeira)
+    assert not segunda.duplicated(["Id Extrato", "Id Baixa"]).any()
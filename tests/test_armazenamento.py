@@ -0,0 +1,86 @@
+# ============================================
+# Base Parquet: regravar um arquivo substitui, não acumula
+# ============================================
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from armazenamento import carregar_baixas, carregar_extratos, gravar_baixas, gravar_extrato
+from identificadores import ids_estaveis
+from leitor_baixas import CAMPOS_ID_BAIXA, ID_BAIXA, processar_baixas
+from leitores_extrato import ler_extrato
+
+RAIZ = Path(__file__).resolve().parent.parent
+BAIXAS = RAIZ / "relação de documentos baixados 10.09.25.csv"
+EXTRATO = RAIZ / "exportar-Santander - Extrato 11 de setembro de 2025-4591-130106767.xlsx"
+
+
+@pytest.fixture(autouse=True)
+def _pyarrow():
+    pytest.importorskip("pyarrow")
+
+
+def _baixas(*linhas) -> pd.DataFrame:
+    """Baixas: (loja, Data Baixa "AAAA-MM-DD" ou None, Responsável, valor), com Ids pelo conteúdo."""
+    df = pd.DataFrame({
+        "Centro de Resultados": [l[0] for l in linhas],
+        "Data": pd.NaT,
+        "Responsável": [l[2] for l in linhas],
+        "Valor Total": [float(l[3]) for l in linhas],
+        "Data Baixa": pd.to_datetime([l[1] for l in linhas]),
+    })
+    df.insert(0, ID_BAIXA, ids_estaveis(df, CAMPOS_ID_BAIXA))
+    return df
+
+
+def _ids(df: pd.DataFrame) -> list:
+    return sorted(df[ID_BAIXA])
+
+
+def test_regravar_o_mesmo_arquivo_nao_duplica(tmp_path):
+    baixas = processar_baixas(BAIXAS)
+    extrato = ler_extrato(EXTRATO)
+    for _ in range(2):
+        gravar_baixas(baixas, tmp_path)
+        gravar_extrato(extrato, tmp_path)
+    lidas = carregar_baixas(tmp_path)
+    assert len(lidas) == len(baixas)
+    assert _ids(lidas) == _ids(baixas)
+    assert sorted(carregar_extratos(tmp_path)["Id Extrato"]) == sorted(extrato["Id Extrato"])
+    assert lidas["Centro de Resultados"].dtype == "category"
+
+
+def test_arquivo_novo_substitui_so_o_periodo_que_cobre(tmp_path):
+    gravar_baixas(_baixas(
+        ("L1", "2025-08-30", "ANA", 10), ("L1", "2025-09-02", "BRUNO", 20),
+        ("L1", "2025-09-05", "CAIO", 30), ("L1", "2025-09-20", "DANI", 40),
+        ("L2", "2025-09-03", "EVA", 50),
+    ), tmp_path)
+    # Reexportação de 01 a 10/09 da L1: BRUNO foi corrigido e CAIO saiu
+    gravar_baixas(_baixas(("L1", "2025-09-01", "FABIO", 60), ("L1", "2025-09-10", "BRUNO", 21)), tmp_path)
+    lidas = carregar_baixas(tmp_path)
+    assert sorted(zip(lidas["Responsável"], lidas["Valor Total"])) == [
+        ("ANA", 10.0), ("BRUNO", 21.0), ("DANI", 40.0), ("EVA", 50.0), ("FABIO", 60.0),
+    ]
+
+
+def test_linhas_sem_data_sao_substituidas_pelo_id(tmp_path):
+    primeira = _baixas(("L1", None, "ANA", 10), ("L1", None, "ANA", 10), ("L1", "2025-09-02", "BRUNO", 20))
+    gravar_baixas(primeira, tmp_path)
+    gravar_baixas(primeira, tmp_path)
+    assert _ids(carregar_baixas(tmp_path)) == _ids(primeira)
+
+    # Um arquivo só com uma das linhas sem data não apaga a outra
+    gravar_baixas(primeira.iloc[[0]], tmp_path)
+    assert _ids(carregar_baixas(tmp_path)) == _ids(primeira)
+
+
+def test_carregar_filtra_periodo_e_loja(tmp_path):
+    gravar_baixas(_baixas(
+        ("L1", "2025-08-31", "ANA", 10), ("L1", "2025-09-01", "BRUNO", 20),
+        ("L2", "2025-09-15", "CAIO", 30), ("L1", "2025-10-01", "DANI", 40), ("L1", None, "EVA", 50),
+    ), tmp_path)
+    assert carregar_baixas(tmp_path, "2025-09-01", "2025-09-30")["Responsável"].tolist() == ["BRUNO", "CAIO"]
+    assert carregar_baixas(tmp_path, lojas=["L2"])["Responsável"].tolist() == ["CAIO"]
+    assert len(carregar_baixas(tmp_path)) == 5
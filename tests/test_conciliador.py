@@ -0,0 +1,68 @@
+# ============================================
+# Regressão da conciliação contra a versão base do repositório
+# ============================================
+# dados/esperado_base.csv guarda, para cada caso, o resultado completo (todas
+# as colunas, linha a linha) do conciliar_multi_nivel da versão base
+# (13848a7, ainda dentro do app.py), com os parâmetros padrão, rodado sobre as
+# mesmas entradas. Os casos são os dois pares de arquivos de exemplo do
+# repositório e um par pequeno (dados/extrato_nomes.csv e baixas_nomes.csv)
+# com valores repetidos e datas distantes, que passa pelo Nível 3 (nomes).
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from conciliador import conciliar_multi_nivel
+from leitor_baixas import processar_baixas
+from leitores_extrato import ler_extrato
+
+RAIZ = Path(__file__).resolve().parent.parent
+DADOS = Path(__file__).resolve().parent / "dados"
+ESPERADO = DADOS / "esperado_base.csv"
+
+AMOSTRAS = {
+    "11-09": (
+        "exportar-Santander - Extrato 11 de setembro de 2025-4591-130106767.xlsx",
+        "relação de documentos baixados 10.09.25.csv",
+    ),
+    "29-09": (
+        "Arquivos Base/exportar-Santander - Extrato 29 de setembro de 2025-4591-130106767.xlsx",
+        "Arquivos Base/BAAIXAS.csv",
+    ),
+}
+CASOS = [*AMOSTRAS, "nomes"]
+
+
+def entradas(caso: str) -> tuple:
+    """(df_extrato, df_baixas) do caso."""
+    if caso == "nomes":
+        texto = {"Id Extrato": str, "Id Baixa": str, "Documento": str}
+        df_extrato = pd.read_csv(DADOS / "extrato_nomes.csv", dtype=texto, parse_dates=["Data"])
+        df_baixas = pd.read_csv(DADOS / "baixas_nomes.csv", dtype=texto, parse_dates=["Data", "Data Baixa"])
+        return df_extrato, df_baixas
+    extrato, baixas = AMOSTRAS[caso]
+    return ler_extrato(RAIZ / extrato), processar_baixas(RAIZ / baixas)
+
+
+def como_texto(res: pd.DataFrame) -> pd.DataFrame:
+    """Resultado com todas as colunas como texto ("" nas lacunas), como fica no CSV."""
+    return res.astype(object).where(res.notna(), "").astype(str).reset_index(drop=True)
+
+
+@pytest.fixture(scope="module")
+def esperado() -> pd.DataFrame:
+    return pd.read_csv(ESPERADO, dtype=str, keep_default_na=False)
+
+
+@pytest.mark.parametrize("modo", [None, "guloso"])
+@pytest.mark.parametrize("caso", CASOS)
+def test_resultado_igual_ao_da_versao_base(caso, modo, esperado):
+    parametros = {} if modo is None else {"modo": modo}
+    obtido = como_texto(conciliar_multi_nivel(*entradas(caso), **parametros))
+    alvo = esperado[esperado["Caso"] == caso].drop(columns="Caso").reset_index(drop=True)
+    pd.testing.assert_frame_equal(obtido, alvo)
+
+
+def test_caso_nomes_passa_pelo_nivel_3(esperado):
+    niveis = esperado.loc[esperado["Caso"] == "nomes", "Nível Conciliação"]
+    assert niveis.str.startswith("Nível 3").sum() >= 5
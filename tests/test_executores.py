@@ -0,0 +1,39 @@
+# ============================================
+# Execução em blocos: threads e processos dão o mesmo resultado do serial
+# ============================================
+import pandas as pd
+import pytest
+
+from benchmark import dados_sinteticos
+from conciliador import conciliar_multi_nivel
+
+# Janela de datas curta, para sobrar trabalho para o Nível 3
+PARAMETROS = {
+    "guloso": {"tolerancia_dias": 1},
+    "otimo": {"tolerancia_dias": 1, "modo": "otimo"},
+    "tolerancia": {"tolerancia_dias": 1, "tolerancia_valor": 0.05, "tolerancia_valor_pct": 1.0},
+    "otimo+tolerancia": {"tolerancia_dias": 1, "modo": "otimo", "tolerancia_valor": 0.10},
+    "nome+agrupar": {"tolerancia_dias": 1, "nivel_nome": True, "agrupar": True},
+}
+
+
+@pytest.fixture(scope="module")
+def entradas():
+    # Muitos valores repetidos e nomes com ruído: blocos grandes nos Níveis 2 e 3
+    return dados_sinteticos(600, colisao=0.4, ruido=0.4, seed=3)
+
+
+@pytest.mark.parametrize("executor", ["threads", "processos"])
+@pytest.mark.parametrize("nome", list(PARAMETROS))
+def test_executor_igual_ao_serial(entradas, executor, nome):
+    df_extrato, df_baixas = entradas
+    serial = conciliar_multi_nivel(df_extrato, df_baixas, **PARAMETROS[nome])
+    em_blocos = conciliar_multi_nivel(
+        df_extrato, df_baixas, executor=executor, trabalhadores=3, **PARAMETROS[nome]
+    )
+    pd.testing.assert_frame_equal(em_blocos, serial)
+
+
+def test_executor_invalido(entradas):
+    with pytest.raises(ValueError, match="executor inválido"):
+        conciliar_multi_nivel(*entradas, executor="gpu")
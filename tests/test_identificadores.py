@@ -0,0 +1,75 @@
+# ============================================
+# Ids estáveis: mesmo conteúdo, mesmo Id, em qualquer ordem ou leitura
+# ============================================
+from pathlib import Path
+
+import pandas as pd
+
+from identificadores import ids_estaveis
+from leitor_baixas import CAMPOS_ID_BAIXA, processar_baixas
+from leitores_extrato import ler_extrato
+
+RAIZ = Path(__file__).resolve().parent.parent
+BAIXAS = RAIZ / "Arquivos Base" / "BAAIXAS.csv"
+EXTRATO = RAIZ / "exportar-Santander - Extrato 11 de setembro de 2025-4591-130106767.xlsx"
+CAMPOS = ["Data", "Responsável", "Valor"]
+
+
+def _linhas() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Data": pd.to_datetime(["2025-09-01", "2025-09-01", "2025-09-02", "2025-09-01", "2025-09-01"]),
+        "Responsável": ["ANA", "ANA", "BRUNO", "ANA", "CAIO"],
+        "Valor": [10.0, 10.0, 20.0, 10.0, 10.0],
+    })
+
+
+def test_linhas_repetidas_recebem_contador():
+    ids = ids_estaveis(_linhas(), CAMPOS)
+    assert ids[1] == ids[0] + "#2"
+    assert ids[3] == ids[0] + "#3"
+    assert len(ids[0]) == 16 and "#" not in ids[0]
+    assert ids.is_unique
+
+
+def test_reordenar_as_linhas_nao_muda_os_ids():
+    df = _linhas()
+    ids = ids_estaveis(df, CAMPOS)
+    ordem = [4, 3, 2, 1, 0]
+    reordenados = ids_estaveis(df.iloc[ordem], CAMPOS)
+    assert sorted(reordenados) == sorted(ids)
+    # Linhas sem repetição mantêm o próprio Id; as repetidas trocam só o contador
+    assert reordenados[2] == ids[2] and reordenados[4] == ids[4]
+    assert reordenados[3] == ids[0]
+
+
+def test_linhas_a_mais_nao_mudam_os_ids_das_outras():
+    df = _linhas()
+    maior = pd.concat([df.iloc[:3], pd.DataFrame({"Data": [pd.Timestamp("2025-09-03")], "Responsável": ["DANI"],
+                                                  "Valor": [5.0]}), df.iloc[3:]], ignore_index=True)
+    ids = ids_estaveis(df, CAMPOS)
+    assert ids_estaveis(maior, CAMPOS).drop(index=3).tolist() == ids.tolist()
+
+
+def test_id_nao_depende_do_dtype():
+    df = _linhas()
+    outro = df.assign(
+        Responsável=df["Responsável"].astype("category"),
+        Valor=df["Valor"] - 0.1 + 0.1,  # mesmo valor em centavos, float diferente
+    )
+    assert ids_estaveis(outro, CAMPOS).tolist() == ids_estaveis(df, CAMPOS).tolist()
+    # Coluna ausente conta como texto vazio
+    assert ids_estaveis(df.drop(columns="Data"), CAMPOS).tolist() == ids_estaveis(df.assign(Data=""), CAMPOS).tolist()
+
+
+def test_reler_os_arquivos_da_os_mesmos_ids():
+    assert processar_baixas(BAIXAS)["Id Baixa"].tolist() == processar_baixas(BAIXAS, engine="python")["Id Baixa"].tolist()
+    assert processar_baixas(BAIXAS)["Id Baixa"].is_unique
+    extrato = ler_extrato(EXTRATO)
+    assert ler_extrato(EXTRATO)["Id Extrato"].tolist() == extrato["Id Extrato"].tolist()
+    assert extrato["Id Extrato"].is_unique
+
+
+def test_ids_das_baixas_em_outra_ordem():
+    baixas = processar_baixas(BAIXAS)
+    invertidas = baixas.iloc[::-1].reset_index(drop=True)
+    assert sorted(ids_estaveis(invertidas, CAMPOS_ID_BAIXA)) == sorted(baixas["Id Baixa"])
@@ -0,0 +1,102 @@
+# ============================================
+# Conciliação incremental: pares já conciliados ficam fora dos níveis
+# ============================================
+import pandas as pd
+import pytest
+
+from benchmark import dados_sinteticos
+from conciliador import COLUNAS_PARES, conciliar_incremental, conciliar_multi_nivel
+from identificadores import ids_estaveis
+from leitor_baixas import CAMPOS_ID_BAIXA
+from leitor_extrato_santander import CAMPOS_ID_EXTRATO
+
+DIA = pd.Timestamp("2025-09-10")
+
+
+def _extrato(linhas) -> pd.DataFrame:
+    """Saídas do extrato: [(Id, dia relativo, valor positivo em R$)]."""
+    return pd.DataFrame({
+        "Id Extrato": [l[0] for l in linhas],
+        "Data": [DIA + pd.Timedelta(days=l[1]) for l in linhas],
+        "Documento": None,
+        "Responsável": "ANA",
+        "Valor": [-l[2] for l in linhas],
+    })
+
+
+def _baixas(linhas) -> pd.DataFrame:
+    """Baixas: [(Id, dia relativo, valor em R$)]."""
+    return pd.DataFrame({
+        "Id Baixa": [l[0] for l in linhas],
+        "Data": pd.NaT,
+        "Data Baixa": [DIA + pd.Timedelta(days=l[1]) for l in linhas],
+        "Documento": None,
+        "Responsável": "CARLA",
+        "Valor Total": [l[2] for l in linhas],
+        "Centro de Resultados": "L1",
+    })
+
+
+def _sinteticos(seed: int) -> tuple:
+    """dados_sinteticos com Ids pelo conteúdo, como os que os leitores geram."""
+    df_extrato, df_baixas = dados_sinteticos(300, colisao=0.3, seed=seed)
+    df_extrato.insert(0, "Id Extrato", ids_estaveis(df_extrato, CAMPOS_ID_EXTRATO))
+    df_baixas.insert(0, "Id Baixa", ids_estaveis(df_baixas, CAMPOS_ID_BAIXA))
+    return df_extrato, df_baixas
+
+
+def _conciliados(res: pd.DataFrame) -> list:
+    conc = res[res["Status"] == "✅ Conciliado"]
+    return sorted(map(tuple, conc[["Id Extrato", "Id Baixa", "Nível Conciliação", "Detalhe"]].values))
+
+
+def test_primeira_execucao_igual_a_conciliacao_completa():
+    df_extrato, df_baixas = _sinteticos(5)
+    res, pares = conciliar_incremental(df_extrato, df_baixas)
+    completo = conciliar_multi_nivel(df_extrato, df_baixas)
+    # Só a numeração do Id Conciliado muda (é refeita depois da ordenação)
+    pd.testing.assert_frame_equal(
+        res.drop(columns="Id Conciliado").reset_index(drop=True),
+        completo.drop(columns="Id Conciliado").reset_index(drop=True),
+    )
+    assert list(pares.columns) == COLUNAS_PARES
+    assert len(pares) == (completo["Status"] == "✅ Conciliado").sum()
+
+
+def test_pares_anteriores_mantem_nivel_e_detalhe_e_saem_dos_niveis():
+    dia_1 = (_extrato([("e1", 0, 100)]), _baixas([("b1", 2, 100)]))
+    res_1, pares_1 = conciliar_incremental(*dia_1)
+    assert _conciliados(res_1) == [("e1", "b1", "Nível 1 (Valor)", "Valor idêntico")]
+
+    # No dia 2 o valor 100 repete dos dois lados: do zero, seria Nível 2.
+    # Com os pares do dia 1, e1-b1 volta como estava e só e2/b2 entram nos níveis
+    dia_2 = (_extrato([("e1", 0, 100), ("e2", 2, 100)]), _baixas([("b1", 2, 100), ("b2", 2, 100)]))
+    assert {n for *_, n, _ in _conciliados(conciliar_multi_nivel(*dia_2))} == {"Nível 2 (Valor+Data)"}
+    res_2, pares_2 = conciliar_incremental(*dia_2, pares_anteriores=pares_1)
+    assert _conciliados(res_2) == [
+        ("e1", "b1", "Nível 1 (Valor)", "Valor idêntico"),
+        ("e2", "b2", "Nível 1 (Valor)", "Valor idêntico"),
+    ]
+    assert len(res_2) == 2 and res_2["Id Conciliado"].is_unique
+    assert pares_2[["Id Extrato", "Id Baixa"]].values.tolist() == [["e1", "b1"], ["e2", "b2"]]
+
+
+def test_reexecutar_com_os_mesmos_arquivos_nao_muda_nada():
+    df_extrato, df_baixas = _sinteticos(6)
+    res_1, pares_1 = conciliar_incremental(df_extrato, df_baixas)
+    res_2, pares_2 = conciliar_incremental(df_extrato, df_baixas, pares_anteriores=pares_1)
+    assert _conciliados(res_2) == _conciliados(res_1)
+    assert len(res_2) == len(res_1)
+    pd.testing.assert_frame_equal(pares_2, pares_1)
+
+
+def test_pares_de_linhas_ausentes_nao_entram_no_resultado():
+    _, pares = conciliar_incremental(_extrato([("e1", 0, 100)]), _baixas([("b1", 0, 100)]))
+    res, pares_2 = conciliar_incremental(_extrato([("e9", 0, 50)]), _baixas([("b9", 0, 50)]), pares)
+    assert _conciliados(res) == [("e9", "b9", "Nível 1 (Valor)", "Valor idêntico")]
+    assert len(pares_2) == 2  # os pares antigos continuam guardados
+
+
+def test_incremental_exige_ids():
+    with pytest.raises(ValueError, match="Id Extrato"):
+        conciliar_incremental(_extrato([("e1", 0, 100)]).drop(columns="Id Extrato"), _baixas([("b1", 0, 100)]))
@@ -0,0 +1,91 @@
+# ============================================
+# Leitor de baixas: parser C e leitura em blocos iguais à leitura linha a linha
+# ============================================
+import io
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from leitor_baixas import baixas_para_parquet, processar_baixas, processar_baixas_em_blocos
+
+RAIZ = Path(__file__).resolve().parent.parent
+AMOSTRAS = [
+    RAIZ / "relação de documentos baixados 10.09.25.csv",
+    RAIZ / "Arquivos Base" / "BAAIXAS.csv",
+]
+
+# Cinco linhas de cabeçalho, dois centros e as três variantes de colunas
+# (Lancamento Baixa em partes[10], [11] ou [13]), com linhas ignoradas,
+# espaços nas pontas dos campos e fins de linha misturados
+RELACAO = (
+    "Sistema Posto Delta\r\n"
+    "Relação de documentos baixados\r\n"
+    "Período: 01/09/2025 a 10/09/2025\r\n"
+    "\r\n"
+    "Data;Lançamento;Conta;Responsável;;Documento;Valor;;Baixa;;Tipo\r\n"
+    "POSTO ALFA;;;;;;;;;;;;;\r\n"
+    "01/09/2025;Pagamento; 2.1.01 ;JOÃO SILVA;;NF 10;1.234,56;;02/09/2025;;PIX\r\n"
+    "02/09/2025;Pagamento;2.1.01;;MARIA SOUZA;;NF 11;99,90;;03/09/2025;;TED\n"
+    "03/09/2025;Pagamento;2.1.02;POSTO BETA;;;NF 12;10,00;;04/09/2025;;;;Dinheiro\n"
+    "Subtotal;;;;;;1.344,46\n"
+    ";;;;;;;\n"
+    "POSTO GAMA;;;;;;;;;;;;;\r"
+    "Data;Lançamento;Conta\r"
+    "05/09/2025;Pagamento;2.1.01;ANA \"LIMA\";;NF 13;50,00;;05/09/2025;;PIX\r\n"
+    "05/09/2025;Pagamento;2.1.01;ANA \"LIMA\";;NF 13;50,00;;05/09/2025;;PIX\r\n"
+    "Total;;;;;;1.444,46\r\n"
+).encode("latin1")
+
+
+@pytest.mark.parametrize("caminho", AMOSTRAS, ids=lambda p: p.name)
+def test_engine_c_igual_a_python_nas_amostras(caminho):
+    pd.testing.assert_frame_equal(processar_baixas(caminho, engine="c"), processar_baixas(caminho, engine="python"))
+
+
+def test_engine_c_igual_a_python_nas_variantes_de_layout():
+    df_c = processar_baixas(io.BytesIO(RELACAO), engine="c")
+    pd.testing.assert_frame_equal(df_c, processar_baixas(io.BytesIO(RELACAO), engine="python"))
+    assert df_c["Centro de Resultados"].tolist() == ["POSTO ALFA"] * 3 + ["POSTO GAMA"] * 2
+    assert df_c["Responsável"].tolist() == ["JOÃO SILVA", "MARIA SOUZA", "POSTO BETA", 'ANA "LIMA"', 'ANA "LIMA"']
+    assert df_c["Lancamento Baixa"].tolist() == ["PIX", "TED", "Dinheiro", "PIX", "PIX"]
+    assert df_c["Valor Total"].tolist() == [1234.56, 99.90, 10.00, 50.00, 50.00]
+    assert df_c["Conta"].iloc[0] == "2.1.01"
+    assert df_c["Id Baixa"].is_unique
+
+
+def test_engine_invalido():
+    with pytest.raises(ValueError, match="engine inválido"):
+        processar_baixas(io.BytesIO(RELACAO), engine="pyarrow")
+
+
+# Blocos menores que uma linha, do tamanho de algumas linhas, cortando o
+# "\r\n" ao meio (o 1º terminador fica no byte 19) e maiores que o arquivo
+TAMANHOS_BLOCO = [1, 7, 20, 64, 300, 1 << 20]
+
+
+@pytest.mark.parametrize("engine", ["c", "python"])
+@pytest.mark.parametrize("bytes_por_bloco", TAMANHOS_BLOCO)
+def test_em_blocos_igual_ao_arquivo_inteiro(bytes_por_bloco, engine):
+    inteiro = processar_baixas(io.BytesIO(RELACAO), engine=engine).drop(columns="Id Baixa")
+    blocos = list(processar_baixas_em_blocos(io.BytesIO(RELACAO), bytes_por_bloco, engine=engine))
+    juntos = pd.concat(blocos, ignore_index=True).astype(inteiro.dtypes.to_dict())
+    pd.testing.assert_frame_equal(juntos, inteiro)
+
+
+@pytest.mark.parametrize("caminho", AMOSTRAS, ids=lambda p: p.name)
+def test_em_blocos_igual_ao_arquivo_inteiro_nas_amostras(caminho):
+    inteiro = processar_baixas(caminho).drop(columns="Id Baixa")
+    blocos = list(processar_baixas_em_blocos(caminho, bytes_por_bloco=4096))
+    assert len(blocos) > 1
+    juntos = pd.concat(blocos, ignore_index=True).astype(inteiro.dtypes.to_dict())
+    pd.testing.assert_frame_equal(juntos, inteiro)
+
+
+def test_baixas_para_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    destino = tmp_path / "baixas.parquet"
+    assert baixas_para_parquet(io.BytesIO(RELACAO), destino, bytes_por_bloco=64) == 5
+    lido = pd.read_parquet(destino)
+    inteiro = processar_baixas(io.BytesIO(RELACAO)).drop(columns="Id Baixa")
+    pd.testing.assert_frame_equal(lido.astype(inteiro.dtypes.to_dict()), inteiro, check_dtype=False)
@@ -0,0 +1,115 @@
+# ============================================
+# Leitores de extrato: histórico, valores em CSV e layout genérico "tabela"
+# ============================================
+import io
+import re
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from leitor_extrato_santander import _numero_br, _separar_tipo_responsavel, ler_grade
+from leitores_extrato import detectar_layout, ler_extrato
+
+
+def _xlsx(linhas) -> bytes:
+    wb = Workbook()
+    ws = wb.active
+    for linha in linhas:
+        ws.append(linha)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+def _split_tipo_responsavel(historico):
+    """Divisão linha a linha da versão original do leitor (a referência)."""
+    if not isinstance(historico, str):
+        return historico, None
+    h = historico.strip()
+    if "  " in h:
+        partes = re.split(r"\s{2,}", h, maxsplit=1)
+        tipo = partes[0].strip()
+        resp = partes[1].strip() if len(partes) > 1 else None
+        return tipo, resp
+    return h, None
+
+
+HISTORICOS = [
+    "PIX ENVIADO  JOAO DA SILVA",
+    "  TED RECEBIDA     MARIA  SOUZA ME  ",
+    "TARIFA BANCARIA",
+    "TARIFA  ",
+    "A \tB",
+    "PAGAMENTO\t\tBOLETO",
+    "DOC\xa0\xa0POSTO ALFA",
+    "DEPOSITO \u3000 CAIXA",
+    "",
+    "   ",
+    None,
+    float("nan"),
+    1234,
+]
+
+
+@pytest.mark.parametrize("dtype", [object, "str"])
+def test_separar_tipo_responsavel_igual_a_divisao_linha_a_linha(dtype):
+    textos = [h for h in HISTORICOS if isinstance(h, str)]
+    historico = pd.Series(HISTORICOS if dtype is object else textos, dtype=dtype)
+    tipo, resp = _separar_tipo_responsavel(historico)
+    # Como a versão original montava as colunas: .apply e um elemento da tupla
+    partes = historico.apply(_split_tipo_responsavel)
+    pd.testing.assert_series_equal(tipo, partes.apply(lambda x: x[0]))
+    pd.testing.assert_series_equal(resp, partes.apply(lambda x: x[1]))
+
+
+def test_separar_tipo_responsavel_sem_nenhum_texto():
+    tipo, resp = _separar_tipo_responsavel(pd.Series([1.5, None], dtype=object))
+    assert tipo.iloc[0] == 1.5 and pd.isna(tipo.iloc[1])
+    assert resp.tolist() == [None, None]
+
+
+def test_csv_com_ponto_decimal():
+    csv = b"Data,Descricao,Valor\n10/09/2025,PIX ENVIADO  JOAO,-66.88\n11/09/2025,TED RECEBIDA  MARIA,1234.5\n"
+    df = ler_extrato(csv)
+    assert df["Valor"].tolist() == [-66.88, 1234.5]
+    assert df["Responsável"].tolist() == ["JOAO", "MARIA"]
+
+
+def test_csv_com_virgula_decimal():
+    csv = "Data;Histórico;Valor\n10/09/2025;PIX ENVIADO  JOÃO;-1.066,88\n11/09/2025;TED  MARIA;1.234\n"
+    df = ler_extrato(csv.encode("latin1"))
+    assert df["Valor"].tolist() == [-1066.88, 1234.0]
+
+
+def test_csv_separado_por_tab_com_ponto_decimal():
+    csv = b"Data\tDescricao\tValor\n10/09/2025\tPIX  JOAO\t-66.88\n"
+    assert ler_extrato(csv)["Valor"].tolist() == [-66.88]
+
+
+def test_layout_tabela_xlsx_com_numeros_e_textos():
+    dados = _xlsx([
+        ["Data", "Descrição", "Valor"],
+        ["10/09/2025", "PIX ENVIADO  JOAO", -66.88],
+        ["11/09/2025", "TED  MARIA", "1234.5"],
+        ["12/09/2025", "TARIFA", 1234.5],
+    ])
+    assert detectar_layout(ler_grade(dados)) == "tabela"
+    assert ler_extrato(dados)["Valor"].tolist() == [-66.88, 1234.5, 1234.5]
+
+
+@pytest.mark.parametrize("valores, esperado", [
+    (["-1.234,56", "R$ 10,00", "15,00 D", "1.234"], [-1234.56, 10.0, -15.0, 1234.0]),
+    (["-66.88", "1234.5", "10"], [-66.88, 1234.5, 10.0]),
+    (["1,234.56", "-2.5"], [1234.56, -2.5]),
+    (["1.234.567"], [1234567.0]),
+])
+def test_numero_br_detecta_o_separador_decimal(valores, esperado):
+    assert _numero_br(pd.Series(valores, dtype=object)).tolist() == esperado
+
+
+def test_numero_br_nao_altera_numeros():
+    valores = pd.Series([1234.5, "2,5", None], dtype=object)
+    convertidos = _numero_br(valores)
+    assert convertidos.iloc[:2].tolist() == [1234.5, 2.5]
+    assert pd.isna(convertidos.iloc[2])
@@ -0,0 +1,59 @@
+# ============================================
+# Modo ótimo (Níveis 2 e 3 por atribuição) contra o guloso
+# ============================================
+import pandas as pd
+import pytest
+
+from benchmark import dados_sinteticos
+from conciliador import conciliar_multi_nivel
+
+DIA = pd.Timestamp("2025-09-10")
+
+
+def _conciliados(res: pd.DataFrame) -> pd.DataFrame:
+    return res[res["Status"] == "✅ Conciliado"]
+
+
+def test_otimo_concilia_mais_que_o_guloso_quando_a_ordem_atrapalha():
+    # e1 pega b1 (Δ=1) no guloso e deixa e2 sem par; o ótimo faz e1-b2 e e2-b1
+    df_extrato = pd.DataFrame({
+        "Id Extrato": ["e1", "e2"],
+        "Data": [DIA, DIA + pd.Timedelta(days=3)],
+        "Documento": None,
+        "Responsável": ["ANA", "BRUNO"],
+        "Valor": [-100.0, -100.0],
+    })
+    df_baixas = pd.DataFrame({
+        "Id Baixa": ["b1", "b2"],
+        "Data": pd.NaT,
+        "Data Baixa": [DIA + pd.Timedelta(days=1), DIA - pd.Timedelta(days=2)],
+        "Documento": None,
+        "Responsável": ["CARLA", "DIEGO"],
+        "Valor Total": [100.0, 100.0],
+        "Centro de Resultados": "L1",
+    })
+    guloso = _conciliados(conciliar_multi_nivel(df_extrato, df_baixas, tolerancia_dias=3))
+    otimo = _conciliados(conciliar_multi_nivel(df_extrato, df_baixas, tolerancia_dias=3, modo="otimo"))
+    assert guloso[["Id Extrato", "Id Baixa"]].values.tolist() == [["e1", "b1"]]
+    assert sorted(otimo[["Id Extrato", "Id Baixa"]].values.tolist()) == [["e1", "b2"], ["e2", "b1"]]
+    assert (otimo["Nível Conciliação"] == "Nível 2 (Valor+Data)").all()
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("parametros", [
+    {"tolerancia_dias": 1},
+    {"tolerancia_dias": 3, "tolerancia_valor": 0.10},
+], ids=["padrao", "tolerancia"])
+def test_otimo_nunca_concilia_menos_que_o_guloso(seed, parametros):
+    df_extrato, df_baixas = dados_sinteticos(400, colisao=0.5, ruido=0.4, seed=seed)
+    guloso = _conciliados(conciliar_multi_nivel(df_extrato, df_baixas, **parametros))
+    otimo = _conciliados(conciliar_multi_nivel(df_extrato, df_baixas, modo="otimo", **parametros))
+    assert len(otimo) >= len(guloso)
+    # O Nível 1 vem antes e não depende do modo
+    nivel_1 = "Nível 1 (Valor)"
+    assert (otimo["Nível Conciliação"] == nivel_1).sum() == (guloso["Nível Conciliação"] == nivel_1).sum()
+
+
+def test_modo_invalido():
+    with pytest.raises(ValueError, match="modo inválido"):
+        conciliar_multi_nivel(*dados_sinteticos(20, seed=0), modo="rapido")
@@ -0,0 +1,247 @@
+# ============================================
+# Invariantes de cada nível da conciliação, em casos pequenos montados à mão
+# ============================================
+import math
+
+import pandas as pd
+import pytest
+from thefuzz import fuzz
+
+import conciliador
+from conciliador import _subconjunto_soma, conciliar_multi_nivel
+
+DIA = pd.Timestamp("2025-09-10")
+
+
+def _dia(n: int) -> pd.Timestamp:
+    return DIA + pd.Timedelta(days=n)
+
+
+def _extrato(*linhas) -> pd.DataFrame:
+    """Saídas do extrato: (Id, dia relativo ou None, Responsável, valor positivo em R$)."""
+    return pd.DataFrame({
+        "Id Extrato": [l[0] for l in linhas],
+        "Data": [pd.NaT if l[1] is None else _dia(l[1]) for l in linhas],
+        "Documento": None,
+        "Responsável": [l[2] for l in linhas],
+        "Valor": [-l[3] for l in linhas],
+    })
+
+
+def _baixas(*linhas) -> pd.DataFrame:
+    """Baixas: (Id, dia relativo ou None, Responsável, valor em R$[, Centro de Resultados])."""
+    return pd.DataFrame({
+        "Id Baixa": [l[0] for l in linhas],
+        "Data": pd.NaT,
+        "Data Baixa": [pd.NaT if l[1] is None else _dia(l[1]) for l in linhas],
+        "Documento": None,
+        "Responsável": [l[2] for l in linhas],
+        "Valor Total": [l[3] for l in linhas],
+        "Centro de Resultados": [l[4] if len(l) > 4 else "L1" for l in linhas],
+    })
+
+
+def _pares(res: pd.DataFrame) -> list:
+    """[(Id Extrato, Id Baixa, nível sem a descrição)] dos conciliados, na ordem do resultado."""
+    conc = res[res["Status"] == "✅ Conciliado"]
+    return [(e, b, n.split(" (")[0]) for e, b, n in conc[["Id Extrato", "Id Baixa", "Nível Conciliação"]].values]
+
+
+# ============================================
+# Nível 2: janelas de datas ordenadas
+# ============================================
+def test_nivel_2_fica_com_o_menor_delta():
+    ext = _extrato(("e1", 0, "ANA", 100), ("e2", 30, "ANA", 100))
+    bx = _baixas(("b1", 3, "CARLA", 100), ("b2", -1, "DIEGO", 100), ("b3", 2, "ELISA", 100))
+    assert _pares(conciliar_multi_nivel(ext, bx)) == [("e1", "b2", "Nível 2")]
+
+
+def test_nivel_2_empate_no_delta_fica_com_a_primeira_baixa():
+    ext = _extrato(("e1", 0, "ANA", 100), ("e2", 30, "ANA", 100))
+    antes_depois = _baixas(("b1", -2, "CARLA", 100), ("b2", 2, "DIEGO", 100))
+    depois_antes = _baixas(("b2", 2, "DIEGO", 100), ("b1", -2, "CARLA", 100))
+    assert _pares(conciliar_multi_nivel(ext, antes_depois)) == [("e1", "b1", "Nível 2")]
+    assert _pares(conciliar_multi_nivel(ext, depois_antes)) == [("e1", "b2", "Nível 2")]
+
+
+def test_nivel_2_saidas_escolhem_na_ordem_do_extrato():
+    # e2 tem Δ 0 com b1, mas e1 vem antes no extrato e fica com ela
+    ext = _extrato(("e1", 0, "ANA", 100), ("e2", 1, "BRUNO", 100))
+    bx = _baixas(("b1", 1, "CARLA", 100), ("b2", 4, "DIEGO", 100))
+    assert _pares(conciliar_multi_nivel(ext, bx)) == [("e1", "b1", "Nível 2"), ("e2", "b2", "Nível 2")]
+
+
+def test_nivel_2_janela_inclui_exatamente_tolerancia_dias():
+    ext = _extrato(("e1", 0, "ANA", 100), ("e2", 0, "BRUNO", 100), ("e3", 0, "CAIO", 200), ("e4", 0, "DANI", 200))
+    bx = _baixas(("b1", 3, "CARLA", 100), ("b2", -4, "DIEGO", 200), ("b3", 4, "ELISA", 200))
+    assert _pares(conciliar_multi_nivel(ext, bx, tolerancia_dias=3)) == [("e1", "b1", "Nível 2")]
+    assert len(_pares(conciliar_multi_nivel(ext, bx, tolerancia_dias=4))) == 3
+
+
+def test_nivel_2_ignora_linhas_sem_data():
+    ext = _extrato(("e1", None, "ANA", 100), ("e2", 0, "BRUNO", 100))
+    bx = _baixas(("b1", 0, "CARLA", 100), ("b2", None, "DIEGO", 100))
+    assert _pares(conciliar_multi_nivel(ext, bx)) == [("e2", "b1", "Nível 2")]
+
+
+# ============================================
+# Nível 3: similaridade de nomes em lote
+# ============================================
+# Sem datas, para nada passar pelo Nível 2
+def test_nivel_3_fica_com_o_maior_score():
+    ext = _extrato(("e1", None, "JOAO SILVA", 100), ("e2", None, "XX", 100))
+    bx = _baixas(("b1", None, "JOAO SILVAS", 100), ("b2", None, "SILVA JOAO", 100), ("b3", None, "MARIA", 100))
+    assert _pares(conciliar_multi_nivel(ext, bx)) == [("e1", "b2", "Nível 3")]
+
+
+def test_nivel_3_empate_no_score_fica_com_a_primeira_baixa():
+    ext = _extrato(("e1", None, "JOAO SILVA", 100), ("e2", None, "XX", 100))
+    bx = _baixas(("b1", None, "MARIA", 100), ("b2", None, "SILVA JOAO", 100), ("b3", None, "JOAO SILVA", 100))
+    assert _pares(conciliar_multi_nivel(ext, bx)) == [("e1", "b2", "Nível 3")]
+
+
+def test_nivel_3_limite_de_similaridade_inclusivo():
+    score = fuzz.token_sort_ratio("MARIA SOUZA", "MARIA SOUSA")
+    ext = _extrato(("e1", None, "MARIA SOUZA", 100), ("e2", None, "XX", 100))
+    bx = _baixas(("b1", None, "MARIA SOUSA", 100), ("b2", None, "YY", 100))
+    res = conciliar_multi_nivel(ext, bx, limite_similaridade=score)
+    assert _pares(res) == [("e1", "b1", "Nível 3")]
+    assert res["Detalhe"].iloc[0] == f"similaridade {score}%"
+    assert _pares(conciliar_multi_nivel(ext, bx, limite_similaridade=score + 1)) == []
+
+
+def test_nivel_3_pontua_cada_par_de_nomes_distintos_uma_vez():
+    ext = _extrato(*[(f"e{i}", None, "JOAO SILVA", 100) for i in range(4)])
+    bx = _baixas(*[(f"b{i}", None, ["Joao Silva", "JOAO SILVA!"][i % 2], 100) for i in range(4)])
+    medicoes = []
+    res = conciliar_multi_nivel(ext, bx, medicoes=medicoes)
+    assert [n for _, _, n in _pares(res)] == ["Nível 3"] * 4
+    nivel_3 = next(m for m in medicoes if m["Etapa"] == "Nível 3")
+    assert nivel_3["Candidatos"] == 16
+    assert nivel_3["Comparações fuzzy"] == 1  # os dois nomes das baixas normalizam igual
+
+
+# ============================================
+# Nível 4: soma de várias linhas (subset-sum)
+# ============================================
+def _grupos(res: pd.DataFrame) -> list:
+    """Grupos do Nível 4 como conjuntos de Ids (extrato e baixas), na ordem do resultado."""
+    conc = res[res["Nível Conciliação"] == "Nível 4 (Agrupado)"]
+    return [set(g["Id Extrato"]) | set(g["Id Baixa"]) for _, g in conc.groupby("Detalhe", sort=False)]
+
+
+def test_subconjunto_soma():
+    assert _subconjunto_soma([500, 300, 200, 100], 600, 3, math.inf) == [0, 3]
+    assert _subconjunto_soma([500, 300, 200, 100], 1100, 3, math.inf) is None
+    assert _subconjunto_soma([500, 300, 200, 100], 1100, 4, math.inf) == [0, 1, 2, 3]
+    assert _subconjunto_soma([300, 300, 300], 700, 3, math.inf) is None
+
+
+def test_subconjunto_soma_respeita_o_prazo():
+    assert _subconjunto_soma([500, 300, 200, 100], 600, 3, -math.inf) is None
+
+
+def test_nivel_4_baixas_somam_uma_saida():
+    ext = _extrato(("e1", 0, "POSTO ALFA", 300))
+    bx = _baixas(("b1", 1, "POSTO ALFA", 100), ("b2", -1, "POSTO ALFA", 200), ("b3", 0, "POSTO ALFA", 50))
+    res = conciliar_multi_nivel(ext, bx, agrupar=True)
+    assert _grupos(res) == [{"e1", "b1", "b2"}]
+    assert res["Detalhe"].iloc[0] == "grupo 1: 2 baixas = 1 lançamento"
+
+
+def test_nivel_4_saidas_somam_uma_baixa():
+    ext = _extrato(("e1", 0, "POSTO ALFA", 120), ("e2", 2, "POSTO ALFA", 80))
+    bx = _baixas(("b1", 1, "POSTO ALFA", 200))
+    assert _grupos(conciliar_multi_nivel(ext, bx, agrupar=True)) == [{"e1", "e2", "b1"}]
+
+
+def test_nivel_4_so_agrupa_mesmo_centro_e_dentro_da_janela():
+    ext = _extrato(("e1", 0, "POSTO ALFA", 300))
+    outro_centro = _baixas(("b1", 0, "POSTO ALFA", 100), ("b2", 0, "POSTO ALFA", 200, "L2"))
+    fora_da_janela = _baixas(("b1", 0, "POSTO ALFA", 100), ("b2", 4, "POSTO ALFA", 200))
+    assert _grupos(conciliar_multi_nivel(ext, outro_centro, agrupar=True)) == []
+    assert _grupos(conciliar_multi_nivel(ext, fora_da_janela, agrupar=True)) == []
+    assert _grupos(conciliar_multi_nivel(ext, fora_da_janela, agrupar=True, tolerancia_dias=4)) == [{"e1", "b1", "b2"}]
+
+
+def test_nivel_4_limite_de_itens():
+    ext = _extrato(("e1", 0, "POSTO ALFA", 400))
+    bx = _baixas(*[(f"b{i}", 0, "POSTO ALFA", 100) for i in range(4)])
+    assert _grupos(conciliar_multi_nivel(ext, bx, agrupar=True, max_itens_grupo=3)) == []
+    assert len(_grupos(conciliar_multi_nivel(ext, bx, agrupar=True, max_itens_grupo=4))) == 1
+
+
+def test_nivel_4_prazo_estourado_devolve_os_grupos_ja_achados(monkeypatch):
+    # Relógio parado que salta para depois do prazo assim que o primeiro grupo é achado
+    agora = [0.0]
+    busca = conciliador._subconjunto_soma
+
+    def busca_que_estoura_o_prazo(*argumentos):
+        escolha = busca(*argumentos)
+        if escolha:
+            agora[0] = 1e9
+        return escolha
+
+    monkeypatch.setattr(conciliador.time, "perf_counter", lambda: agora[0])
+    monkeypatch.setattr(conciliador, "_subconjunto_soma", busca_que_estoura_o_prazo)
+    ext = _extrato(("e1", 0, "POSTO ALFA", 300), ("e2", 0, "POSTO BETA", 300))
+    bx = _baixas(
+        ("b1", 0, "POSTO ALFA", 100), ("b2", 0, "POSTO ALFA", 200),
+        ("b3", 0, "POSTO BETA", 100), ("b4", 0, "POSTO BETA", 200),
+    )
+    res = conciliar_multi_nivel(ext, bx, agrupar=True, tempo_max_grupo=10)
+    assert _grupos(res) == [{"e1", "b1", "b2"}]
+    assert set(res.loc[res["Status"] != "✅ Conciliado", "Id Extrato"].dropna()) == {"e2"}
+
+
+# ============================================
+# Tolerância de valor (centavos inteiros)
+# ============================================
+def _com_valor_da_baixa(valor: float) -> tuple:
+    """e1 no dia 0 e e2 sem par (dia 30), ambos de R$ 100,00; b1 no dia 1 com `valor`."""
+    ext = _extrato(("e1", 0, "ANA", 100.00), ("e2", 30, "BRUNO", 100.00))
+    return ext, _baixas(("b1", 1, "CARLA", valor))
+
+
+@pytest.mark.parametrize("modo", ["guloso", "otimo"])
+def test_tolerancia_absoluta_inclui_o_limite(modo):
+    res = conciliar_multi_nivel(*_com_valor_da_baixa(100.05), tolerancia_valor=0.05, modo=modo)
+    assert _pares(res) == [("e1", "b1", "Nível 2")]
+    assert res["Detalhe"].iloc[0] == "Δ 1 dia(s), Δ valor R$ 0,05"
+    assert _pares(conciliar_multi_nivel(*_com_valor_da_baixa(100.06), tolerancia_valor=0.05, modo=modo)) == []
+
+
+@pytest.mark.parametrize("modo", ["guloso", "otimo"])
+def test_tolerancia_percentual_inclui_o_limite(modo):
+    # 1% de R$ 100,00 = R$ 1,00
+    assert len(_pares(conciliar_multi_nivel(*_com_valor_da_baixa(101.00), tolerancia_valor_pct=1, modo=modo))) == 1
+    assert _pares(conciliar_multi_nivel(*_com_valor_da_baixa(101.01), tolerancia_valor_pct=1, modo=modo)) == []
+    assert _pares(conciliar_multi_nivel(*_com_valor_da_baixa(98.99), tolerancia_valor_pct=1, modo=modo)) == []
+
+
+def test_tolerancia_usa_a_maior_das_duas():
+    valor = _com_valor_da_baixa(100.50)
+    assert _pares(conciliar_multi_nivel(*valor, tolerancia_valor=0.10, tolerancia_valor_pct=1)) != []
+    assert _pares(conciliar_multi_nivel(*valor, tolerancia_valor=0.60, tolerancia_valor_pct=0.1)) != []
+    assert _pares(conciliar_multi_nivel(*valor, tolerancia_valor=0.10, tolerancia_valor_pct=0.1)) == []
+
+
+def test_tolerancia_guloso_forma_antes_os_pares_de_valor_exato():
+    # b1 está mais perto na data, mas b2 tem o valor exato
+    ext = _extrato(("e1", 0, "ANA", 100.00), ("e2", 30, "BRUNO", 100.00))
+    bx = _baixas(("b1", 0, "CARLA", 100.03), ("b2", 2, "DIEGO", 100.00))
+    res = conciliar_multi_nivel(ext, bx, tolerancia_valor=0.05)
+    assert _pares(res) == [("e1", "b2", "Nível 2")]
+    assert res["Detalhe"].iloc[0] == "Δ 2 dia(s)"
+
+
+def test_valores_comparados_em_centavos():
+    # 0.1 + 0.2 != 0.3 em float, mas são os mesmos 30 centavos
+    ext = _extrato(("e1", 0, "ANA", 0.1 + 0.2))
+    bx = _baixas(("b1", 9, "CARLA", 0.3))
+    assert _pares(conciliar_multi_nivel(ext, bx)) == [("e1", "b1", "Nível 1")]
+
+
+def test_tolerancia_negativa():
+    with pytest.raises(ValueError, match="não podem ser negativas"):
+        conciliar_multi_nivel(*_com_valor_da_baixa(100.00), tolerancia_valor=-0.01)
@@ -0,0 +1,92 @@
+# ============================================
+# Normalização e índice de nomes
+# ============================================
+import numpy as np
+import pandas as pd
+import pytest
+from rapidfuzz import fuzz as rf_fuzz, process as rf_process
+
+from conciliador import conciliar_multi_nivel
+from nomes import buscar_nome, chaves_bloqueio, indice_nomes, normalizar_nome
+
+BASE = [
+    "João da Silva Comércio", "Maria Souza Distribuidora", "Posto Alfa Combustíveis", "Auto Peças Beta",
+    "Transportadora Gama", "Lubrificantes Delta", "Padaria Pão Quente", "Conveniência Ômega",
+    "Ferragens Santos", "Oliveira e Filhos", "Mercado Bom Preço", "Farmácia Popular Centro",
+]
+
+
+def _variantes(nome: str) -> list:
+    """Grafias de um mesmo nome como aparecem no extrato e nas baixas."""
+    tokens = nome.split()
+    erro = [t[:4] + t[5:] if len(t) > 5 else t for t in tokens]  # letra faltando depois do prefixo
+    return [
+        nome,
+        nome.upper() + " LTDA",
+        "PIX ENVIADO  " + nome,
+        " ".join(reversed(tokens)) + " - ME",
+        " ".join(erro),
+    ]
+
+
+def _recall(formas_busca: list, formas_indice: list, limite: int) -> tuple:
+    """(pares achados pelo índice, pares achados comparando tudo com tudo)."""
+    indice = indice_nomes(formas_indice)
+    formas = list(indice["formas"])
+    tudo = np.rint(rf_process.cdist(formas_busca, formas, scorer=rf_fuzz.token_sort_ratio, processor=None))
+    pelo_indice, completo = set(), set()
+    for i, forma in enumerate(formas_busca):
+        codigos, scores, _ = buscar_nome(indice, forma, limite)
+        pelo_indice |= {(forma, formas[c], s) for c, s in zip(codigos, scores)}
+        completo |= {(forma, formas[c], int(tudo[i, c])) for c in np.flatnonzero(tudo[i] >= limite)}
+    return pelo_indice, completo
+
+
+def test_normalizar_nome():
+    assert normalizar_nome("PIX ENVIADO  João da Silva LTDA") == "JOAO SILVA"
+    assert normalizar_nome("Silva, João - ME") == "JOAO SILVA"
+    assert normalizar_nome("COMERCIAL S/A") == "COMERCIAL"
+    assert normalizar_nome(None) == normalizar_nome(float("nan")) == ""
+
+
+@pytest.mark.parametrize("limite", [70, 85, 95])
+def test_indice_acha_o_mesmo_que_comparar_tudo(limite):
+    nomes = [v for nome in BASE for v in _variantes(nome)]
+    formas = sorted({normalizar_nome(n) for n in nomes})
+    pelo_indice, completo = _recall(formas, nomes, limite)
+    assert pelo_indice == completo
+
+
+def test_indice_so_perde_pares_sem_nenhum_prefixo_em_comum():
+    # Erro de digitação no começo de todos os tokens: fora de qualquer bloco
+    indice = indice_nomes(["JOAO SILVA"])
+    assert chaves_bloqueio("JAOO SLIVA").isdisjoint(indice["blocos"])
+    assert buscar_nome(indice, "JAOO SLIVA", 70)[0].size == 0
+    assert rf_fuzz.token_sort_ratio("JAOO SLIVA", "JOAO SILVA") >= 70
+
+
+def test_indice_normaliza_cada_nome_distinto_uma_vez():
+    indice = indice_nomes(["Posto Alfa Ltda", "POSTO ALFA", "Posto Alfa Ltda", None])
+    assert list(indice["formas"]) == ["ALFA POSTO", ""]
+    assert indice["codigos"].tolist() == [0, 0, 0, 1]
+
+
+def test_nivel_3b_acha_pelo_nome_com_valor_diferente():
+    dia = pd.Timestamp("2025-09-10")
+    ext = pd.DataFrame({
+        "Id Extrato": ["e1"], "Data": [dia], "Documento": None,
+        "Responsável": ["PIX ENVIADO  Posto Alfa Combustíveis"], "Valor": [-100.00],
+    })
+    bx = pd.DataFrame({
+        "Id Baixa": ["b1", "b2", "b3"], "Data": pd.NaT,
+        "Data Baixa": pd.NaT, "Documento": None,
+        "Responsável": ["POSTO ALFA COMBUSTIVEIS LTDA", "POSTO ALFA COMBUSTIVEIS LTDA", "POSTO ALFA COMBUSTIVEIS LTDA"],
+        "Valor Total": [100.40, 100.20, 100.90], "Centro de Resultados": "L1",
+    })
+    # Baixas sem data (fora do Nível 2) e nenhuma com o valor exato
+    assert (conciliar_multi_nivel(ext, bx, nivel_nome=True)["Status"] == "✅ Conciliado").sum() == 0
+    res = conciliar_multi_nivel(ext, bx, nivel_nome=True, tolerancia_valor=0.50)
+    conc = res[res["Status"] == "✅ Conciliado"]
+    # O histórico bancário derruba o score cru do Nível 3; o 3B compara as formas
+    # normalizadas e, dentro de R$ 0,50 (b3 fica fora), fica com a menor diferença
+    assert conc[["Id Extrato", "Id Baixa", "Nível Conciliação"]].values.tolist() == [["e1", "b2", "Nível 3B (Nome)"]]